@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Per-cycle market analytics (NumPy, one batched pass)
+- The loops hand every market they persist to add(); only the selection id and the top back /
+  lay price of each runner are gathered into flat lists, in one pass per market. This walk over
+  the runners (~1 µs each) is the only per-runner Python left; the "<marketId>:<selectionId>"
+  keys are built once per cycle in end_cycle().
+- end_cycle() turns the cycle into arrays and computes, without per-runner Python:
+    back_prob / lay_prob   implied probability 1/price (prices <= 1 count as missing)
+    back_book / lay_book   sum of implied probabilities per market in % (np.bincount)
+    overround              back_book - 100
+    lay_overround          lay_book - 100
+    spread, spread_pct     lay - back, and relative to the mid price
+    back_move, lay_move,   change since the runner's previous prices, matched by sorted-key search
+    prob_move
+- Previous prices are kept across cycles, so a market polled only in the background (demand
+  polling) still gets moves. forget(market_ids) drops them when the event finishes (odds.py's
+  lifecycle hook); anything not updated for PREV_MAX_AGE is dropped as well.
+- Result: {"ts", "markets": {marketId: {event_id, sport, back_book, lay_book, overround,
+  lay_overround, priced, selection_ids, back, lay, back_prob, lay_prob, spread, spread_pct,
+  back_move, lay_move, prob_move}}} with one list per column; missing values are null.
+- Needs numpy (pip install numpy); without it analytics are skipped.
+- Usage:  python analytics.py [markets] [runners]    # benchmark on random ladders
+"""
+
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+# -------------------- Config --------------------
+PREV_MAX_AGE = 600   # seconds a runner's previous prices are kept while its market isn't polled
+
+NAN = float("nan")
+
+
+def _top(ladder) -> float:
+    if isinstance(ladder, list):
+        ladder = ladder[0] if ladder else None
+    price = ladder.get("price") if isinstance(ladder, dict) else None
+    return float(price) if price else NAN
+
+
+class MarketAnalytics:
+    def __init__(self, name: str):
+        self.name = name
+        self.enabled = True
+        self._reset()
+        self.prev_keys = None   # sorted "<marketId>:<selectionId>" of every runner seen lately
+        self.prev_back = None
+        self.prev_lay = None
+        self.prev_prob = None
+        self.prev_at = None     # when each runner's prices were taken
+        self.forgotten = set()  # market ids whose previous prices go at the next end_cycle()
+        self.last_ms = 0.0
+
+    def _reset(self):
+        self.markets: List[tuple] = []    # (market_id, event_id, sport, runner count)
+        self.selections: List[Any] = []
+        self.backs: List[float] = []
+        self.lays: List[float] = []
+
+    def forget(self, market_ids):
+        """Drop finished markets' previous prices (applied at the next end_cycle())."""
+        self.forgotten.update(str(m) for m in market_ids)
+
+    def add(self, market_id, runners, event_id="", sport="",
+            id_field="selectionId", back_field="availableToBack", lay_field="availableToLay"):
+        """Queue one market's runners for this cycle's batch."""
+        if not self.enabled or not runners:
+            return
+        market_id = str(market_id)
+        self.markets.append((market_id, str(event_id), sport, len(runners)))
+        selections, backs, lays = self.selections.append, self.backs.append, self.lays.append
+        for r in runners:
+            selections(r.get(id_field))
+            backs(_top(r.get(back_field)))
+            lays(_top(r.get(lay_field)))
+
+    def end_cycle(self) -> Optional[Dict[str, Any]]:
+        """Compute the cycle's analytics document; None when nothing was queued."""
+        if not self.enabled or not self.markets:
+            self._reset()
+            return None
+        try:
+            import numpy as np
+        except ImportError:
+            print("❌ numpy is required for market analytics (pip install numpy) - analytics off")
+            self.enabled = False
+            self._reset()
+            return None
+        started = time.perf_counter()
+        counts = np.fromiter((m[3] for m in self.markets), dtype=np.int64, count=len(self.markets))
+        market_idx = np.repeat(np.arange(len(counts)), counts)
+        owners = np.repeat(np.array([m[0] for m in self.markets], dtype=object), counts).tolist()
+        keys = np.array([f"{m}:{s}" for m, s in zip(owners, self.selections)])
+        self._expire(np, time.time())
+        back = np.array(self.backs, dtype=np.float64)
+        lay = np.array(self.lays, dtype=np.float64)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            back_prob = np.where(back > 1, 1.0 / back, np.nan)
+            lay_prob = np.where(lay > 1, 1.0 / lay, np.nan)
+            back_book = np.bincount(market_idx, weights=np.nan_to_num(back_prob), minlength=len(counts)) * 100
+            lay_book = np.bincount(market_idx, weights=np.nan_to_num(lay_prob), minlength=len(counts)) * 100
+            priced = np.bincount(market_idx, weights=~np.isnan(back_prob), minlength=len(counts))
+            lay_priced = np.bincount(market_idx, weights=~np.isnan(lay_prob), minlength=len(counts))
+            spread = lay - back
+            spread_pct = spread / ((lay + back) / 2) * 100
+
+            back_move = np.full_like(back, np.nan)
+            lay_move = np.full_like(lay, np.nan)
+            prob_move = np.full_like(back, np.nan)
+            if self.prev_keys is not None and len(self.prev_keys):
+                pos = np.clip(np.searchsorted(self.prev_keys, keys), 0, len(self.prev_keys) - 1)
+                hit = self.prev_keys[pos] == keys
+                back_move[hit] = back[hit] - self.prev_back[pos[hit]]
+                lay_move[hit] = lay[hit] - self.prev_lay[pos[hit]]
+                prob_move[hit] = back_prob[hit] - self.prev_prob[pos[hit]]
+
+        self._remember(np, keys, back, lay, back_prob)
+
+        # one list per column, sliced per market; nan -> None
+        columns = {}
+        for name, values in (("back", back), ("lay", lay), ("back_prob", back_prob), ("lay_prob", lay_prob),
+                             ("spread", spread), ("spread_pct", spread_pct),
+                             ("back_move", back_move), ("lay_move", lay_move), ("prob_move", prob_move)):
+            rounded = np.round(values, 4).astype(object)
+            rounded[np.isnan(values)] = None
+            columns[name] = rounded.tolist()
+        ends = np.cumsum(counts).tolist()
+        book = np.round(np.column_stack([back_book, lay_book, back_book - 100, lay_book - 100,
+                                         priced, lay_priced]), 2).tolist()
+
+        doc = {"ts": int(time.time() * 1000), "markets": {}}
+        start = 0
+        for (market_id, event_id, sport, _), end, (back_pct, lay_pct, over, lay_over, n, n_lay) \
+                in zip(self.markets, ends, book):
+            entry = {"event_id": event_id, "sport": sport, "back_book": back_pct if n else None,
+                     "lay_book": lay_pct if n_lay else None, "overround": over if n else None,
+                     "lay_overround": lay_over if n_lay else None,
+                     "priced": int(n), "selection_ids": self.selections[start:end]}
+            for name, values in columns.items():
+                entry[name] = values[start:end]
+            doc["markets"][market_id] = entry
+            start = end
+        self.last_ms = (time.perf_counter() - started) * 1000
+        self._reset()
+        return doc
+
+    def _expire(self, np, now: float):
+        """Drop previous prices of forgotten markets and of runners not updated for PREV_MAX_AGE."""
+        if self.prev_keys is None:
+            self.forgotten.clear()
+            return
+        keep = self.prev_at >= now - PREV_MAX_AGE
+        forgotten, self.forgotten = self.forgotten, set()
+        for market_id in forgotten:  # the market's keys are one contiguous run of the sorted array
+            lo, hi = np.searchsorted(self.prev_keys, [f"{market_id}:", f"{market_id};"])
+            keep[lo:hi] = False
+        if not keep.all():
+            self.prev_keys, self.prev_back, self.prev_lay, self.prev_prob, self.prev_at = (
+                a[keep] for a in (self.prev_keys, self.prev_back, self.prev_lay, self.prev_prob, self.prev_at))
+
+    def _remember(self, np, keys, back, lay, back_prob):
+        """This cycle's prices replace the runners' previous ones; unpolled runners keep theirs."""
+        now = np.full(len(keys), time.time())
+        if self.prev_keys is not None and len(self.prev_keys):
+            ordered = np.sort(keys)
+            pos = np.clip(np.searchsorted(ordered, self.prev_keys), 0, len(ordered) - 1)
+            old = ordered[pos] != self.prev_keys
+            keys, back, lay, back_prob, now = (
+                np.concatenate([prev[old], cur]) for prev, cur in
+                ((self.prev_keys, keys), (self.prev_back, back), (self.prev_lay, lay),
+                 (self.prev_prob, back_prob), (self.prev_at, now)))
+        order = np.argsort(keys, kind="stable")
+        self.prev_keys, self.prev_back, self.prev_lay, self.prev_prob, self.prev_at = (
+            keys[order], back[order], lay[order], back_prob[order], now[order])
+
+    def metrics_line(self, doc) -> str:
+        return f"📐 {self.name} analytics: {len(doc['markets'])} markets in {self.last_ms:.1f} ms"
+
+
+# -------------------- Shared instances --------------------
+_analytics = {}
+
+def get_analytics(name: str) -> MarketAnalytics:
+    if name not in _analytics:
+        _analytics[name] = MarketAnalytics(name)
+    return _analytics[name]
+
+
+# -------------------- Benchmark --------------------
+def benchmark(markets: int = 5000, runners: int = 3, cycles: int = 5):
+    import random
+    engine = MarketAnalytics("bench")
+    ladder = lambda: [{"price": round(random.uniform(1.01, 20), 2), "size": 100}]
+    for cycle in range(cycles):
+        batch = [[{"selectionId": s, "availableToBack": ladder(), "availableToLay": ladder()}
+                  for s in range(runners)] for _ in range(markets)]
+        started = time.perf_counter()
+        for m, sels in enumerate(batch):
+            engine.add(f"1.{m}", sels, event_id=m, sport="cricket")
+        gathered = time.perf_counter()
+        engine.end_cycle()
+        total = time.perf_counter() - gathered
+        print(f"cycle {cycle}: {markets} markets x {runners} runners  gather {(gathered - started) * 1000:.1f} ms  "
+              f"compute {engine.last_ms:.1f} ms  -> {markets / (gathered - started + total):,.0f} markets/s")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(a) for a in sys.argv[1:3]))
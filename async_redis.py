@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Non-blocking Redis writes on an asyncio loop
+- The scrape loops stay synchronous; submit() hands a command to an asyncio loop running
+  in a background thread and returns at once, so Redis latency overlaps the next upstream
+  fetch instead of adding to it.
+- One redis.asyncio client over a connection pool of POOL_SIZE connections, short socket
+  timeouts, and retries with exponential backoff on connection errors (reconnects happen
+  transparently on the next command).
+- At most MAX_INFLIGHT commands are outstanding; submit() blocks beyond that (back-pressure
+  instead of an unbounded backlog while Redis is slow).
+- flush() is a barrier: it blocks until everything submitted so far has completed.
+"""
+
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+# -------------------- Config --------------------
+POOL_SIZE = 16
+MAX_INFLIGHT = 256
+SOCKET_TIMEOUT = 2          # seconds; a slow command is retried instead of stalling 10s
+RETRIES = 3
+HEALTH_CHECK_INTERVAL = 30
+
+
+class AsyncRedisWriter:
+    def __init__(self, config: Dict[str, Any], pool_size: int = POOL_SIZE, max_inflight: int = MAX_INFLIGHT):
+        self.config = dict(config)
+        self.pool_size = pool_size
+        self.slots = threading.BoundedSemaphore(max_inflight)
+        self.cond = threading.Condition()
+        self.inflight = 0
+        self.loop = None          # asyncio loop, created (and asyncio imported) on first use
+        self.client = None
+        self._thread = None
+        self._ready = threading.Event()
+        self.error = None         # why the loop thread could not start; re-raised by start()
+        self.stats = {"submitted": 0, "done": 0, "errors": 0}
+
+    # ---------- loop thread ----------
+    def start(self):
+        with self.cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="redis-async", daemon=True)
+                self._thread.start()
+        self._ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def _run(self):
+        try:
+            import asyncio
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self.client = self._make_client()
+            self.loop = loop
+        except Exception as e:  # redis not installed, bad config, ...
+            print(f"❌ Async Redis writer could not start: {e}")
+            self.error = e
+            return
+        finally:
+            self._ready.set()  # never leave start() waiting
+        self.loop.run_forever()
+
+    def _make_client(self):
+        import redis.asyncio as aioredis
+        from redis.asyncio.retry import Retry
+        from redis.backoff import ExponentialBackoff
+        from redis.exceptions import ConnectionError, TimeoutError
+
+        config = dict(self.config)
+        config.update(socket_timeout=SOCKET_TIMEOUT, socket_connect_timeout=SOCKET_TIMEOUT)
+        pool = aioredis.BlockingConnectionPool(max_connections=self.pool_size, timeout=None, **config)
+        return aioredis.Redis(
+            connection_pool=pool,
+            retry=Retry(ExponentialBackoff(cap=2, base=0.1), RETRIES),
+            retry_on_error=[ConnectionError, TimeoutError],
+            health_check_interval=HEALTH_CHECK_INTERVAL,
+        )
+
+    # ---------- submitting ----------
+    def submit(self, command: Callable[[Any], Awaitable], on_error: Callable[[Exception], None] = None):
+        """command(client) -> awaitable; runs on the loop. Blocks only when MAX_INFLIGHT is reached."""
+        import asyncio
+        self.start()
+        self.slots.acquire()
+        with self.cond:
+            self.inflight += 1
+            self.stats["submitted"] += 1
+        future = asyncio.run_coroutine_threadsafe(command(self.client), self.loop)
+        future.add_done_callback(lambda f: self._done(f, on_error))
+        return future
+
+    def _done(self, future, on_error):
+        error = future.exception()
+        if error is not None:
+            print(f"❌ Async Redis error: {error}")
+            if on_error:
+                on_error(error)
+        with self.cond:
+            self.inflight -= 1
+            self.stats["errors" if error else "done"] += 1
+            if not self.inflight:
+                self.cond.notify_all()
+        self.slots.release()
+
+    def set(self, key, value, ex=None):
+        return self.submit(lambda r: r.set(key, value, ex=ex))
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until every submitted command has completed."""
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.inflight, timeout)
+
+    def close(self):
+        if self.loop is None:
+            return
+        import asyncio
+        self.flush()
+        asyncio.run_coroutine_threadsafe(self.client.aclose() if hasattr(self.client, "aclose")
+                                         else self.client.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
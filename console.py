@@ -0,0 +1,136 @@
+"""
+Throttled console renderer shared by the live loops.
+- Fetch loops hand rows to the renderer instead of printing them.
+- A background thread keeps the last rendered value of every row and only
+  writes rows whose price / status changed since the previous flush.
+- Output is flushed at most MAX_FLUSH_HZ times per second.
+- QUIET mode skips row output and prints one summary line per cycle.
+"""
+
+import sys
+import time
+import threading
+from datetime import datetime
+
+# -------------------- Config --------------------
+MAX_FLUSH_HZ = 2      # max writes to stdout per second
+QUIET = False         # True -> one summary line per cycle only
+
+
+class ConsoleRenderer:
+    def __init__(self, max_flush_hz=MAX_FLUSH_HZ, quiet=QUIET, stream=None):
+        self.interval = 1.0 / max_flush_hz if max_flush_hz else 0
+        self.quiet = quiet
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+        self._pending = {}      # group -> (title, {row: value})  latest submitted state
+        self._rendered = {}     # group -> {row: value}            last state written out
+        self._summaries = []
+        self._cycle_marks = []
+        self._forgotten = set()
+        self._cycle_groups = 0
+        self._cycle_changed = 0   # only touched by the render thread
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="console-renderer", daemon=True)
+        self._thread.start()
+
+    # ---------- called from the fetch thread (never blocks on stdout) ----------
+    def update(self, group, title, rows):
+        """Submit the current rows of a group (market / event). Older unsent ticks are dropped."""
+        with self._lock:
+            self._pending[group] = (title, dict(rows))
+            self._cycle_groups += 1
+
+    def message(self, text):
+        """Queue a free-form line (skipped in quiet mode)."""
+        if self.quiet:
+            return
+        with self._lock:
+            self._summaries.append(text)
+
+    def end_cycle(self, label=""):
+        """Mark the end of one fetch cycle; quiet mode prints a one-line summary."""
+        with self._lock:
+            groups, self._cycle_groups = self._cycle_groups, 0
+            self._cycle_marks.append((datetime.now(), label, groups))
+        self._wake.set()
+
+    def forget(self, group):
+        """Drop render state of a group that left play."""
+        with self._lock:
+            self._pending.pop(group, None)
+            self._forgotten.add(group)
+
+    def close(self):
+        self._stop = True
+        self._wake.set()
+        self._thread.join(timeout=2)
+        self._flush()
+
+    # ---------- background thread ----------
+    def _run(self):
+        while not self._stop:
+            self._wake.wait(self.interval or 0.5)
+            self._wake.clear()
+            started = time.monotonic()
+            self._flush()
+            # cap the flush rate
+            spent = time.monotonic() - started
+            if self.interval and spent < self.interval:
+                time.sleep(self.interval - spent)
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            summaries, self._summaries = self._summaries, []
+            marks, self._cycle_marks = self._cycle_marks, []
+            forgotten, self._forgotten = self._forgotten, set()
+
+        for group in forgotten:
+            if group not in pending:
+                self._rendered.pop(group, None)
+        out = []
+        for group, (title, rows) in pending.items():
+            last = self._rendered.setdefault(group, {})
+            changed = [(r, v) for r, v in rows.items() if last.get(r) != v]
+            for r in list(last):
+                if r not in rows:
+                    del last[r]
+            if not changed:
+                continue
+            for r, v in changed:
+                last[r] = v
+            self._cycle_changed += len(changed)
+            if self.quiet:
+                continue
+            out.append(f"\n{title}")
+            for r, v in changed:
+                out.append(f" {r:20} | {format_value(v)}")
+        out.extend(summaries)
+        if self.quiet:
+            for at, label, groups in marks:
+                out.append(f"⏰ {at:%H:%M:%S} {label or 'cycle'} | updates: {groups} | changed rows: {self._cycle_changed}")
+                self._cycle_changed = 0
+        if out:
+            try:
+                self.stream.write("\n".join(out) + "\n")
+                self.stream.flush()
+            except Exception:
+                pass
+
+
+def format_value(value):
+    if isinstance(value, (tuple, list)):
+        return " | ".join(str(v) for v in value)
+    return str(value)
+
+
+# -------------------- Shared instance --------------------
+_renderer = None
+
+def get_renderer():
+    global _renderer
+    if _renderer is None:
+        _renderer = ConsoleRenderer()
+    return _renderer
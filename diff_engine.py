@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Snapshot diff engine for market / fancy documents
+- diff(old, new) returns a minimal JSON-patch style list of
+  {"op": "add" | "remove" | "replace" | "order", "path": "/a/b", "value": ...} operations.
+- Lists of records are matched by their natural key instead of by position
+  (selectionId, apiSiteMarketId, marketId, ...). In the patch path such an element
+  is addressed by its key:  /selections/414464/availableToBack/0/price
+                            /dmFancyBetMarkets/4.1759964383383-F2/suspended
+  Lists without a natural key (price ladders) are matched by index.
+- Keyed adds are appended. When the resulting key order differs from the new list (a
+  reorder, an insert in the middle) one {"op": "order", "path": "/selections",
+  "value": [keys in the new order]} follows the list's other ops.
+- apply_patch(doc, patch) replays a patch onto a copy of the old document.
+- Run directly to benchmark against the MarketData / MatchData fixtures.
+"""
+
+import copy
+from typing import Any, Dict, List, Optional
+
+# natural keys tried (in order) for lists of dicts
+LIST_KEYS = ("selectionId", "apiSiteMarketId", "marketId", "market_api_id", "match_api_id", "id")
+
+
+def escape(token) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def list_key(*lists: List[Any]) -> Optional[str]:
+    """Natural key shared by every element of the given lists (None -> match by index)."""
+    sample = next((lst[0] for lst in lists if lst), None)
+    if not isinstance(sample, dict):
+        return None
+    for k in LIST_KEYS:
+        if k in sample and all(isinstance(e, dict) and k in e for lst in lists for e in lst):
+            return k
+    return None
+
+
+# -------------------- Diff --------------------
+def diff(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    ops: List[Dict[str, Any]] = []
+    _diff(old, new, path, ops)
+    return ops
+
+
+def _diff(old, new, path, ops):
+    if old is new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for k in old:
+            if k not in new:
+                ops.append({"op": "remove", "path": f"{path}/{escape(k)}"})
+        for k, v in new.items():
+            if k not in old:
+                ops.append({"op": "add", "path": f"{path}/{escape(k)}", "value": v})
+            else:
+                ov = old[k]
+                if ov is not v and (type(ov) is not type(v) or ov != v):
+                    _diff(ov, v, f"{path}/{escape(k)}", ops)
+        return
+    if isinstance(old, list) and isinstance(new, list):
+        key = list_key(old, new)
+        if key is None:
+            _diff_index(old, new, path, ops)
+        else:
+            _diff_keyed(old, new, key, path, ops)
+        return
+    if type(old) is not type(new) or old != new:
+        ops.append({"op": "replace", "path": path, "value": new})
+
+
+def _diff_index(old, new, path, ops):
+    common = min(len(old), len(new))
+    for i in range(common):
+        if old[i] != new[i]:
+            _diff(old[i], new[i], f"{path}/{i}", ops)
+    for i in range(common, len(new)):
+        ops.append({"op": "add", "path": f"{path}/{i}", "value": new[i]})
+    for i in range(len(old) - 1, common - 1, -1):
+        ops.append({"op": "remove", "path": f"{path}/{i}"})
+
+
+def _diff_keyed(old, new, key, path, ops):
+    old_by_key = {e[key]: e for e in old}
+    new_keys = set()
+    added = []
+    for e in new:
+        k = e[key]
+        new_keys.add(k)
+        prev = old_by_key.get(k)
+        if prev is None:
+            ops.append({"op": "add", "path": f"{path}/{escape(k)}", "value": e})
+            added.append(k)
+        elif prev != e:
+            _diff(prev, e, f"{path}/{escape(k)}", ops)
+    for k in old_by_key:
+        if k not in new_keys:
+            ops.append({"op": "remove", "path": f"{path}/{escape(k)}"})
+    order = [e[key] for e in new]
+    if [e[key] for e in old if e[key] in new_keys] + added != order:
+        ops.append({"op": "order", "path": path, "value": order})
+
+
+# -------------------- Apply --------------------
+def _child(container, token):
+    if isinstance(container, dict):
+        return token
+    key = list_key(container)
+    if key is not None:
+        for i, e in enumerate(container):
+            if str(e[key]) == token:
+                return i
+        raise KeyError(token)
+    return int(token)
+
+
+def apply_patch(doc: Any, patch: List[Dict[str, Any]]) -> Any:
+    """Return a copy of doc with the patch applied."""
+    doc = copy.deepcopy(doc)
+    for op in patch:
+        tokens = [unescape(t) for t in op["path"].split("/")[1:]]
+        if op["op"] == "order":
+            target = doc
+            for t in tokens:
+                target = target[_child(target, t)]
+            key = list_key(target)
+            by_key = {str(e[key]): e for e in target}
+            target[:] = [by_key[str(k)] for k in op["value"]]
+            continue
+        if not tokens:
+            doc = copy.deepcopy(op.get("value"))
+            continue
+        parent = doc
+        for t in tokens[:-1]:
+            parent = parent[_child(parent, t)]
+        last = tokens[-1]
+        if op["op"] == "add" and isinstance(parent, list):
+            value = op["value"]
+            keyed = isinstance(value, dict) and any(k in value and str(value[k]) == last for k in LIST_KEYS)
+            if keyed or last == "-":
+                parent.append(copy.deepcopy(value))
+            else:
+                parent.insert(int(last), copy.deepcopy(value))
+        elif op["op"] in ("add", "replace"):
+            parent[_child(parent, last)] = copy.deepcopy(op["value"])
+        elif op["op"] == "remove":
+            del parent[_child(parent, last)]
+    return doc
+
+
+def changed_items(patch: List[Dict[str, Any]], list_name: str) -> Dict[str, Dict[str, Any]]:
+    """Group ops under /<list_name>/<key>/<field>... into {key: {"fields": set, "op": add|remove|None}}."""
+    items: Dict[str, Dict[str, Any]] = {}
+    prefix = f"/{list_name}/"
+    for op in patch:
+        if not op["path"].startswith(prefix):
+            continue
+        tokens = op["path"][len(prefix):].split("/")
+        item = items.setdefault(unescape(tokens[0]), {"fields": set(), "op": None})
+        if len(tokens) == 1:
+            item["op"] = op["op"]
+        else:
+            item["fields"].add(unescape(tokens[1]))
+    return items
+
+
+# -------------------- Benchmark --------------------
+def benchmark(rounds: int = 2000):
+    import json
+    import random
+    import time
+
+    results = {}
+    with open("MarketData_34807931.json", "r", encoding="utf-8") as f:
+        fancy = json.load(f)
+    with open("MatchData_34807931.json", "r", encoding="utf-8") as f:
+        market = json.load(f)["market"]
+
+    def mutate_fancy(doc):
+        doc = copy.deepcopy(doc)
+        markets = doc["dmFancyBetMarkets"]
+        for m in random.sample(markets, 3):
+            m["suspended"] = 1 - (m.get("suspended") or 0)
+        doc["version"] += 1
+        return doc
+
+    def mutate_market(doc):
+        doc = copy.deepcopy(doc)
+        s = random.choice(doc["selections"])
+        if s["availableToLay"]:
+            s["availableToLay"][0]["size"] += 1
+        doc["totalMatched"] += 10
+        return doc
+
+    for name, base, mutate in [("fancy MarketData_34807931", fancy, mutate_fancy),
+                               ("market MatchData_34807931", market, mutate_market)]:
+        pairs = []
+        prev = base
+        for _ in range(rounds):
+            cur = mutate(prev)
+            pairs.append((prev, cur))
+            prev = cur
+        started = time.perf_counter()
+        ops = 0
+        for a, b in pairs:
+            ops += len(diff(a, b))
+        elapsed = time.perf_counter() - started
+        a, b = pairs[-1]
+        assert apply_patch(a, diff(a, b)) == b
+        results[name] = {
+            "rounds": rounds,
+            "us_per_diff": round(elapsed / rounds * 1e6, 1),
+            "diffs_per_sec": int(rounds / elapsed),
+            "avg_ops": round(ops / rounds, 2),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    for name, r in benchmark().items():
+        print(f"⏱️ {name}: {r['us_per_diff']} µs/diff | {r['diffs_per_sec']} diffs/s | {r['avg_ops']} ops/diff")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Daily columnar export of odds + fancy history (requires pyarrow)
+- Reads history/<kind>/sport=<sport>/date=<day>.jsonl written by history.py.
+- Writes Hive-partitioned Parquet:  parquet/<kind>/sport=<sport>/date=<day>/part-<offset>.parquet
+  so readers can prune by sport / date and only load the columns they need, e.g.
+      pyarrow.dataset.dataset("parquet/odds", partitioning="hive")
+- Incremental: the byte offset reached in every source file is kept in
+  parquet/_export_state.json, so a re-run only converts rows appended since the last run.
+- Rows are converted in column batches of BATCH_ROWS.
+- DELETE_EXPORTED: a source file of a past day (no longer appended to) is deleted once every
+  row of it is in Parquet, and its offset is dropped from the state.
+- Usage:  python export_parquet.py [kind ...]
+"""
+
+import os
+import sys
+import json
+import glob
+from datetime import datetime
+from typing import Dict, List
+
+# -------------------- Config --------------------
+HISTORY_DIR = "history"
+EXPORT_DIR = "parquet"
+STATE_FILE = os.path.join(EXPORT_DIR, "_export_state.json")
+BATCH_ROWS = 50000
+DELETE_EXPORTED = True
+
+# column name -> arrow type name (partition columns sport/date live in the path)
+SCHEMAS = {
+    "odds": {
+        "ts": "int64", "event_id": "string", "market_id": "string", "selection_id": "string",
+        "runner_name": "string", "status": "int32",
+        "back_price": "float64", "back_size": "float64", "lay_price": "float64", "lay_size": "float64",
+        "last_price_traded": "float64", "market_status": "int32", "total_matched": "float64",
+        "version": "int64",
+    },
+    "fancy": {
+        "ts": "int64", "event_id": "string", "market_id": "string", "market_name": "string",
+        "status": "int32", "suspended": "int32", "ball_running": "int32", "auto_suspended": "int32",
+        "bet_allowed": "int32", "game_over": "int32", "removed": "bool_", "version": "int64",
+    },
+}
+
+
+def load_state() -> Dict[str, int]:
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state: Dict[str, int]):
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_FILE)
+
+
+def arrow_schema(kind: str):
+    import pyarrow as pa
+    return pa.schema([(name, getattr(pa, t)()) for name, t in SCHEMAS[kind].items()])
+
+
+def write_batch(kind: str, sport: str, day: str, rows: List[dict], part: int):
+    """Column-wise conversion of a batch of row dicts into one Parquet file."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(kind)
+    columns = {name: [r.get(name) for r in rows] for name in schema.names}
+    table = pa.Table.from_pydict(columns, schema=schema)
+    folder = os.path.join(EXPORT_DIR, kind, f"sport={sport}", f"date={day}")
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"part-{part:012d}.parquet")
+    pq.write_table(table, path, compression="zstd")
+    return path
+
+
+def export_file(kind: str, path: str, state: Dict[str, int]) -> int:
+    sport = os.path.basename(os.path.dirname(path)).split("=", 1)[1]
+    day = os.path.basename(path).split("=", 1)[1].rsplit(".", 1)[0]
+    offset = state.get(path, 0)
+    if os.path.getsize(path) <= offset:
+        return 0
+
+    exported = 0
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            batch_start = offset
+            rows = []
+            while len(rows) < BATCH_ROWS:
+                line = f.readline()
+                if not line or not line.endswith(b"\n"):
+                    break  # EOF or a line still being written
+                offset += len(line)
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    continue
+            if not rows:
+                break
+            out = write_batch(kind, sport, day, rows, batch_start)
+            exported += len(rows)
+            state[path] = offset
+            save_state(state)  # progress survives an interrupted run
+            print(f"📦 {len(rows)} rows -> {out}")
+            if len(rows) < BATCH_ROWS:
+                break
+    return exported
+
+
+def remove_if_exported(path: str, state: Dict[str, int]) -> bool:
+    """Delete a past day's source file once every row of it is exported."""
+    day = os.path.basename(path).split("=", 1)[1].rsplit(".", 1)[0]
+    if day >= datetime.now().strftime("%Y-%m-%d") or os.path.getsize(path) > state.get(path, 0):
+        return False  # history.py may still append to today's file
+    os.remove(path)
+    state.pop(path, None)
+    save_state(state)
+    print(f"🧹 {path} fully exported - removed")
+    return True
+
+
+def export(kinds=tuple(SCHEMAS)):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("❌ pyarrow is required for the Parquet export (pip install pyarrow)")
+        return 0
+    state = load_state()
+    total = 0
+    for kind in kinds:
+        for path in sorted(glob.glob(os.path.join(HISTORY_DIR, kind, "sport=*", "date=*.jsonl"))):
+            total += export_file(kind, path, state)
+            if DELETE_EXPORTED:
+                remove_if_exported(path, state)
+    print(f"✅ Export done: {total} new rows")
+    return total
+
+
+if __name__ == "__main__":
+    export(sys.argv[1:] or tuple(SCHEMAS))
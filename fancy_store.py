@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Redis-backed fancy market store with a server-side merge
+- Per event:  fancy:{<sport>:<eventId>}:markets  hash  apiSiteMarketId -> market JSON
+              fancy:{<sport>:<eventId>}:meta     hash  version, event (dmFancyBetEvent JSON)
+- merge() sends only the incoming markets; one Lua script upserts them, deletes the
+  ones flagged "removed" and returns the merged document: one round trip per update.
+- A delta older than the stored version is not applied, so several scraper processes
+  can update the same event safely.
+- Both keys carry FANCY_TTL, refreshed on every merge.
+- When a merge fails and the caller merged locally instead, reseed() queues the full local
+  document; the next merge() of that event first rewrites both keys with it (replace(),
+  skipped when a newer version is already stored), so the delta Redis missed isn't lost.
+"""
+
+import os
+import json
+import time
+from typing import Any, Dict, Tuple
+
+# -------------------- Config --------------------
+FANCY_TTL = 180            # seconds, same as redis_data.RECORD_TTL["fancy"]
+FANCY_REDIS_URL = os.environ.get("FANCY_REDIS_URL")  # else redis_data's client
+
+MERGE_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[2], 'version') or '0')
+if tonumber(ARGV[1]) >= current then
+    for i = 4, #ARGV, 2 do
+        if ARGV[i + 1] == '' then
+            redis.call('HDEL', KEYS[1], ARGV[i])
+        else
+            redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+        end
+    end
+    redis.call('HSET', KEYS[2], 'version', ARGV[1], 'event', ARGV[2])
+end
+if tonumber(ARGV[3]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+end
+return {redis.call('HGET', KEYS[2], 'version'), redis.call('HGET', KEYS[2], 'event'), redis.call('HVALS', KEYS[1])}
+"""
+
+REPLACE_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[2], 'version') or '0')
+if tonumber(ARGV[1]) < current then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+for i = 4, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HSET', KEYS[2], 'version', ARGV[1], 'event', ARGV[2])
+if tonumber(ARGV[3]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+end
+return 1
+"""
+
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, (bytes, bytearray)) else value
+
+
+class RedisFancyStore:
+    def __init__(self, client=None, ttl: int = FANCY_TTL):
+        self._client = client
+        self.ttl = ttl
+        self._merge = None
+        self._replace = None
+        self.merges = 0
+        self.stale = 0
+        self._reseed: Dict[Tuple[str, str], Dict[str, Any]] = {}  # (sport, event_id) -> full document
+
+    @property
+    def client(self):
+        if self._client is None:
+            if FANCY_REDIS_URL:
+                import redis
+                self._client = redis.Redis.from_url(FANCY_REDIS_URL)
+            else:
+                import redis_data  # reuse the shared connection
+                self._client = redis_data.get_redis()
+        return self._client
+
+    def keys(self, sport: str, event_id) -> list:
+        base = f"fancy:{{{sport}:{event_id}}}"   # hash tag keeps both keys in one cluster slot
+        return [f"{base}:markets", f"{base}:meta"]
+
+    def _market_json(self, m: Dict[str, Any]) -> str:
+        return json.dumps(m, ensure_ascii=False, separators=(',', ':'))
+
+    def replace(self, sport: str, event_id, doc: Dict[str, Any]) -> bool:
+        """Overwrite the stored document with doc unless a newer version is already stored."""
+        if self._replace is None:
+            self._replace = self.client.register_script(REPLACE_SCRIPT)
+        args = [int(doc.get("version") or 0), json.dumps(doc.get("dmFancyBetEvent", {}), ensure_ascii=False), self.ttl]
+        for m in doc.get("dmFancyBetMarkets", []):
+            if m.get("apiSiteMarketId") and not m.get("removed"):
+                args += [m["apiSiteMarketId"], self._market_json(m)]
+        return bool(self._replace(keys=self.keys(sport, event_id), args=args))
+
+    def reseed(self, sport: str, event_id, doc: Dict[str, Any]):
+        """Write doc in full before the event's next merge (Redis missed a delta)."""
+        self._reseed[(sport, str(event_id))] = doc
+
+    def forget(self, sport: str, event_id):
+        self._reseed.pop((sport, str(event_id)), None)
+
+    def merge(self, sport: str, event_id, new_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a fancy delta server-side and return the merged document."""
+        pending = self._reseed.pop((sport, str(event_id)), None)
+        if pending is not None:
+            try:
+                self.replace(sport, event_id, pending)
+            except Exception:
+                self._reseed.setdefault((sport, str(event_id)), pending)
+                raise
+        if self._merge is None:
+            self._merge = self.client.register_script(MERGE_SCRIPT)
+        version = int(new_data.get("version") or time.time() * 1000)
+        args = [version, json.dumps(new_data.get("dmFancyBetEvent", {}), ensure_ascii=False), self.ttl]
+        for m in new_data.get("dmFancyBetMarkets", []):
+            market_id = m.get("apiSiteMarketId")
+            if not market_id:
+                continue
+            args += [market_id, "" if m.get("removed") else self._market_json(m)]
+
+        stored_version, event, values = self._merge(keys=self.keys(sport, event_id), args=args)
+        self.merges += 1
+        if stored_version is not None and int(stored_version) > version:
+            self.stale += 1
+        return self._document(stored_version, event, values)
+
+    def get(self, sport: str, event_id) -> Dict[str, Any]:
+        markets_key, meta_key = self.keys(sport, event_id)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hget(meta_key, "version")
+        pipe.hget(meta_key, "event")
+        pipe.hvals(markets_key)
+        return self._document(*pipe.execute())
+
+    def delete(self, sport: str, event_id):
+        self.client.delete(*self.keys(sport, event_id))
+
+    @staticmethod
+    def _document(version, event, values) -> Dict[str, Any]:
+        markets = [json.loads(_text(v)) for v in values or []]
+        markets.sort(key=lambda m: (m.get("sort") or 0, m.get("apiSiteMarketId", "")))
+        return {
+            "dmFancyBetMarkets": markets,
+            "dmFancyBetEvent": json.loads(_text(event)) if event else {},
+            "version": int(version or 0),
+        }
+
+
+# -------------------- Shared instance --------------------
+_store = None
+
+def get_fancy_store() -> RedisFancyStore:
+    global _store
+    if _store is None:
+        _store = RedisFancyStore()
+    return _store
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tick history capture for odds + fancy
+- odds.py / premium.py hand every fetched document to HistoryWriter when their HISTORY flag
+  is on (off by default: capture costs a diff and a file append per document per tick).
+- diff_engine finds the runners / fancy markets that changed since the previous tick
+  and one flat row per changed selection / fancy market is appended to
+      history/<kind>/sport=<sport>/date=<YYYY-MM-DD>.jsonl
+- These files are the input of export_parquet.py, which deletes a past day's file once it
+  is fully exported. Whatever is left is pruned after RETENTION_DAYS (checked once a day on
+  the first append), so history/ stays bounded even when the export never runs.
+"""
+
+import os
+import json
+import glob
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from diff_engine import diff, changed_items
+
+# -------------------- Config --------------------
+HISTORY_DIR = "history"
+RETENTION_DAYS = 7          # date=<day>.jsonl files older than this are deleted; 0 = keep forever
+
+
+def top_level(ladder, idx=0):
+    if isinstance(ladder, list) and len(ladder) > idx:
+        return ladder[idx].get("price"), ladder[idx].get("size")
+    if isinstance(ladder, dict) and idx == 0:
+        return ladder.get("price"), ladder.get("size")
+    return None, None
+
+
+def odds_row(ts: int, sport: str, market: Dict[str, Any], s: Dict[str, Any]) -> Dict[str, Any]:
+    back_price, back_size = top_level(s.get("availableToBack"))
+    lay_price, lay_size = top_level(s.get("availableToLay"))
+    return {
+        "ts": ts, "sport": sport,
+        "event_id": str(market.get("eventId", "")),
+        "market_id": str(market.get("marketId", "")),
+        "selection_id": str(s.get("selectionId", "")),
+        "runner_name": s.get("runnerName"),
+        "status": s.get("status"),
+        "back_price": back_price, "back_size": back_size,
+        "lay_price": lay_price, "lay_size": lay_size,
+        "last_price_traded": s.get("lastPriceTraded"),
+        "market_status": market.get("status"),
+        "total_matched": market.get("totalMatched"),
+        "version": market.get("version"),
+    }
+
+
+def fancy_row(ts: int, sport: str, event_id: str, version, m: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "ts": ts, "sport": sport, "event_id": str(event_id),
+        "market_id": m.get("apiSiteMarketId"),
+        "market_name": m.get("marketName"),
+        "status": m.get("status"),
+        "suspended": m.get("suspended"),
+        "ball_running": m.get("ballRunning"),
+        "auto_suspended": m.get("autoSuspended"),
+        "bet_allowed": m.get("betAllowed"),
+        "game_over": m.get("gameOver"),
+        "removed": bool(m.get("removed", False)),
+        "version": version,
+    }
+
+
+class HistoryWriter:
+    def __init__(self, base_dir: str = HISTORY_DIR, retention_days: int = RETENTION_DAYS):
+        self.base_dir = base_dir
+        self.retention_days = retention_days
+        self.last: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+        self.known_dirs = set()
+        self.day = None
+
+    def path_for(self, kind: str, sport: str, day: str) -> str:
+        return os.path.join(self.base_dir, kind, f"sport={sport}", f"date={day}.jsonl")
+
+    def _append(self, kind: str, sport: str, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        day = datetime.now().strftime("%Y-%m-%d")
+        path = self.path_for(kind, sport, day)
+        folder = os.path.dirname(path)
+        lines = "".join(json.dumps(r, ensure_ascii=False, separators=(',', ':')) + "\n" for r in rows)
+        with self.lock:
+            if day != self.day:
+                self.day = day
+                self.prune()
+            if folder not in self.known_dirs:
+                os.makedirs(folder, exist_ok=True)
+                self.known_dirs.add(folder)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+    def record_market(self, sport: str, market: Dict[str, Any]):
+        key = f"odds:{market.get('marketId')}"
+        old = self.last.get(key) or {"selections": []}
+        self.last[key] = market
+        changed = changed_items(diff(old, market), "selections")
+        if not changed:
+            return
+        ts = int(time.time() * 1000)
+        rows = [odds_row(ts, sport, market, s) for s in market.get("selections", [])
+                if str(s.get("selectionId")) in changed]
+        self._append("odds", sport, rows)
+
+    def record_fancy(self, sport: str, event_id: str, data: Dict[str, Any]):
+        key = f"fancy:{event_id}"
+        old = self.last.get(key) or {"dmFancyBetMarkets": []}
+        self.last[key] = data
+        changed = changed_items(diff({"dmFancyBetMarkets": old.get("dmFancyBetMarkets", [])},
+                                     {"dmFancyBetMarkets": data.get("dmFancyBetMarkets", [])}),
+                                "dmFancyBetMarkets")
+        if not changed:
+            return
+        ts = int(time.time() * 1000)
+        version = data.get("version")
+        rows = [fancy_row(ts, sport, event_id, version, m) for m in data.get("dmFancyBetMarkets", [])
+                if m.get("apiSiteMarketId") in changed]
+        rows += [fancy_row(ts, sport, event_id, version, {"apiSiteMarketId": mid, "removed": True})
+                 for mid, info in changed.items() if info["op"] == "remove"]
+        self._append("fancy", sport, rows)
+
+    def forget(self, key: str):
+        self.last.pop(key, None)
+
+    def prune(self, now: datetime = None) -> int:
+        """Delete history files older than retention_days; returns how many were removed."""
+        if not self.retention_days:
+            return 0
+        cutoff = ((now or datetime.now()) - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        removed = 0
+        for path in glob.glob(os.path.join(self.base_dir, "*", "sport=*", "date=*.jsonl")):
+            day = os.path.basename(path)[len("date="):-len(".jsonl")]
+            if day < cutoff:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError as e:
+                    print(f"⚠️ Couldn't remove {path}: {e}")
+        if removed:
+            print(f"🧹 History: removed {removed} files older than {self.retention_days} days")
+        return removed
+
+
+# -------------------- Shared instance --------------------
+_history = None
+
+def get_history() -> HistoryWriter:
+    global _history
+    if _history is None:
+        _history = HistoryWriter()
+    return _history
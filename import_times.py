@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Import-time measurements for every entry point
+- Imports each module in a fresh interpreter with  python -X importtime  and reports the
+  cumulative import time plus the heaviest modules it pulled in.
+- Importing must not connect anywhere or touch the filesystem beyond the script's own
+  folders; anything heavy belongs behind a first-use import.
+- Usage:  python import_times.py [module ...]
+"""
+
+import sys
+import subprocess
+from typing import Dict, List, Tuple
+
+# -------------------- Config --------------------
+ENTRY_POINTS = [
+    "redis_data", "scrap", "odds", "premium", "sharded",
+    "redis_reader", "redis_events", "redis_lease", "redis_codec",
+    "storage", "export_parquet", "diff_engine",
+]
+TOP_DEPENDENCIES = 3
+RUNS = 3   # best of N, the first run also pays for .pyc compilation
+
+
+def measure(module: str) -> Tuple[float, List[Tuple[float, str]], str]:
+    """(cumulative ms, [(ms, dependency)], error) for one fresh import."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, timeout=60)
+    total, deps, subtree = 0.0, [], []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        ms = int(cumulative) / 1000
+        if name.startswith("  "):
+            subtree.append((ms, name))  # children are printed before their parent
+            continue
+        if name.strip() == module:
+            total = ms
+            # direct imports of the entry point only, not what interpreter startup pulled in
+            deps = [(ms, dep.strip()) for ms, dep in subtree if not dep.startswith("     ")]
+            break
+        subtree = []
+    error = "" if proc.returncode == 0 else proc.stderr.strip().splitlines()[-1]
+    return total, sorted(deps, reverse=True)[:TOP_DEPENDENCIES], error
+
+
+def report(modules: List[str]) -> Dict[str, float]:
+    results = {}
+    print(f"{'entry point':<16}{'import ms':>10}   heaviest direct imports")
+    for module in modules:
+        runs = [measure(module) for _ in range(RUNS)]
+        total, deps, error = min(runs, key=lambda r: r[0] if not r[2] else float("inf"))
+        if error:
+            print(f"{module:<16}{'-':>10}   ❌ {error}")
+            continue
+        results[module] = total
+        print(f"{module:<16}{total:>10.1f}   " + ", ".join(f"{name} {ms:.1f}" for ms, name in deps))
+    return results
+
+
+if __name__ == "__main__":
+    report(sys.argv[1:] or ENTRY_POINTS)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Event lifecycle tracking for the long-running loops
+- seen() is called for every event a cycle touches; end_cycle() gets the live event ids.
+- An event finishes when it leaves play, reaches gameOver, or is the least recently seen
+  one while more than MAX_TRACKED_EVENTS are tracked.
+- On finish every registered hook runs (publisher / history / push server / renderer drop
+  their per-event state) and the event's files are pushed onto an expiry heap.
+- expire_files() pops only the files that are due: no directory listing on the hot path.
+- One lifecycle per feed (get_lifecycle("odds") / get_lifecycle("fancy")): a feed that still
+  sees an event must not reopen or re-finish it for another feed in the same process.
+"""
+
+import os
+import time
+import heapq
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Iterable, List
+
+# -------------------- Config --------------------
+MAX_TRACKED_EVENTS = 2000      # LRU cap on per-event state
+FILE_RETENTION = 24 * 3600     # seconds a finished event's files are kept
+
+
+class EventLifecycle:
+    def __init__(self, max_events: int = MAX_TRACKED_EVENTS, retention: int = FILE_RETENTION):
+        self.max_events = max_events
+        self.retention = retention
+        self.active: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.expiry: List[tuple] = []            # heap of (expire_at, path)
+        self.hooks: List[Callable] = []
+        self.closed = set()                      # finished by gameOver while still listed live
+        self.lock = threading.Lock()
+        self.finished = 0
+
+    def on_finish(self, hook: Callable[[str, Dict[str, Any]], None]):
+        """hook(event_id, info) runs once when an event finishes or is evicted."""
+        self.hooks.append(hook)
+
+    def seen(self, event_id, files: Iterable[str] = (), game_over: bool = False, **tags):
+        """Mark an event as live this cycle; tags (e.g. market_ids=[...]) are merged into its info."""
+        event_id = str(event_id)
+        if game_over and event_id in self.closed:
+            return
+        self.closed.discard(event_id)
+        evicted = []
+        with self.lock:
+            info = self.active.pop(event_id, None) or {"files": set(), "first_seen": time.time()}
+            self.active[event_id] = info
+            info["last_seen"] = time.time()
+            info["files"].update(files)
+            for k, v in tags.items():
+                info.setdefault(k, set()).update(v if isinstance(v, (list, tuple, set)) else [v])
+            while len(self.active) > self.max_events:
+                evicted.append(self.active.popitem(last=False))
+        for eid, old in evicted:
+            self._finish(eid, old, "evicted")
+        if game_over:
+            self.closed.add(event_id)
+            self.finish(event_id, "game over")
+
+    def finish(self, event_id, reason: str = "left play"):
+        with self.lock:
+            info = self.active.pop(str(event_id), None)
+        if info is not None:
+            self._finish(str(event_id), info, reason)
+
+    def _finish(self, event_id: str, info: Dict[str, Any], reason: str):
+        self.finished += 1
+        for hook in self.hooks:
+            try:
+                hook(event_id, info)
+            except Exception as e:
+                print(f"⚠️ Lifecycle hook error for {event_id}: {e}")
+        expire_at = time.time() + self.retention
+        with self.lock:
+            for path in info["files"]:
+                heapq.heappush(self.expiry, (expire_at, path))
+        print(f"🏁 Event {event_id} finished ({reason}) - {len(info['files'])} files expire in {self.retention}s")
+
+    def end_cycle(self, live_ids: Iterable):
+        """Finish every tracked event that is no longer in the live list."""
+        live = {str(e) for e in live_ids}
+        self.closed &= live
+        with self.lock:
+            gone = [eid for eid in self.active if eid not in live]
+        for eid in gone:
+            self.finish(eid)
+
+    def expire_files(self, now: float = None) -> int:
+        now = now or time.time()
+        removed = 0
+        while True:
+            with self.lock:
+                if not self.expiry or self.expiry[0][0] > now:
+                    break
+                _, path = heapq.heappop(self.expiry)
+                back_in_play = any(path in i["files"] for i in self.active.values())
+            if back_in_play:
+                continue  # the event came back into play and owns the file again
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"⚠️ Couldn't remove {path}: {e}")
+        return removed
+
+
+# -------------------- Shared instance --------------------
+_lifecycles = {}
+
+def get_lifecycle(feed: str) -> EventLifecycle:
+    if feed not in _lifecycles:
+        _lifecycles[feed] = EventLifecycle()
+    return _lifecycles[feed]
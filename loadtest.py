@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Load test: how many live events can one process keep at 1-second freshness?
+- Starts a synthetic upstream (queryEvents / queryFullMarkets / queryDMFancyBetMarkets) on
+  localhost in its own process, built from the MatchData / MarketData fixtures with prices
+  and fancy statuses changing on every request.
+- Points odds.py and premium.py at it and runs their normal run_cycle() back to back for
+  every step of the ramp: live events x fancy markets per event.
+- Per step and loop: cycle latency p50/p90/p99/max, CPU %, RSS, upstream requests/s,
+  upstream bytes, bytes written (write() syscalls of this process: files + HTTP requests).
+- A step breaks freshness when its p90 cycle latency exceeds TARGET_FRESHNESS; the report
+  names the last passing and the first failing event count per loop.
+- Everything is written to a scratch directory; Redis publishing is switched off.
+- The loops share one process, so switching loops first finishes the other loop's events
+  (its lifecycle hooks drop their history / renderer / push state) and resets the analytics:
+  a step only measures its own loop's work.
+- Usage:  python loadtest.py [--events 50,200,1000,5000] [--fancy 10,50] [--cycles 10]
+                            [--pipeline] [--out loadtest_report.json]
+"""
+
+import os
+import sys
+import copy
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing as mp
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+from typing import Any, Dict, List
+
+# -------------------- Config --------------------
+EVENT_STEPS = [50, 200, 1000, 5000]
+FANCY_STEPS = [10, 50]
+CYCLES_PER_STEP = 10
+TARGET_FRESHNESS = 1.0        # seconds; the odds / premium refresh interval
+FRESHNESS_PERCENTILE = 90
+PORT = 18765
+PRICE_CHURN = 0.3             # share of runners / fancy markets that change per request
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+API_PATH = "/exchange/member/playerService/"
+
+
+# -------------------- Synthetic upstream --------------------
+class Upstream:
+    def __init__(self):
+        with open(os.path.join(REPO_DIR, "MatchData_34807931.json"), "r", encoding="utf-8") as f:
+            self.market = json.load(f)["market"]
+        with open(os.path.join(REPO_DIR, "MarketData_34807931.json"), "r", encoding="utf-8") as f:
+            self.fancy = json.load(f)
+        self.events = 0
+        self.fancy_per_event = 0
+        self.requests = 0
+        self.bytes = 0
+
+    def query_events(self) -> Dict[str, Any]:
+        return {"events": [
+            {"eventId": 40000000 + i, "eventName": f"Team {i} A v Team {i} B", "competitionName": "Load Test League",
+             "eventType": 4, "isInPlay": 1, "market": {"marketId": f"1.9{i:08d}"}}
+            for i in range(self.events)
+        ]}
+
+    def full_market(self, event_id: str, market_id: str) -> Dict[str, Any]:
+        market = copy.deepcopy(self.market)
+        market.update(eventId=int(event_id), marketId=market_id, version=int(time.time() * 1000))
+        for s in market.get("selections", []):
+            if random.random() < PRICE_CHURN:
+                for side in ("availableToBack", "availableToLay"):
+                    for level in s.get(side) or []:
+                        level["price"] = round(level.get("price", 2.0) * random.uniform(0.98, 1.02), 2)
+                        level["size"] = round(random.uniform(10, 5000), 2)
+        return {"market": market}
+
+    def fancy_markets(self, event_id: str) -> Dict[str, Any]:
+        templates = self.fancy["dmFancyBetMarkets"]
+        markets = []
+        for k in range(self.fancy_per_event):
+            m = dict(templates[k % len(templates)])
+            m.update(apiSiteEventId=int(event_id), apiSiteMarketId=f"{event_id}-{k}", sort=k, gameOver=0)
+            if random.random() < PRICE_CHURN:
+                m.update(status=random.choice([1, 2]), suspended=random.choice([0, 1]),
+                         ballRunning=random.choice([0, 1]))
+            markets.append(m)
+        return {"dmFancyBetMarkets": markets, "dmFancyBetEvent": self.fancy.get("dmFancyBetEvent", {}),
+                "version": int(time.time() * 1000)}
+
+
+def serve(port: int):
+    upstream = Upstream()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, payload):
+            body = json.dumps(payload, separators=(',', ':')).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return len(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._send({"requests": upstream.requests, "bytes": upstream.bytes})
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path == "/config":
+                cfg = json.loads(raw)
+                upstream.events, upstream.fancy_per_event = cfg["events"], cfg["fancy"]
+                self._send(cfg)
+                return
+            form = {k: v[0] for k, v in parse_qs(raw.decode("utf-8")).items()}
+            name = self.path[len(API_PATH):] if self.path.startswith(API_PATH) else ""
+            if name == "queryEvents":
+                payload = upstream.query_events()
+            elif name == "queryFullMarkets":
+                payload = upstream.full_market(form.get("eventId", "0"), form.get("marketId", ""))
+            elif name == "queryDMFancyBetMarkets":
+                payload = upstream.fancy_markets(form.get("eventId", "0"))
+            else:
+                self.send_error(404)
+                return
+            sent = self._send(payload)
+            upstream.requests += 1
+            upstream.bytes += sent
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+# -------------------- Measurements --------------------
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]  # nearest rank
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def written_bytes():
+    try:
+        with open("/proc/self/io", "r") as f:
+            return int(next(l for l in f if l.startswith("wchar:")).split()[1])
+    except (OSError, StopIteration):
+        return None
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Harness:
+    def __init__(self, base_url: str, pipeline: bool):
+        import requests
+        self.http = requests
+        self.base_url = base_url
+        import odds
+        import premium
+        import console
+        console._renderer = console.ConsoleRenderer(quiet=True)  # one summary line per cycle
+        for module in (odds, premium):
+            module.PUBLISH_CHANGES = False
+        odds.EVENTS_URL = premium.EVENTS_URL = f"{base_url}{API_PATH}queryEvents"
+        odds.API_URL = f"{base_url}{API_PATH}queryFullMarkets"
+        premium.FANCY_URL = f"{base_url}{API_PATH}queryDMFancyBetMarkets"
+        self.loops = {
+            "odds": (odds.run_cycle, odds.build_pipeline() if pipeline else None),
+            "premium": (premium.run_cycle, premium.build_pipeline() if pipeline else None),
+        }
+        self.feeds = {"odds": "odds", "premium": "fancy"}  # loop -> lifecycle feed
+        self.current = None
+
+    def isolate(self, loop: str):
+        """Drop every other loop's per-event state before measuring this one."""
+        import analytics
+        from lifecycle import get_lifecycle
+        for other, feed in self.feeds.items():
+            if other != loop:
+                get_lifecycle(feed).end_cycle(())  # finish all its events: hooks run outside the measurement
+        analytics._analytics.clear()
+        self.current = loop
+
+    def upstream(self, path: str, payload=None) -> Dict[str, Any]:
+        if payload is None:
+            return self.http.get(self.base_url + path, timeout=10).json()
+        return self.http.post(self.base_url + path, data=json.dumps(payload), timeout=10).json()
+
+    def step(self, loop: str, events: int, fancy: int, cycles: int) -> Dict[str, Any]:
+        run_cycle, pipeline = self.loops[loop]
+        if loop != self.current:
+            self.isolate(loop)
+        self.upstream("/config", {"events": events, "fancy": fancy})
+        run_cycle(pipeline)  # warm-up: new events get their files / state created
+
+        before = self.upstream("/stats")
+        wrote, cpu, started = written_bytes(), cpu_seconds(), time.perf_counter()
+        latencies = []
+        for _ in range(cycles):
+            t = time.perf_counter()
+            run_cycle(pipeline)
+            latencies.append(time.perf_counter() - t)
+        wall = time.perf_counter() - started
+        after = self.upstream("/stats")
+        wrote_after = written_bytes()
+
+        p = percentile(latencies, FRESHNESS_PERCENTILE)
+        return {
+            "loop": loop, "events": events, "fancy_per_event": fancy if loop == "premium" else None,
+            "cycles": cycles,
+            "latency_s": {"p50": round(percentile(latencies, 50), 4), "p90": round(percentile(latencies, 90), 4),
+                          "p99": round(percentile(latencies, 99), 4), "max": round(max(latencies), 4)},
+            "cpu_percent": round((cpu_seconds() - cpu) / wall * 100, 1),
+            "rss_mb": round(rss_mb(), 1),
+            "upstream_rps": round((after["requests"] - before["requests"]) / wall, 1),
+            "upstream_bytes_per_cycle": int((after["bytes"] - before["bytes"]) / cycles),
+            "written_bytes_per_cycle": int((wrote_after - wrote) / cycles) if wrote is not None else None,
+            "fresh": p <= TARGET_FRESHNESS,
+        }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run(event_steps=EVENT_STEPS, fancy_steps=FANCY_STEPS, cycles=CYCLES_PER_STEP,
+        pipeline=False, out="loadtest_report.json", port=PORT) -> Dict[str, Any]:
+    out = os.path.abspath(out)
+    server = mp.Process(target=serve, args=(port,), daemon=True)
+    server.start()
+    time.sleep(0.5)
+
+    scratch = tempfile.mkdtemp(prefix="loadtest-")
+    os.chdir(scratch)           # odds / premium create and write their folders relative to cwd
+    sys.path.insert(0, REPO_DIR)
+    harness = Harness(f"http://127.0.0.1:{port}", pipeline)
+
+    steps, ceiling = [], {}
+    plan = [("odds", None)] + [("premium", f) for f in fancy_steps]
+    try:
+        for loop, fancy in plan:
+            label = loop if fancy is None else f"{loop} x{fancy} fancy"
+            ceiling[label] = {"last_fresh_events": None, "breaks_at_events": None}
+            for events in event_steps:
+                result = harness.step(loop, events, fancy or 0, cycles)
+                steps.append(result)
+                print(f"📈 {label:<20} {events:>6} events  p90 {result['latency_s']['p90']:.3f}s  "
+                      f"cpu {result['cpu_percent']}%  rss {result['rss_mb']} MB  "
+                      f"{result['upstream_rps']} req/s  {'✅' if result['fresh'] else '❌'}")
+                if not result["fresh"]:
+                    ceiling[label]["breaks_at_events"] = events
+                    break  # bigger steps only get slower
+                ceiling[label]["last_fresh_events"] = events
+    finally:
+        server.terminate()
+
+    report = {
+        "version": git_revision(),
+        "timestamp": int(time.time()),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "mode": "pipeline" if pipeline else "sequential",
+        "target_freshness_s": TARGET_FRESHNESS,
+        "freshness_percentile": FRESHNESS_PERCENTILE,
+        "ceiling": ceiling,
+        "steps": steps,
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"✅ Report -> {out} (scratch files in {scratch})")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ramp live events against a synthetic upstream.")
+    parser.add_argument("--events", default=",".join(map(str, EVENT_STEPS)))
+    parser.add_argument("--fancy", default=",".join(map(str, FANCY_STEPS)))
+    parser.add_argument("--cycles", type=int, default=CYCLES_PER_STEP)
+    parser.add_argument("--pipeline", action="store_true", help="use the staged pipeline mode")
+    parser.add_argument("--out", default="loadtest_report.json")
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+    run([int(x) for x in args.events.split(",")], [int(x) for x in args.fancy.split(",")],
+        args.cycles, args.pipeline, args.out, args.port)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Background writer for the local JSON mirrors
+- write(path, data) returns immediately; a small thread pool does the disk work.
+- Repeated writes to the same path coalesce: if a path is still queued (or being
+  written) the newer data replaces the queued one, so only the last version lands.
+- Directories that are known to exist are cached, so os.makedirs runs once per folder.
+- flush() is a barrier: it blocks until everything written so far is on disk.
+"""
+
+import os
+import json
+import threading
+from typing import Any, Dict
+
+# -------------------- Config --------------------
+MIRROR_WORKERS = 4
+
+
+class MirrorWriter:
+    def __init__(self, workers: int = MIRROR_WORKERS, indent: int = 2, verbose: bool = True):
+        self.workers = workers
+        self._pool = None         # created on the first write
+        self.indent = indent
+        self.verbose = verbose
+        self.cond = threading.Condition()
+        self.pending: Dict[str, Any] = {}   # path -> newest data not yet written
+        self.writing = set()                # paths currently being written
+        self.known_dirs = set()
+        self.stats = {"submitted": 0, "written": 0, "coalesced": 0, "errors": 0}
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="mirror")
+        return self._pool
+
+    def ensure_dir(self, folder: str):
+        if folder and folder not in self.known_dirs:
+            os.makedirs(folder, exist_ok=True)
+            self.known_dirs.add(folder)
+
+    def write(self, path: str, data: Any):
+        with self.cond:
+            self.stats["submitted"] += 1
+            if path in self.pending:
+                self.stats["coalesced"] += 1
+            start = path not in self.pending and path not in self.writing
+            self.pending[path] = data
+        if start:
+            self.pool.submit(self._write, path)
+
+    def _write(self, path: str):
+        with self.cond:
+            data = self.pending.pop(path)
+            self.writing.add(path)
+        try:
+            self.ensure_dir(os.path.dirname(path))
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=self.indent)
+            with self.cond:
+                self.stats["written"] += 1
+            if self.verbose:
+                print(f"💾 Saved -> {path}")
+        except Exception as e:
+            with self.cond:
+                self.stats["errors"] += 1
+            print(f"❌ File save error for {path}: {e}")
+        finally:
+            with self.cond:
+                self.writing.discard(path)
+                again = path in self.pending
+                if not again:
+                    self.cond.notify_all()
+            if again:
+                self.pool.submit(self._write, path)
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until every queued write has landed (barrier before reading files back)."""
+        with self.cond:
+            return self.cond.wait_for(lambda: not self.pending and not self.writing, timeout)
+
+    def close(self):
+        self.flush()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
@@ -1,7 +1,19 @@
 
 
-import os, json, time, requests
+import os, json, time
 from datetime import datetime,date
+from console import get_renderer
+from redis_events import get_publisher
+from push_server import get_live_state, start_push_server
+from redis_lease import filter_owned
+from pipeline import Pipeline
+from storage import get_storage
+from history import get_history
+from lifecycle import get_lifecycle
+from profiler import get_profiler
+from upstream import get_post
+from subscriptions import get_scheduler
+from analytics import get_analytics
 
 # -------------------- Directory --------------------
 SAVE_DIR = "odds"  # 🔹 Everything goes into this folder
@@ -22,18 +34,29 @@ HEADERS = {
 
 SELECTION_TS = int(time.time() * 1000)  # timestamp for market request
 REFRESH_INTERVAL = 1
+SPORT = "cricket"  # eventType 4
+PUBLISH_CHANGES = False  # push market / runner deltas to the Redis change stream (set EVENTS_REDIS_URL)
+PUSH_SERVER = False  # serve live state to SSE / WebSocket clients (see push_server.py)
+LEASING = False  # only scrape events whose shard this node leased (see redis_lease.py)
+PIPELINE = False  # fetch / transform / persist on separate bounded stages (see pipeline.py)
+FETCH_WORKERS, TRANSFORM_WORKERS = 8, 2
+HISTORY = False  # append changed runners to history/ for the daily Parquet export (adds a diff + file append per market to the hot path)
+DEMAND_POLLING = False  # full rate only for subscribed events, the rest in the background (see subscriptions.py)
+ANALYTICS = True  # implied probability / overround / spread / movement per cycle -> analytics.json (see analytics.py)
 
 # -------------------- Helpers --------------------
 def fetch_json(url, payload):
+    """Decoded JSON body, None when the request failed."""
     try:
-        r = requests.post(url, headers=HEADERS, data=payload, timeout=10)
+        post = get_post()
+        r = post(url, headers=HEADERS, data=payload, timeout=10)
         if r.status_code != 200 or not r.text.strip():
             print(f"Error fetching: {r.status_code}")
-            return {}
+            return None
         return r.json()
     except Exception as e:
         print(f"Request error: {e}")
-        return {}
+        return None
 
 def save_json(data, filename):
     path = os.path.join(SAVE_DIR, filename)
@@ -41,31 +64,23 @@ def save_json(data, filename):
         json.dump(data, f, indent=2, ensure_ascii=False)
     return path
 
-def print_market(market):
-    print(f"\n🏏 {market.get('eventName', 'Match')} | {market.get('marketName')}")
-    print(f" Total Matched: {market.get('totalMatched',0)}")
+def top_price(data):
+    """Best price from an availableToBack / availableToLay ladder (list or dict)."""
+    if isinstance(data, list) and len(data) > 0:
+        return data[0].get("price", "-")
+    if isinstance(data, dict):
+        return data.get("price", "-")
+    return "-"
 
+def print_market(market):
+    """Hand the market to the console renderer (only changed runners get printed)."""
+    rows = {"Total Matched": market.get('totalMatched', 0)}
     for s in market.get("selections", []):
-        back_data = s.get("availableToBack")
-        lay_data = s.get("availableToLay")
-
-        # Safely extract back and lay price
-        if isinstance(back_data, list) and len(back_data) > 0:
-            back = back_data[0].get("price", "-")
-        elif isinstance(back_data, dict):
-            back = back_data.get("price", "-")
-        else:
-            back = "-"
-
-        if isinstance(lay_data, list) and len(lay_data) > 0:
-            lay = lay_data[0].get("price", "-")
-        elif isinstance(lay_data, dict):
-            lay = lay_data.get("price", "-")
-        else:
-            lay = "-"
-
-        print(f"{s.get('runnerName','-'):20} | Back: {back:<6} | Lay: {lay:<6}")
-
+        back = top_price(s.get("availableToBack"))
+        lay = top_price(s.get("availableToLay"))
+        rows[s.get('runnerName', '-')] = (f"Back: {back:<6}", f"Lay: {lay:<6}")
+    title = f"🏏 {market.get('eventName', 'Match')} | {market.get('marketName')}"
+    get_renderer().update(f"odds:{market.get('marketId')}", title, rows)
         
 def cleanup_old_files():
     today = date.today()
@@ -75,11 +90,12 @@ def cleanup_old_files():
             continue
         if datetime.fromtimestamp(os.path.getmtime(p)).date() < today:
             os.remove(p)
-            print(f"🗑️ Removed old file: {f}")
+            get_renderer().message(f"🗑️ Removed old file: {f}")
 
 
 # -------------------- Fetch Live Matches --------------------
 def get_live_matches():
+    """Live matches, None when discovery failed (not the same as "nothing in play")."""
     payload = {
         "type": "1",
         "eventType": "4",
@@ -90,6 +106,9 @@ def get_live_matches():
         "collectEventIds": ""
     }
     data = fetch_json(EVENTS_URL, payload)
+    if data is None:
+        get_renderer().message("⚠️ Live match discovery failed - keeping the tracked matches.")
+        return None
     events = [
         {
             "event_id": e["eventId"],
@@ -99,7 +118,7 @@ def get_live_matches():
         for e in data.get("events", [])
         if e.get("isInPlay") == 1 and e.get("market")
     ]
-    print(f"✅ {len(events)} live matches fetched.")
+    get_renderer().message(f"✅ {len(events)} live matches fetched.")
     return events
 
 # -------------------- Fetch Market Data --------------------
@@ -110,31 +129,136 @@ def get_market(event_id, market_id):
         "selectionTs": SELECTION_TS,
         "isGetRunnerMetadata": "false"
     }
-    return fetch_json(API_URL, payload).get("market", {})
+    return (fetch_json(API_URL, payload) or {}).get("market", {})
+
+# -------------------- Event Lifecycle --------------------
+def forget_event(event_id, info):
+    """Drop every piece of per-event state once the match left play."""
+    market_ids = sorted(info.get("market_ids", ()))
+    get_publisher().forget_event(event_id, market_ids)
+    get_live_state().remove_event(event_id, "market")
+    for market_id in market_ids:
+        get_history().forget(f"odds:{market_id}")
+        get_renderer().forget(f"odds:{market_id}")
+    get_analytics("odds").forget(market_ids)
+    if get_storage():
+        get_storage().delete_event(event_id, "odds", "odds_match")
+
+get_lifecycle("odds").on_finish(forget_event)
+
+# -------------------- Stages --------------------
+def fetch_stage(match):
+    market = get_market(match["event_id"], match["market_id"])
+    if not market:
+        get_renderer().message(f"No market data for {match['name']}")
+        return None
+    return match, market
+
+def transform_stage(item):
+    match, market = item
+    print_market(market)
+    events = get_publisher().market_events(market) if PUBLISH_CHANGES else []
+    return match, market, events
+
+def persist_batch(items):
+    """Write a batch of markets: JSON files, push server state, one Redis round trip."""
+    events = []
+    store = get_storage()
+    for match, market, market_events in items:
+        summary = {"event_id": match["event_id"], "name": match["name"]}
+        if store:
+            store.put("odds", match["event_id"], market, sport=SPORT, event_id=match["event_id"])
+            store.put("odds_match", match["event_id"], summary, sport=SPORT, event_id=match["event_id"])
+        else:
+            # Save market JSON
+            save_json(market, f"market_{match['event_id']}.json")
+            # Optional: also save match summary if needed
+            save_json(summary, f"match_{match['event_id']}.json")
+        if PUSH_SERVER:
+            get_live_state().update_market(SPORT, market)
+        if HISTORY:
+            get_history().record_market(SPORT, market)
+        if ANALYTICS:
+            get_analytics("odds").add(market.get("marketId"), market.get("selections"),
+                                      event_id=match["event_id"], sport=SPORT)
+        files = [] if store else [os.path.join(SAVE_DIR, f"market_{match['event_id']}.json"),
+                                  os.path.join(SAVE_DIR, f"match_{match['event_id']}.json")]
+        get_lifecycle("odds").seen(match["event_id"], files, market_ids=[str(market.get("marketId", ""))])
+        events += market_events
+    if events:
+        get_publisher().publish(SPORT, events)
+
+def build_pipeline():
+    return (Pipeline("odds")
+            .stage("fetch", fetch_stage, workers=FETCH_WORKERS)
+            .stage("transform", transform_stage, workers=TRANSFORM_WORKERS)
+            .sink("persist", persist_batch)
+            .start())
+
+def publish_analytics():
+    """Compute the cycle's market analytics in one batch and write them next to the markets."""
+    analytics = get_analytics("odds")
+    doc = analytics.end_cycle()
+    if not doc:
+        return
+    if get_storage():
+        get_storage().put("analytics", "odds", doc, sport=SPORT)
+    else:
+        save_json(doc, "analytics.json")
+    get_renderer().message(analytics.metrics_line(doc))
 
 # -------------------- Main Loop --------------------
-def main():
+def process_match(match):
+    """Fetch, render, publish and save one live match's market."""
+    item = fetch_stage(match)
+    if not item:
+        return {}
+    persist_batch([transform_stage(item)])
+    return item[1]
+
+def main(pipeline=None):
     matches = get_live_matches()
+    if matches is None:
+        return  # a failed discovery must not finish every tracked event
+    if LEASING:
+        matches = filter_owned(matches, loop="odds")
+    # events that left play (or moved to another node) drop their state here
+    get_lifecycle("odds").end_cycle(m["event_id"] for m in matches)
     if not matches:
-        print("No live matches found.")
+        get_renderer().message("No live matches found.")
         return
+    if DEMAND_POLLING:
+        scheduler = get_scheduler("odds", REFRESH_INTERVAL)
+        matches = scheduler.select(matches, SPORT, market_field="market_id")
+        get_renderer().message(scheduler.metrics_line())
 
+    if pipeline:
+        for match in matches:
+            pipeline.put(match)
+        pipeline.drain()
+        get_renderer().message(pipeline.metrics_line())
+        return
     for match in matches:
-        market = get_market(match["event_id"], match["market_id"])
-        if market:
-            print_market(market)
-            # Save market JSON
-            save_json(market, f"market_{match['event_id']}.json")
-            # Optional: also save match summary if needed
-            save_json({"event_id": match["event_id"], "name": match["name"]}, f"match_{match['event_id']}.json")
-        else:
-            print(f"No market data for {match['name']}")
+        process_match(match)
+
+def run_cycle(pipeline=None):
+    """One tick: scrape + publish, analytics, expire finished events' files, commit, render."""
+    main(pipeline)
+    if ANALYTICS:
+        publish_analytics()
+    get_lifecycle("odds").expire_files()
+    if get_storage():
+        get_storage().commit()  # one transaction per cycle
+    get_renderer().end_cycle("odds")
 
 # -------------------- Run --------------------
 if __name__ == "__main__":
+    if PUSH_SERVER:
+        start_push_server()
+    pipeline = build_pipeline() if PIPELINE else None
+    cleanup_old_files()  # 🧹 remove files left over from earlier runs (once, not per tick)
+    profiler = get_profiler("odds", slow_after=REFRESH_INTERVAL)
     while True:
-        cleanup_old_files()  # 🧹 remove yesterday’s data first
-        print(f"\n==============================\n⏰ Fetching LIVE data @ {datetime.now():%H:%M:%S}\n==============================")
-        main()
-        print(f"\n⏳ Waiting {REFRESH_INTERVAL} seconds before next fetch...\n")
+        with profiler.cycle():  # no-op unless PROFILE=1
+            run_cycle(pipeline)
         time.sleep(REFRESH_INTERVAL)
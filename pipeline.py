@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Staged producer/consumer pipeline used by scrap.py, odds.py and premium.py
+- stage(): N worker threads take items from a bounded queue, transform them and put
+  the result on the next stage's queue. A full queue blocks the stage before it,
+  so a slow persist stage pushes back all the way to fetching.
+- sink(): last stage; collects up to batch_size items (or whatever arrived within
+  max_wait) and hands the whole batch to one call, so file + Redis writes are batched.
+- drain() blocks until every item put this cycle went through the sink.
+- metrics() reports queue depth, throughput and errors per stage.
+"""
+
+import time
+import queue
+import threading
+from typing import Callable, Dict, Any, List, Optional
+
+# -------------------- Config --------------------
+QUEUE_SIZE = 64
+BATCH_SIZE = 50
+BATCH_WAIT = 0.05   # seconds the sink waits for more items before flushing a partial batch
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable, workers: int, queue_size: int,
+                 fan_out: bool = False, batch_size: int = 0, max_wait: float = BATCH_WAIT):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.fan_out = fan_out
+        self.batch_size = batch_size          # > 0 -> sink stage
+        self.max_wait = max_wait
+        self.inbox: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.next: Optional["Stage"] = None
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.batches = 0
+        self.lock = threading.Lock()
+
+    def _emit(self, result):
+        if result is None or self.next is None:
+            return
+        if self.fan_out:
+            for r in result:
+                self.next.inbox.put(r)      # blocks while the next stage is full
+        else:
+            self.next.inbox.put(result)
+
+    def run(self, stop: threading.Event):
+        if self.batch_size:
+            return self._run_sink(stop)
+        while not stop.is_set():
+            try:
+                item = self.inbox.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            started = time.perf_counter()
+            try:
+                self._emit(self.func(item))
+                ok = True
+            except Exception as e:
+                print(f"❌ Pipeline stage {self.name} error: {e}")
+                ok = False
+            finally:
+                with self.lock:
+                    self.processed += 1
+                    self.errors += 0 if ok else 1
+                    self.busy_seconds += time.perf_counter() - started
+                self.inbox.task_done()
+
+    def _run_sink(self, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                batch = [self.inbox.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.inbox.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            started = time.perf_counter()
+            try:
+                self.func(batch)
+            except Exception as e:
+                print(f"❌ Pipeline sink {self.name} error: {e}")
+                with self.lock:
+                    self.errors += len(batch)
+            finally:
+                with self.lock:
+                    self.processed += len(batch)
+                    self.batches += 1
+                    self.busy_seconds += time.perf_counter() - started
+                for _ in batch:
+                    self.inbox.task_done()
+
+
+class Pipeline:
+    def __init__(self, name: str):
+        self.name = name
+        self.stages: List[Stage] = []
+        self.threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+
+    def _add(self, stage: Stage) -> "Pipeline":
+        if self.stages:
+            self.stages[-1].next = stage
+        self.stages.append(stage)
+        return self
+
+    def stage(self, name: str, func: Callable, workers: int = 1, queue_size: int = QUEUE_SIZE,
+              fan_out: bool = False) -> "Pipeline":
+        """func(item) -> item for the next stage (None drops it; iterable when fan_out)."""
+        return self._add(Stage(name, func, workers, queue_size, fan_out=fan_out))
+
+    def sink(self, name: str, func: Callable, batch_size: int = BATCH_SIZE,
+             queue_size: int = QUEUE_SIZE, max_wait: float = BATCH_WAIT) -> "Pipeline":
+        """func(list_of_items); always a single worker so writes stay ordered."""
+        return self._add(Stage(name, func, 1, queue_size, batch_size=batch_size, max_wait=max_wait))
+
+    def start(self) -> "Pipeline":
+        for stage in self.stages:
+            for i in range(stage.workers):
+                t = threading.Thread(target=stage.run, args=(self._stop,),
+                                     name=f"{self.name}-{stage.name}-{i}", daemon=True)
+                t.start()
+                self.threads.append(t)
+        return self
+
+    def put(self, item):
+        """Feed the first stage; blocks while it is full."""
+        self.stages[0].inbox.put(item)
+
+    def drain(self):
+        """Wait until everything fed so far has passed through every stage."""
+        for stage in self.stages:
+            stage.inbox.join()
+
+    def stop(self):
+        self.drain()
+        self._stop.set()
+        for t in self.threads:
+            t.join(timeout=1)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for s in self.stages:
+            with s.lock:
+                out[s.name] = {
+                    "workers": s.workers,
+                    "depth": s.inbox.qsize(),
+                    "capacity": s.inbox.maxsize,
+                    "processed": s.processed,
+                    "errors": s.errors,
+                    "busy_seconds": round(s.busy_seconds, 3),
+                }
+                if s.batch_size:
+                    out[s.name]["batches"] = s.batches
+        return out
+
+    def metrics_line(self) -> str:
+        parts = [f"{name} {m['depth']}/{m['capacity']} ({m['processed']} done, {m['errors']} err)"
+                 for name, m in self.metrics().items()]
+        return f"📈 {self.name} pipeline: " + " | ".join(parts)
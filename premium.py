@@ -1,7 +1,19 @@
 
 
-import os, json, time, requests
+import os, json, time
 from datetime import datetime, date
+from console import get_renderer
+from redis_events import get_publisher
+from push_server import get_live_state, start_push_server
+from redis_lease import filter_owned
+from pipeline import Pipeline
+from storage import get_storage
+from history import get_history
+from lifecycle import get_lifecycle
+from profiler import get_profiler
+from fancy_store import get_fancy_store
+from upstream import get_post
+from subscriptions import get_scheduler
 
 # ------------------- Directories -------------------
 SAVE_DIR = "fancy"  
@@ -27,17 +39,28 @@ COOKIES = {
 }
 
 REFRESH_INTERVAL = 1 
+SPORT = "cricket"  # eventType 4
+PUBLISH_CHANGES = False  # push fancy status deltas to the Redis change stream (set EVENTS_REDIS_URL)
+PUSH_SERVER = False  # serve live state to SSE / WebSocket clients (see push_server.py)
+LEASING = False  # only scrape events whose shard this node leased (see redis_lease.py)
+PIPELINE = False  # fetch / transform / persist on separate bounded stages (see pipeline.py)
+FETCH_WORKERS = 8
+TRANSFORM_WORKERS = 4  # only used with REDIS_MERGE; the local merge needs a single worker
+REDIS_MERGE = False  # merge fancy deltas server-side in Redis with one Lua call (see fancy_store.py)
+HISTORY = False  # append changed fancy markets to history/ for the daily Parquet export (adds a diff + file append per event to the hot path)
+DEMAND_POLLING = False  # full rate only for subscribed events, the rest in the background (see subscriptions.py)
 
 # ------------------- Helpers -------------------
 def fetch_json(url, payload):
-    """Send POST and return JSON."""
+    """Send POST and return JSON, None when the request failed."""
     try:
-        r = requests.post(url, headers=HEADERS, cookies=COOKIES, data=payload, timeout=10)
+        post = get_post()
+        r = post(url, headers=HEADERS, cookies=COOKIES, data=payload, timeout=10)
         r.raise_for_status()
         return r.json()
     except Exception as e:
         print(f" Request error: {e}")
-        return {}
+        return None
 
 def save_json(event_id, data):
     """Save market JSON for an event."""
@@ -69,21 +92,27 @@ def merge_markets(old_data, new_data):
 
 def load_old_data(event_id):
     """Load previously saved JSON data if exists."""
+    store = get_storage()
+    if store:
+        return store.get("fancy", event_id) or {"dmFancyBetMarkets": [], "dmFancyBetEvent": {}, "version": 0}
     save_file = os.path.join(SAVE_DIR, f"MarketData_{event_id}.json")
     if os.path.exists(save_file):
         with open(save_file, "r", encoding="utf-8") as f:
             return json.load(f)
     return {"dmFancyBetMarkets": [], "dmFancyBetEvent": {}, "version": 0}
 
-def print_fancy(data):
-    """Print market details in console."""
+def print_fancy(data, event_id=None):
+    """Hand market details to the console renderer (only changed status flags get printed)."""
     dm_markets = data.get("dmFancyBetMarkets", [])
     if not dm_markets:
-        print(" No fancy markets found.")
         return
-    print(f"\n Event: {dm_markets[0].get('eventName','Unknown')} | Total Markets: {len(dm_markets)}")
-    for m in dm_markets:
-        print(f" {m.get('marketName','Unknown Market')} | Status: {m.get('status')} | Suspended: {m.get('suspended')}")
+    title = f" Event: {dm_markets[0].get('eventName','Unknown')} | Total Markets: {len(dm_markets)}"
+    rows = {
+        m.get('marketName', 'Unknown Market'): (f"Status: {m.get('status')}", f"Suspended: {m.get('suspended')}")
+        for m in dm_markets
+    }
+    event_id = event_id or dm_markets[0].get("apiSiteEventId")
+    get_renderer().update(f"fancy:{event_id}", title, rows)
 
 # ------------------- File Cleanup -------------------
 def cleanup_old_files():
@@ -99,6 +128,7 @@ def cleanup_old_files():
 
 # ------------------- Fetch Live Matches -------------------
 def get_live_matches():
+    """Live events, None when discovery failed (not the same as "nothing in play")."""
     payload = {
         "type": "1",
         "eventType": "4",
@@ -109,6 +139,9 @@ def get_live_matches():
         "collectEventIds": ""
     }
     data = fetch_json(EVENTS_URL, payload)
+    if data is None:
+        get_renderer().message("⚠️ Live event discovery failed - keeping the tracked events.")
+        return None
     events = [
         {
             "event_id": str(e["eventId"]),
@@ -118,7 +151,7 @@ def get_live_matches():
         for e in data.get("events", [])
         if e.get("isInPlay") == 1
     ]
-    print(f"{len(events)} live events fetched.")
+    get_renderer().message(f"{len(events)} live events fetched.")
     return events
 
 # ------------------- Fetch Fancy Markets -------------------
@@ -132,26 +165,121 @@ def fetch_fancy(event_id, market_ids):
         "marketIds": ",".join(market_ids),
         "isDynamicUpdate": "0"
     }
-    return fetch_json(FANCY_URL, payload)
+    return fetch_json(FANCY_URL, payload) or {}
+
+# ------------------- Stages -------------------
+def fetch_stage(event):
+    return event["event_id"], fetch_fancy(event["event_id"], event["market_ids"])
+
+def merge_event(event_id, data):
+    """Merge a fetched delta into the stored document (Redis Lua script or local file / SQLite)."""
+    if REDIS_MERGE:
+        try:
+            return get_fancy_store().merge(SPORT, event_id, data)
+        except Exception as e:
+            print(f" Redis merge error for {event_id}: {e} - merging locally")
+            merged = merge_markets(load_old_data(event_id), data)
+            get_fancy_store().reseed(SPORT, event_id, merged)  # Redis missed this delta
+            return merged
+    return merge_markets(load_old_data(event_id), data)
+
+def transform_stage(item):
+    event_id, data = item
+    merged_data = merge_event(event_id, data)
+    print_fancy(merged_data, event_id)
+    events = get_publisher().fancy_events(event_id, merged_data) if PUBLISH_CHANGES else []
+    return event_id, merged_data, events
+
+# ------------------- Event Lifecycle -------------------
+def is_game_over(data):
+    markets = data.get("dmFancyBetMarkets") or []
+    return bool(markets) and all(m.get("gameOver") == 1 for m in markets)
+
+def forget_event(event_id, info):
+    """Drop every piece of per-event state once the event finished."""
+    get_publisher().forget_event(event_id)
+    get_history().forget(f"fancy:{event_id}")
+    get_live_state().remove_event(event_id, "fancy")
+    get_renderer().forget(f"fancy:{event_id}")
+    if REDIS_MERGE:
+        get_fancy_store().forget(SPORT, event_id)
+    if get_storage():
+        get_storage().delete_event(event_id, "fancy")
+
+get_lifecycle("fancy").on_finish(forget_event)
+
+def persist_batch(items):
+    """Write a batch of fancy documents: JSON files, push server state, one Redis round trip."""
+    events = []
+    store = get_storage()
+    for event_id, merged_data, fancy_events in items:
+        if store:
+            store.put("fancy", event_id, merged_data, sport=SPORT, event_id=event_id)
+        else:
+            save_json(event_id, merged_data)
+        if PUSH_SERVER:
+            get_live_state().update_fancy(SPORT, event_id, merged_data)
+        if HISTORY:
+            get_history().record_fancy(SPORT, event_id, merged_data)
+        files = [] if store else [os.path.join(SAVE_DIR, f"MarketData_{event_id}.json")]
+        get_lifecycle("fancy").seen(event_id, files, game_over=is_game_over(merged_data))
+        events += fancy_events
+    if events:
+        get_publisher().publish(SPORT, events)
+
+def build_pipeline():
+    # the local merge reads the file the persist stage writes, so an event must not be merged
+    # twice in parallel; the Redis merge is atomic per event and can run on several workers
+    return (Pipeline("fancy")
+            .stage("fetch", fetch_stage, workers=FETCH_WORKERS)
+            .stage("transform", transform_stage, workers=TRANSFORM_WORKERS if REDIS_MERGE else 1)
+            .sink("persist", persist_batch)
+            .start())
+
+def process_event(event):
+    """Fetch, merge, save, publish and render one live event's fancy markets."""
+    item = transform_stage(fetch_stage(event))
+    persist_batch([item])
+    return item[1]
+
+def run_cycle(pipeline=None):
+    """One tick: fetch + merge + publish every live event, expire finished files, commit, render."""
+    try:
+        events = get_live_matches()
+        if events is not None:  # a failed discovery must not finish every tracked event
+            if LEASING:
+                events = filter_owned(events, loop="fancy")
+            get_lifecycle("fancy").end_cycle(e["event_id"] for e in events)
+            if DEMAND_POLLING:
+                scheduler = get_scheduler("fancy", REFRESH_INTERVAL)
+                events = scheduler.select(events, SPORT)
+                get_renderer().message(scheduler.metrics_line())
+
+            if pipeline:
+                for event in events:
+                    pipeline.put(event)
+                pipeline.drain()
+                get_renderer().message(pipeline.metrics_line())
+            else:
+                for event in events:
+                    process_event(event)
+
+    except Exception as e:
+        print(f" Error: {e}")
+    get_lifecycle("fancy").expire_files()
+    if get_storage():
+        get_storage().commit()  # one transaction per cycle
+    get_renderer().end_cycle("fancy")
 
 # ------------------- Main Loop -------------------
 if __name__ == "__main__":
     print("🔁 Fetching dynamic Fancy data for all live events ...")
+    if PUSH_SERVER:
+        start_push_server()
+    pipeline = build_pipeline() if PIPELINE else None
+    cleanup_old_files()  #  remove files left over from earlier runs (once, not per tick)
+    profiler = get_profiler("premium", slow_after=REFRESH_INTERVAL)
     while True:
-        try:
-            cleanup_old_files()  #  remove yesterday’s data first
-            events = get_live_matches()
-
-            for event in events:
-                event_id = event["event_id"]
-                market_ids = event["market_ids"]
-                data = fetch_fancy(event_id, market_ids)
-                old_data = load_old_data(event_id)
-                merged_data = merge_markets(old_data, data)
-                save_json(event_id, merged_data)
-                print_fancy(merged_data)
-                print(f"\n✅ MarketData_{event_id}.json updated ({len(merged_data['dmFancyBetMarkets'])} markets)\n")
-
-        except Exception as e:
-            print(f" Error: {e}")
+        with profiler.cycle():  # no-op unless PROFILE=1
+            run_cycle(pipeline)
         time.sleep(REFRESH_INTERVAL)
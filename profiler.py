@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Per-cycle profiling for the long-running loops (scrap, odds, premium, redis_data)
+- Switched on with PROFILE=1 in the environment (or PROFILE = True below). When off,
+  cycle() is an empty context manager: no profiler, no tracemalloc.
+- When on, every cycle runs under cProfile; the profile is kept only for every
+  PROFILE_EVERY-th cycle or for a cycle slower than its slow_after threshold.
+- tracemalloc snapshots are compared every TRACEMALLOC_EVERY seconds; the biggest growth
+  since the previous and since the first snapshot is written next to the profiles.
+- Output: profiles/<loop>/<time>_cycle<N>_<ms>ms.prof (+ .txt top functions) and
+  profiles/<loop>/<time>_memory.txt. Only the newest KEEP_FILES per loop are kept.
+- Read a profile with:  python -m pstats profiles/odds/<file>.prof
+"""
+
+import os
+import io
+import time
+from contextlib import contextmanager
+
+# -------------------- Config --------------------
+PROFILE = os.environ.get("PROFILE", "0") == "1"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_EVERY = int(os.environ.get("PROFILE_EVERY", "100"))   # keep every Nth cycle
+PROFILE_SLOW = float(os.environ.get("PROFILE_SLOW", "0"))     # seconds; 0 = the loop's own threshold
+TRACEMALLOC_EVERY = 300     # seconds between allocation snapshots
+TRACEMALLOC_FRAMES = 5
+TOP_LINES = 25
+KEEP_FILES = 50
+
+
+class CycleProfiler:
+    def __init__(self, name: str, slow_after: float = 5.0, every: int = PROFILE_EVERY, enabled: bool = PROFILE):
+        self.name = name
+        self.slow_after = PROFILE_SLOW or slow_after
+        self.every = every
+        self.enabled = enabled
+        self.folder = os.path.join(PROFILE_DIR, name)
+        self.cycles = 0
+        self.kept = 0
+        self.first_snapshot = None
+        self.last_snapshot = None
+        self.last_snapshot_at = 0.0
+
+    @contextmanager
+    def cycle(self):
+        if not self.enabled:
+            yield
+            return
+        import cProfile
+        self.cycles += 1
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            spent = time.perf_counter() - started
+            if self.cycles % self.every == 0 or spent > self.slow_after:
+                self._save(profile, spent)
+            self._memory()
+
+    # ---------- CPU profiles ----------
+    def _save(self, profile, spent: float):
+        import pstats
+        os.makedirs(self.folder, exist_ok=True)
+        reason = "slow" if spent > self.slow_after else "sample"
+        base = os.path.join(self.folder, f"{time.strftime('%Y%m%d-%H%M%S')}_cycle{self.cycles}_{spent * 1000:.0f}ms")
+        profile.dump_stats(base + ".prof")
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(TOP_LINES)
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+        self.kept += 1
+        print(f"🔬 {self.name}: cycle {self.cycles} took {spent:.2f}s ({reason}) -> {base}.prof")
+        self._rotate()
+
+    # ---------- allocation tracking ----------
+    def _memory(self):
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self.last_snapshot_at = time.monotonic()
+            return
+        if time.monotonic() - self.last_snapshot_at < TRACEMALLOC_EVERY:
+            return
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ])
+        self.last_snapshot_at = time.monotonic()
+        if self.last_snapshot is None:
+            self.first_snapshot = self.last_snapshot = snapshot
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        since_last = snapshot.compare_to(self.last_snapshot, "lineno")
+        since_start = snapshot.compare_to(self.first_snapshot, "lineno")
+        self.last_snapshot = snapshot
+
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, f"{time.strftime('%Y%m%d-%H%M%S')}_memory.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"traced {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB) after {self.cycles} cycles\n")
+            f.write(f"\n# growth since previous snapshot ({TRACEMALLOC_EVERY}s)\n")
+            f.writelines(f"{stat}\n" for stat in since_last[:TOP_LINES])
+            f.write("\n# growth since first snapshot\n")
+            f.writelines(f"{stat}\n" for stat in since_start[:TOP_LINES])
+        growth = sum(stat.size_diff for stat in since_last)
+        print(f"🧠 {self.name}: traced {current / 1e6:.1f} MB ({growth / 1e6:+.2f} MB since last snapshot) -> {path}")
+        self._rotate()
+
+    def _rotate(self):
+        files = sorted(os.listdir(self.folder))  # names start with the time: oldest first
+        for name in files[:max(0, len(files) - KEEP_FILES)]:
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                pass
+
+
+# -------------------- Shared instances --------------------
+_profilers = {}
+
+def get_profiler(name: str, slow_after: float = 5.0) -> CycleProfiler:
+    if name not in _profilers:
+        _profilers[name] = CycleProfiler(name, slow_after)
+    return _profilers[name]
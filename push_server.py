@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Live odds / fancy fan-out server (SSE + WebSocket, stdlib only)
+- odds.py / premium.py push every fetched market / fancy document into LiveState.
+- Clients connect to  /sse  or  /ws  with optional filters
+    ?sport=cricket&eventId=34807931,34807932&marketId=1.248622840
+  and receive one "snapshot" message followed by "diff" messages carrying a
+  diff_engine patch for one document, and a "remove" message (with the document key) when
+  a document's event finished.
+- /snapshot returns the current filtered state once as JSON.
+- With REGISTER_INTEREST (turn it on together with a loop's DEMAND_POLLING), a connected /sse
+  or /ws client's filters are registered in the subscription registry (subscriptions.py), so
+  demand-driven polling keeps its events at full rate. The Redis writes happen on one
+  background thread, never on a client's stream.
+- Slow consumers never buffer without limit: each client holds at most one pending
+  message per document. If a document changes again before the previous diff was sent,
+  the queued diff is dropped and the client gets a fresh copy of that document instead.
+- Client frames on /ws are read on a small reader thread: pings are answered, pongs noted,
+  a close frame is echoed and ends the stream; a client that hangs up ends it too.
+- /ws clients get a ping every HEARTBEAT_SECONDS even while data flows; one that sends no
+  pong for PONG_TIMEOUT is treated as dead and dropped.
+"""
+
+import os
+import json
+import time
+import base64
+import socket
+import hashlib
+import queue
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Any, Optional
+
+from diff_engine import diff
+from subscriptions import get_registry
+
+# -------------------- Config --------------------
+PUSH_HOST = "0.0.0.0"
+PUSH_PORT = 8765
+HEARTBEAT_SECONDS = 15
+PONG_TIMEOUT = 3 * HEARTBEAT_SECONDS   # a /ws client that answered no ping for this long is dropped
+SEND_TIMEOUT = 5          # a client that can't take a write within this many seconds is dropped
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+REGISTER_INTEREST = False  # register connected clients' filters in subscriptions.py (for DEMAND_POLLING)
+INTEREST_TTL = 60         # renewed every INTEREST_TTL/3 while the client stays connected
+
+REMOVED = object()        # pending marker: the document is gone, tell the client to drop it
+
+
+# -------------------- In-memory state --------------------
+class Subscriber:
+    def __init__(self, sports=None, event_ids=None, market_ids=None):
+        self.sports = sports
+        self.event_ids = event_ids
+        self.market_ids = market_ids
+        self.pending: "OrderedDict[tuple, Any]" = OrderedDict()  # doc key -> patch (None = resend doc, REMOVED)
+        self.cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def wants(self, key) -> bool:
+        _, sport, event_id, market_id = key
+        return ((not self.sports or sport in self.sports)
+                and (not self.event_ids or event_id in self.event_ids)
+                and (not self.market_ids or market_id in self.market_ids))
+
+    def offer(self, key, patch):
+        with self.cond:
+            if key in self.pending:
+                # client is behind on this document: drop the intermediate tick, send current state later
+                self.pending[key] = REMOVED if patch is REMOVED else None
+                self.dropped += 1
+            else:
+                self.pending[key] = patch
+            self.cond.notify()
+
+    def take(self, timeout):
+        with self.cond:
+            if not self.pending and not self.closed:
+                self.cond.wait(timeout)
+            if not self.pending:
+                return None
+            return self.pending.popitem(last=False)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+
+
+class LiveState:
+    def __init__(self):
+        self.docs: Dict[tuple, Dict[str, Any]] = {}
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def _apply(self, key, doc):
+        with self.lock:
+            old = self.docs.get(key)
+            self.docs[key] = doc
+            subs = [s for s in self.subscribers if s.wants(key)]
+        if not subs:
+            return
+        patch = diff(old, doc) if old is not None else None
+        if old is None or patch:
+            for s in subs:
+                s.offer(key, patch)
+
+    def update_market(self, sport: str, market: Dict[str, Any]):
+        key = ("market", sport, str(market.get("eventId", "")), str(market.get("marketId", "")))
+        self._apply(key, market)
+
+    def update_fancy(self, sport: str, event_id: str, data: Dict[str, Any]):
+        key = ("fancy", sport, str(event_id), "fancy")
+        self._apply(key, data)
+
+    def remove_event(self, event_id: str, kind: str = None):
+        """Forget the documents of an event that left play (only one kind: "market" / "fancy")."""
+        with self.lock:
+            keys = [k for k in self.docs if k[2] == str(event_id) and kind in (None, k[0])]
+            for k in keys:
+                del self.docs[k]
+            offers = [(s, k) for k in keys for s in self.subscribers if s.wants(k)]
+        for s, k in offers:
+            s.offer(k, REMOVED)
+
+    def get(self, key):
+        with self.lock:
+            return self.docs.get(key)
+
+    def subscribe(self, sub: Subscriber) -> Dict[str, Any]:
+        with self.lock:
+            self.subscribers.add(sub)
+            return {"|".join(k): d for k, d in self.docs.items() if sub.wants(k)}
+
+    def unsubscribe(self, sub: Subscriber):
+        with self.lock:
+            self.subscribers.discard(sub)
+        sub.close()
+
+
+_state = LiveState()
+
+def get_live_state() -> LiveState:
+    return _state
+
+
+# -------------------- HTTP / SSE / WebSocket --------------------
+def _csv(qs, name):
+    values = [v for raw in qs.get(name, []) for v in raw.split(",") if v]
+    return set(values) or None
+
+
+def _message(kind, **payload):
+    return json.dumps({"type": kind, "ts": int(time.time() * 1000), **payload},
+                      ensure_ascii=False, separators=(',', ':'))
+
+
+def _ws_frame(text: str) -> bytes:
+    data = text.encode("utf-8")
+    n = len(data)
+    if n < 126:
+        header = bytes([0x81, n])
+    elif n < 65536:
+        header = bytes([0x81, 126]) + n.to_bytes(2, "big")
+    else:
+        header = bytes([0x81, 127]) + n.to_bytes(8, "big")
+    return header + data
+
+
+def _ws_parse(buf: bytes):
+    """(opcode, unmasked payload, bytes used) of the first complete frame in buf, or None."""
+    if len(buf) < 2:
+        return None
+    opcode, masked, n, pos = buf[0] & 0x0F, buf[1] & 0x80, buf[1] & 0x7F, 2
+    if n >= 126:
+        size = 2 if n == 126 else 8
+        if len(buf) < pos + size:
+            return None
+        n, pos = int.from_bytes(buf[pos:pos + size], "big"), pos + size
+    mask = buf[pos:pos + 4] if masked else b""
+    pos += len(mask)
+    if len(buf) < pos + n:
+        return None
+    payload = buf[pos:pos + n]
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload, pos + n
+
+
+_interest_queue: "queue.Queue" = queue.Queue()
+_interest_thread = None
+_interest_lock = threading.Lock()
+
+def _interest_writer():
+    registry = get_registry()
+    while True:
+        consumer, filters, register = _interest_queue.get()
+        try:
+            if register:
+                registry.subscribe(consumer, ttl=INTEREST_TTL, **filters)
+            else:
+                registry.unsubscribe(consumer, **filters)
+        except Exception as e:
+            print(f"⚠️ Could not update subscription registry: {e}")
+
+def _interest(sub: Subscriber, register: bool = True):
+    """Queue a (de)registration of a streaming client's interest; the narrowest filter wins."""
+    global _interest_thread
+    if not REGISTER_INTEREST:
+        return
+    if sub.market_ids:
+        filters = {"market_ids": sub.market_ids}
+    elif sub.event_ids:
+        filters = {"event_ids": sub.event_ids}
+    else:
+        filters = {"sports": sub.sports or {"*"}}
+    with _interest_lock:
+        if _interest_thread is None:
+            _interest_thread = threading.Thread(target=_interest_writer, name="push-interest", daemon=True)
+            _interest_thread.start()
+    _interest_queue.put((f"push:{os.getpid()}:{id(sub)}", filters, register))
+
+
+class PushHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    rbufsize = 0              # unbuffered: after the handshake the reader thread owns the socket
+    state: LiveState = _state
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        qs = parse_qs(url.query)
+        sub = Subscriber(_csv(qs, "sport"), _csv(qs, "eventId"), _csv(qs, "marketId"))
+        if url.path == "/snapshot":
+            body = _message("snapshot", docs=self.state.subscribe(sub)).encode("utf-8")
+            self.state.unsubscribe(sub)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif url.path == "/sse":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "keep-alive")
+            self.end_headers()
+            self._stream(sub, lambda text: f"data: {text}\n\n".encode("utf-8"), b": ping\n\n", websocket=False)
+        elif url.path == "/ws" and self.headers.get("Upgrade", "").lower() == "websocket":
+            key = self.headers.get("Sec-WebSocket-Key", "")
+            accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+            self.send_response(101)
+            self.send_header("Upgrade", "websocket")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Sec-WebSocket-Accept", accept)
+            self.end_headers()
+            self._stream(sub, _ws_frame, bytes([0x89, 0]))  # ping frame as heartbeat
+        else:
+            self.send_error(404)
+
+    def _send(self, data: bytes):
+        with self.write_lock:  # the reader thread answers pings / close on the same socket
+            self.wfile.write(data)
+            self.wfile.flush()
+
+    def _read_client(self, sub: Subscriber, websocket: bool):
+        """Reader thread: handle client frames; the stream ends on a close frame or hang-up."""
+        buf = b""
+        try:
+            while not sub.closed:
+                try:
+                    chunk = self.connection.recv(4096)
+                except socket.timeout:
+                    continue
+                if not chunk:
+                    break  # client hung up
+                if not websocket:
+                    continue  # SSE clients send nothing we need
+                buf += chunk
+                while True:
+                    frame = _ws_parse(buf)
+                    if frame is None:
+                        break
+                    opcode, payload, used = frame
+                    buf = buf[used:]
+                    if opcode == 0x8:  # close: echo the status code, then stop
+                        self._send(bytes([0x88, len(payload[:2])]) + payload[:2])
+                        return
+                    if opcode == 0x9:  # ping -> pong with the same payload
+                        self._send(bytes([0x8A, len(payload[:125])]) + payload[:125])
+                    elif opcode == 0xA:
+                        self.pong_at = time.monotonic()
+        except OSError:
+            pass
+        finally:
+            sub.close()
+
+    def _stream(self, sub: Subscriber, encode, heartbeat: bytes, websocket: bool = True):
+        self.connection.settimeout(SEND_TIMEOUT)
+        self.write_lock = threading.Lock()
+        self.pong_at = pinged_at = time.monotonic()
+        threading.Thread(target=self._read_client, args=(sub, websocket), name="push-reader", daemon=True).start()
+        _interest(sub)
+        registered_at = time.monotonic()
+        try:
+            self._send(encode(_message("snapshot", docs=self.state.subscribe(sub))))
+            while not sub.closed:
+                if time.monotonic() - registered_at > INTEREST_TTL / 3:
+                    _interest(sub)
+                    registered_at = time.monotonic()
+                now = time.monotonic()
+                if websocket and now - self.pong_at > PONG_TIMEOUT:
+                    print(f"💤 WebSocket client sent no pong for {now - self.pong_at:.0f}s - dropping it")
+                    break
+                if now - pinged_at >= HEARTBEAT_SECONDS:
+                    self._send(heartbeat)  # also while busy: every ping should come back as a pong
+                    pinged_at = now
+                item = sub.take(max(0.0, HEARTBEAT_SECONDS - (now - pinged_at)))
+                if sub.closed:
+                    break
+                if item is None:
+                    continue
+                key, patch = item
+                doc = self.state.get(key) if patch is None else None
+                if patch is REMOVED or (patch is None and doc is None):
+                    msg = _message("remove", key="|".join(key))
+                elif patch is None:
+                    msg = _message("snapshot", docs={"|".join(key): doc})
+                else:
+                    msg = _message("diff", key="|".join(key), patch=patch)
+                self._send(encode(msg))
+        except (OSError, socket.timeout):
+            pass
+        finally:
+            sub.close()
+            self.state.unsubscribe(sub)
+            _interest(sub, register=False)
+            self.close_connection = True
+
+
+def start_push_server(host: str = PUSH_HOST, port: int = PUSH_PORT) -> ThreadingHTTPServer:
+    """Start the fan-out server on a daemon thread inside the scraper process."""
+    server = ThreadingHTTPServer((host, port), PushHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="push-server", daemon=True).start()
+    print(f"📡 Push server listening on http://{host}:{port} (/sse, /ws, /snapshot)")
+    return server
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Optional zstd + trained dictionary codec for Redis values (requires zstandard)
+- encode(json_bytes, kind) -> MAGIC + version byte + zstd frame: with the shared dictionary for
+  the kinds in DICT_KINDS, plain zstd for the rest; plain JSON when compressing doesn't help.
+  Dictionary values carry the 4-byte dictionary id after the version byte; decode() rejects a
+  value written with another dictionary (ValueError) instead of returning garbage.
+- decode(raw) accepts every format: values starting with MAGIC are decompressed, anything
+  else is returned as is (plain compact JSON), so old and new values can coexist.
+- MAGIC starts with 0xFF, which never begins a UTF-8 JSON document.
+- The dictionary is trained on the payload fixtures (matches_json/, fancy/, <event>/markets/)
+  minus every HOLDOUT-th sample, and stored in DICT_PATH; writers and readers must use the same file.
+- report measures on the held-out samples only and compares against plain zstd; a kind only
+  belongs in DICT_KINDS when the dictionary beats plain zstd there.
+- Usage:  python redis_codec.py train     # (re)build the dictionary
+          python redis_codec.py report    # held-out ratio, bytes per cycle, CPU vs plain JSON / zstd
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import zlib
+from typing import Dict, List, Tuple
+
+# -------------------- Config --------------------
+DICT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "redis_codec.dict")
+DICT_SIZE = 8 * 1024
+LEVEL = 3
+MAGIC = b"\xffz"
+VERSION_ZSTD_DICT = 1        # legacy: no dictionary id in the header (the frame's id is checked)
+VERSION_ZSTD = 2
+VERSION_ZSTD_DICT_ID = 3     # MAGIC + 3 + dictionary id (4 bytes, big endian) + frame
+HOLDOUT = 4                 # every 4th sample (by path hash) is kept out of training
+# kinds where the dictionary beat plain zstd on the held-out samples (odds_market: it loses)
+DICT_KINDS = {"match", "premium_markets", "fancy", "fancy_markets"}
+
+FIXTURES = {
+    "match": "matches_json/*/match/*.json",
+    "premium_markets": "matches_json/*/premium_markets/*.json",  # redis_data's fixed demo template
+    "fancy": "matches_json/*/fancy/*.json",
+    "fancy_markets": "fancy/MarketData_*.json",
+    "odds_market": "*/markets/market_*.json",
+}
+
+
+def compact(data) -> bytes:
+    """Same serialization redis_data.py uses for its values."""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+TEMPLATE_KINDS = {"premium_markets"}  # not real traffic: kept out of the headline numbers
+
+
+def load_samples(base: str = ".") -> Dict[str, Tuple[List[bytes], List[bytes]]]:
+    """{kind: (training samples, held-out samples)}; the split is stable across runs."""
+    samples = {}
+    for kind, pattern in FIXTURES.items():
+        trained, held = [], []
+        for path in sorted(glob.glob(os.path.join(base, pattern))):
+            with open(path, "r", encoding="utf-8") as f:
+                data = compact(json.load(f))
+            (held if zlib.crc32(os.path.basename(path).encode()) % HOLDOUT == 0 else trained).append(data)
+        if trained and not held:
+            held.append(trained.pop())  # every kind gets at least one unseen sample
+        samples[kind] = (trained, held)
+    return samples
+
+
+def train(base: str = ".", size: int = DICT_SIZE, path: str = DICT_PATH) -> int:
+    import zstandard
+    samples = [s for trained, _ in load_samples(base).values() for s in trained]
+    dictionary = zstandard.train_dictionary(size, samples, level=LEVEL)
+    with open(path, "wb") as f:
+        f.write(dictionary.as_bytes())
+    print(f"✅ Trained {len(dictionary.as_bytes())} byte dictionary (id {dictionary.dict_id()}) "
+          f"on {len(samples)} samples -> {path}")
+    return dictionary.dict_id()
+
+
+class ZstdDictCodec:
+    def __init__(self, path: str = DICT_PATH, level: int = LEVEL):
+        import zstandard
+        with open(path, "rb") as f:
+            self.dictionary = zstandard.ZstdCompressionDict(f.read())
+        self.compressor = zstandard.ZstdCompressor(level=level, dict_data=self.dictionary, write_content_size=True)
+        self.decompressor = zstandard.ZstdDecompressor(dict_data=self.dictionary)
+        self.plain_compressor = zstandard.ZstdCompressor(level=level, write_content_size=True)
+        self.plain_decompressor = zstandard.ZstdDecompressor()
+        self.error = zstandard.ZstdError
+        self.frame_parameters = zstandard.get_frame_parameters
+        self.dict_id = self.dictionary.dict_id()
+        self.header = MAGIC + bytes([VERSION_ZSTD_DICT_ID]) + self.dict_id.to_bytes(4, "big")
+        self.plain_header = MAGIC + bytes([VERSION_ZSTD])
+
+    def encode(self, data: bytes, kind: str = None) -> bytes:
+        if kind is None or kind in DICT_KINDS:
+            encoded = self.header + self.compressor.compress(data)
+        else:
+            encoded = self.plain_header + self.plain_compressor.compress(data)
+        return encoded if len(encoded) < len(data) else data
+
+    def decode(self, raw: bytes) -> bytes:
+        """Plain bytes; ValueError for anything that can't be decompressed (zstd errors included)."""
+        if not raw[:len(MAGIC)] == MAGIC:
+            return raw
+        version = raw[len(MAGIC)]
+        try:
+            if version == VERSION_ZSTD_DICT_ID:
+                self._check_dict(int.from_bytes(raw[len(MAGIC) + 1:len(self.header)], "big"))
+                return self.decompressor.decompress(raw[len(self.header):])
+            if version == VERSION_ZSTD_DICT:
+                frame = raw[len(MAGIC) + 1:]
+                self._check_dict(self.frame_parameters(frame).dict_id)
+                return self.decompressor.decompress(frame)
+            if version == VERSION_ZSTD:
+                return self.plain_decompressor.decompress(raw[len(self.plain_header):])
+        except self.error as e:
+            raise ValueError(f"corrupt value (codec version {version}): {e}") from e
+        raise ValueError(f"unknown value codec version {version}")
+
+    def _check_dict(self, dict_id: int):
+        if dict_id != self.dict_id:
+            raise ValueError(f"value compressed with dictionary {dict_id}, {DICT_PATH} is {self.dict_id}")
+
+
+# -------------------- Shared instance --------------------
+_codec = None
+
+def get_codec() -> ZstdDictCodec:
+    global _codec
+    if _codec is None:
+        _codec = ZstdDictCodec()
+    return _codec
+
+
+def decode(raw):
+    """Plain JSON bytes for any stored value; only loads zstandard when a value is compressed."""
+    if isinstance(raw, (bytes, bytearray)) and raw[:len(MAGIC)] == MAGIC:
+        return get_codec().decode(bytes(raw))
+    return raw
+
+
+# -------------------- Report --------------------
+def _timed(func, items, repeat: int = 20) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            func(item)
+    return (time.perf_counter() - started) / (repeat * max(1, len(items))) * 1e6
+
+
+def report(base: str = "."):
+    import zstandard
+    codec = get_codec()
+    plain = zstandard.ZstdCompressor(level=LEVEL)
+    print(f"Held-out samples only (every {HOLDOUT}th, not used for training); sizes are bytes per value\n")
+    print(f"{'kind':<16}{'n':>5}{'json B':>9}{'zstd B':>9}{'dict B':>9}{'stored B':>10}{'ratio':>8}"
+          f"{'enc µs':>9}{'dec µs':>9}{'json µs':>9}  dict?")
+    total_raw = total_zstd = total_stored = 0
+    for kind, (_, samples) in load_samples(base).items():
+        if not samples:
+            continue
+        n = len(samples)
+        raw = sum(len(s) for s in samples)
+        no_dict = sum(len(plain.compress(s)) + len(codec.plain_header) for s in samples)
+        with_dict = sum(len(codec.compressor.compress(s)) + len(codec.header) for s in samples)
+        encoded = [codec.encode(s, kind) for s in samples]
+        stored = sum(len(e) for e in encoded)
+        enc_us = _timed(lambda s: codec.encode(s, kind), samples)
+        dec_us = _timed(codec.decode, encoded)
+        json_us = _timed(lambda s: compact(json.loads(s)), samples)  # current cost per value, for scale
+        wins = "yes" if with_dict < no_dict else "no"
+        verdict = f"{wins:<4}{'(on)' if kind in DICT_KINDS else '(off)'}"
+        if kind in TEMPLATE_KINDS:
+            verdict += "  template, not counted"
+        else:
+            total_raw, total_zstd, total_stored = total_raw + raw, total_zstd + no_dict, total_stored + stored
+        print(f"{kind:<16}{n:>5}{raw / n:>9.0f}{no_dict / n:>9.0f}{with_dict / n:>9.0f}{stored / n:>10.0f}"
+              f"{raw / stored:>8.2f}{enc_us:>9.1f}{dec_us:>9.1f}{json_us:>9.1f}  {verdict}")
+    if total_stored:
+        print(f"\n📦 Held-out values: {total_raw} B as JSON -> {total_zstd} B plain zstd -> {total_stored} B stored "
+              f"({total_raw / total_stored:.2f}x vs JSON, {total_zstd / total_stored:.2f}x vs plain zstd)")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        print("❌ zstandard is required for the value codec (pip install zstandard)")
+        sys.exit(1)
+    if command == "train":
+        train()
+    else:
+        report()
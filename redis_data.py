@@ -5,7 +5,8 @@
 Ultimate Redis + Local JSON sync script
 - Keeps Redis storage in the original compact byte-encoded JSON format.
 - Also writes human-readable JSON files into matches_json/<sport>/{match, premium_markets, fancy}/
-- Deletes old Redis keys and local files on each run (configurable)
+- Redis keys carry a per-record-type TTL (RECORD_TTL) that is refreshed on every write,
+  so finished matches expire by themselves; local files are cleared on each run
 - Fetches live matches from the API, detects sport, formats titles, saves match + premium + fancy
 - Prints a detailed "image-like" summary, and verifies saved data
 """
@@ -13,10 +14,14 @@ Ultimate Redis + Local JSON sync script
 import os
 import json
 import time
-import requests
-import redis
+import threading
 from datetime import datetime
 from typing import Dict, List, Any
+from mirror_writer import MirrorWriter
+from async_redis import AsyncRedisWriter
+from redis_codec import get_codec, decode as decode_value
+# requests, redis, redis_lease and redis_spool are imported on first use: importing this
+# module must stay fast and free of network / filesystem side effects (see import_times.py)
 
 # -------------------- Redis Configuration --------------------
 REDIS_CONFIG = {
@@ -46,6 +51,20 @@ SPORT_MAPPING = {
 
 SPORT_TYPE_PARAM = {"cricket": 1, "tennis": 2, "soccer": 3}
 
+# Multi-node mode: only process events whose shard this node holds a lease on (redis_lease.py).
+# Record writes are then fenced: a Lua script checks the lease before every SET, so a node
+# whose lease lapsed can't overwrite the new owner. Fenced writes are never spooled.
+# Fencing needs the lease keys in the same Redis as the records (leave LEASE_REDIS_URL unset).
+LEASING = False
+
+# Seconds a record survives without being rewritten. Live matches are rewritten every cycle
+# (60s), so keep these a few cycles long; a finished match disappears one TTL after its last write.
+RECORD_TTL = {
+    "match": 180,
+    "premium_markets": 180,
+    "fancy": 180,
+}
+
 # -------------------- Local Directory Setup --------------------
 BASE_DIR = "matches_json"
 SAVE_DIR = BASE_DIR  # maintain same variable name style as earlier
@@ -60,17 +79,26 @@ def ensure_base_dirs():
         for sub in ["match", "premium_markets", "fancy"]:
             os.makedirs(os.path.join(sport_dir, sub), exist_ok=True)
 
-ensure_base_dirs()
+# Local mirror writes go through a background thread pool (mirror_writer.py) when ASYNC_MIRROR
+# is on; call mirror.flush() before reading the files back.
+ASYNC_MIRROR = True
+mirror = MirrorWriter()
+_known_sport_dirs = set()
 
 def ensure_sport_folders(sport_type: str):
     sport_dir = os.path.join(BASE_DIR, sport_type)
+    if sport_type in _known_sport_dirs:
+        return sport_dir
     os.makedirs(sport_dir, exist_ok=True)
     for sub in ["match", "premium_markets", "fancy"]:
         os.makedirs(os.path.join(sport_dir, sub), exist_ok=True)
+        mirror.known_dirs.add(os.path.join(sport_dir, sub))
+    _known_sport_dirs.add(sport_type)
     return sport_dir
 
 def clear_local_folders():
     """Remove all files inside matches_json/<sport>/* (keeps folders)"""
+    mirror.flush()  # don't let a queued write land after the wipe
     print("\n🗑️ Clearing local folder contents...")
     for sport in ['tennis','cricket','soccer']:
         sport_dir = os.path.join(BASE_DIR, sport)
@@ -85,6 +113,9 @@ def clear_local_folders():
     print("🧹 Local cleanup done.")
 
 def save_json_to_file(filepath: str, data: dict):
+    if ASYNC_MIRROR:
+        mirror.write(filepath, data)
+        return
     try:
         with open(filepath, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
@@ -95,6 +126,7 @@ def save_json_to_file(filepath: str, data: dict):
 # -------------------- Initialize Redis --------------------
 def init_redis():
     try:
+        import redis
         client = redis.Redis(**REDIS_CONFIG)
         client.ping()
         print("✅ Connected to Redis Cloud successfully")
@@ -103,46 +135,290 @@ def init_redis():
         print(f"❌ Redis connection failed: {e}")
         return None
 
-redis_client = init_redis()
-
-# -------------------- Delete All Previous Data (Redis + Local) --------------------
-def delete_all_previous_data():
-    """Delete ALL previous Redis keys matching patterns (and optionally clear local files)"""
-    if not redis_client:
-        print("⚠️ Redis client not available - skipping Redis delete")
-    else:
-        print("\n🗑️ Deleting ALL previous Redis data (matching patterns)...")
-        deleted_count = 0
+# The connection is opened on first use, not at import time. After a failed connect the next
+# attempt waits REDIS_RETRY seconds, doubling up to REDIS_RETRY_MAX; callers get None meanwhile.
+REDIS_RETRY, REDIS_RETRY_MAX = 5, 60
+redis_client = None
+_redis_retry_at = 0.0
+_redis_backoff = REDIS_RETRY
+_redis_connecting = threading.Lock()
+
+def connect_redis():
+    """Connect now; on failure schedule the next attempt with exponential backoff."""
+    global redis_client, _redis_retry_at, _redis_backoff
+    if not _redis_connecting.acquire(blocking=False):
+        return redis_client  # another thread is connecting: don't wait for it
+    try:
+        redis_client = init_redis()
+        if redis_client is None:
+            _redis_retry_at = time.monotonic() + _redis_backoff
+            _redis_backoff = min(_redis_backoff * 2, REDIS_RETRY_MAX)
+        else:
+            _redis_backoff = REDIS_RETRY
+        return redis_client
+    finally:
+        _redis_connecting.release()
+
+def get_redis():
+    """Shared client, connecting on first use (None while Redis is unreachable)."""
+    if redis_client is None and time.monotonic() >= _redis_retry_at:
+        connect_redis()
+    return redis_client
+
+# Record writes go through a pooled asyncio client on a background loop (async_redis.py) when
+# ASYNC_REDIS is on, so Redis round trips overlap the upstream fetches; call
+# redis_writer.flush() before reading the keys back.
+ASYNC_REDIS = True
+redis_writer = AsyncRedisWriter(REDIS_CONFIG)
+
+# Store values as MAGIC + zstd frame (trained dictionary for redis_codec.DICT_KINDS, plain zstd
+# for the rest; needs zstandard) instead of plain compact JSON. Readers detect the format per value.
+COMPRESS_VALUES = False
+
+# -------------------- Generation Snapshots (consistent reads) --------------------
+# SNAPSHOT_MODE writes every cycle into its own namespace
+#   in_play_<sport>_premium:gen:<n>:{match,premium_markets,fancy}:<id>
+# and flips in_play_<sport>_premium:current_generation to <n> once the cycle is complete:
+# only when every record write of the cycle landed (nothing spooled, failed or fenced off),
+# otherwise readers stay on the previous generation. Readers GET the pointer first and then
+# only read that generation. Generation keys carry GENERATION_TTL, so superseded generations
+# expire by themselves instead of being deleted. The pointer carries the same TTL and is
+# refreshed every cycle, so it can never outlive the generation it points at.
+# With LEASING every node only writes its own shards, so each node keeps its own generation
+#   in_play_<sport>_premium:gen:<node_id>:<n>:...  and pointer  ...:current_generation:<node_id>
+# (with GENERATION_TTL, so a dead node's pointer goes away with its keys); readers merge the
+# generations of every node.
+SNAPSHOT_MODE = False
+GENERATION_TTL = 300  # seconds; keep well above one cycle
+_write_generation: Dict[str, int] = {}
+_generation_misses: List[str] = []  # keys of this cycle that did not land (appended from the writer thread too)
+
+def generation_pointer_key(sport: str) -> str:
+    return f"in_play_{sport}_premium:current_generation"
+
+def generation_node() -> str:
+    """"<node_id>:" under LEASING (per-node generations), "" otherwise."""
+    if not LEASING:
+        return ""
+    from redis_lease import get_lease_manager
+    return f"{get_lease_manager('redis_data').node_id}:"
+
+def write_missed(key: str):
+    _generation_misses.append(key)
+
+def begin_generations():
+    """Allocate a fresh write generation per sport for this cycle."""
+    redis_client = get_redis()
+    _write_generation.clear()
+    _generation_misses.clear()
+    if not (SNAPSHOT_MODE and redis_client):
+        return
+    try:
+        pipe = redis_client.pipeline()
         for sport in ['tennis','cricket','soccer']:
-            patterns = [
-                f"in_play_{sport}_premium:*",
-                f"in_play_{sport}_premium:match:*",
-                f"in_play_{sport}_premium:premium_markets:*",
-                f"in_play_{sport}_premium:fancy:*"
-            ]
-            for pattern in patterns:
-                try:
-                    keys = redis_client.keys(pattern)
-                    if keys:
-                        # redis_client.delete expects *keys when decode_responses False -> bytes keys OK
-                        redis_client.delete(*keys)
-                        deleted_count += len(keys)
-                        print(f"✅ Deleted {len(keys)} keys for pattern {pattern}")
-                except Exception as e:
-                    print(f"⚠️ Error deleting keys for {pattern}: {e}")
-        print(f"🗑️ Total Redis keys deleted: {deleted_count}")
+            pipe.incr(f"in_play_{sport}_premium:generation_seq")
+        for sport, gen in zip(['tennis','cricket','soccer'], pipe.execute()):
+            _write_generation[sport] = gen
+        print(f"🧬 Writing generations: {_write_generation}")
+    except Exception as e:
+        print(f"⚠️ Could not allocate generations ({e}) - writing live keys")
+
+def publish_generations():
+    """Atomically point readers at the generations written this cycle."""
+    redis_client = get_redis()
+    if ASYNC_REDIS:
+        redis_writer.flush()  # the pointer must not flip before its records are written
+    if not (_write_generation and redis_client):
+        return
+    if _generation_misses:
+        print(f"⏸️ Generations {_write_generation} incomplete ({len(_generation_misses)} writes did not land) "
+              f"- readers stay on the previous generation")
+        return
+    node = generation_node()
+    try:
+        pipe = redis_client.pipeline()  # MULTI/EXEC: all sports flip together
+        for sport, gen in _write_generation.items():
+            if node:
+                pipe.set(f"{generation_pointer_key(sport)}:{node[:-1]}", gen, ex=GENERATION_TTL)
+            else:
+                pipe.set(generation_pointer_key(sport), gen, ex=GENERATION_TTL)
+        pipe.execute()
+        print(f"🔀 Current generations -> {_write_generation}")
+    except Exception as e:
+        print(f"❌ Generation flip failed: {e}")
+
+def record_key(sport: str, kind: str, match_id: str) -> str:
+    """Key a writer should use for a match / premium_markets / fancy record."""
+    gen = _write_generation.get(sport)
+    if gen is not None:
+        return f"in_play_{sport}_premium:gen:{generation_node()}{gen}:{kind}:{match_id}"
+    return f"in_play_{sport}_premium:{kind}:{match_id}"
+
+def record_ttl(kind: str):
+    return GENERATION_TTL if _write_generation else RECORD_TTL.get(kind)
+
+# -------------------- TTL-managed writes --------------------
+# Last payload written per live key. When a record is unchanged only its expiry is refreshed
+# (EXPIRE instead of re-sending the value); the cache is pruned to the keys of the current cycle.
+_last_written: Dict[str, bytes] = {}
+_written_this_cycle = set()
+
+def write_record(key: str, kind: str, serialized: bytes, event_id=None):
+    redis_client = get_redis()
+    ttl = record_ttl(kind)
+    if COMPRESS_VALUES:
+        serialized = get_codec().encode(serialized, kind)
+    _written_this_cycle.add(key)
+    if LEASING and event_id is not None:
+        write_fenced(key, event_id, serialized, ttl)
+        return
+    if SPOOL and (redis_down or not redis_client):
+        spool_write(key, serialized, ttl)
+        return
+    if not redis_client:
+        write_missed(key)
+        return
+    if ASYNC_REDIS:
+        unchanged = _last_written.get(key) == serialized
+        if not _write_generation:
+            _last_written[key] = serialized
+
+        async def command(r):
+            if unchanged and ttl and await r.expire(key, ttl):
+                return
+            await r.set(key, serialized, ex=ttl)
+
+        def failed(e):
+            if SPOOL:
+                spool_write(key, serialized, ttl, e)
+            else:
+                write_missed(key)
+                _last_written.pop(key, None)  # a failed write must be re-sent in full, not just have its TTL touched
 
-    # Now clear local files
-    clear_local_folders()
+        redis_writer.submit(command, on_error=failed)
+        return
+    from redis.exceptions import RedisError
+    try:
+        if _last_written.get(key) == serialized and ttl and redis_client.expire(key, ttl):
+            return  # unchanged and still present: TTL touched
+        redis_client.set(key, serialized, ex=ttl)
+    except RedisError as e:
+        if not SPOOL:
+            write_missed(key)
+            raise
+        spool_write(key, serialized, ttl, e)
+        return
+    if not _write_generation:  # generation keys are new every cycle, nothing to reuse
+        _last_written[key] = serialized
+
+def write_fenced(key: str, event_id, serialized: bytes, ttl):
+    """SET through redis_lease's guard: dropped when this node no longer holds the event's shard."""
+    from redis_lease import get_lease_manager, GUARDED_SET_SCRIPT
+    manager = get_lease_manager("redis_data")
+    fence = manager.fence(event_id)
+    redis_client = get_redis()
+    if not fence or not redis_client or redis_down:
+        print(f"🚫 No valid lease for event {event_id} - {key} not written")
+        write_missed(key)
+        return
+
+    def rejected():
+        print(f"🚫 Lease for event {event_id} was taken over - {key} not written")
+        write_missed(key)
+
+    def failed(e):
+        print(f"❌ Fenced write of {key} failed: {e}")
+        write_missed(key)
+
+    if ASYNC_REDIS:
+        async def command(r):
+            if not await r.eval(GUARDED_SET_SCRIPT, 2, fence[0], key, fence[1], serialized, ttl or 0):
+                rejected()
+        redis_writer.submit(command, on_error=failed)
+        return
+    if not manager.guarded_set(event_id, key, serialized, ttl):
+        rejected()
+
+def end_write_cycle():
+    """Forget cached payloads of keys that were not written this cycle (they expire in Redis)."""
+    for key in [k for k in _last_written if k not in _written_this_cycle]:
+        del _last_written[key]
+    _written_this_cycle.clear()
+
+# -------------------- Outage spool --------------------
+# While Redis is unreachable record writes go to a local SQLite spool (redis_spool.py).
+# check_redis() runs at the start of every cycle: it reconnects and replays the spool
+# (latest value per key, in order) before the cycle writes anything new.
+SPOOL = True
+_spool = None
+redis_down = False
+
+def get_spool():
+    global _spool
+    if _spool is None:
+        from redis_spool import RedisSpool
+        _spool = RedisSpool()
+    return _spool
+
+def spool_write(key: str, serialized: bytes, ttl, error=None):
+    global redis_down
+    if not redis_down:
+        print(f"📼 Redis unreachable ({error or 'not connected'}) - spooling writes locally")
+    redis_down = True
+    _last_written.pop(key, None)
+    write_missed(key)  # in Redis only after the replay: not part of this cycle's generation
+    get_spool().put(key, serialized, ttl)
+
+def check_redis() -> bool:
+    """Reconnect if needed and replay spooled writes. False while Redis is still unreachable."""
+    global redis_down
+    if ASYNC_REDIS:
+        redis_writer.flush()  # failed writes of the last cycle must be in the spool first
+    if redis_client is None:
+        if connect_redis() is None:
+            redis_down = True
+            return False
+    if not SPOOL:
+        redis_down = False
+        return True
+    spool = get_spool()
+    try:
+        if redis_down:
+            redis_client.ping()
+        if len(spool):
+            replayed = spool.replay(redis_client)
+            print(f"♻️ Replayed {replayed} spooled writes in {spool.last_replay:.2f}s")
+            print(spool.metrics_line())
+        redis_down = False
+        return True
+    except Exception as e:
+        print(f"⚠️ Redis still unreachable ({e}) - {len(spool)} writes spooled")
+        redis_down = True
+        return False
+
+def key_patterns(sport: str, kind: str) -> List[str]:
+    """Patterns readers should scan: the current generation(s) in snapshot mode, live keys otherwise."""
+    redis_client = get_redis()
+    if SNAPSHOT_MODE and redis_client:
+        pointer = generation_pointer_key(sport)
+        nodes = list(redis_client.scan_iter(match=f"{pointer}:*", count=500))
+        if nodes:  # LEASING: one generation per node
+            gens = zip((k.decode() if isinstance(k, bytes) else k for k in nodes), redis_client.mget(nodes))
+            return [f"in_play_{sport}_premium:gen:{key[len(pointer) + 1:]}:{int(gen)}:{kind}:*"
+                    for key, gen in gens if gen is not None]
+        gen = redis_client.get(pointer)
+        if gen is not None:
+            return [f"in_play_{sport}_premium:gen:{int(gen)}:{kind}:*"]
+    return [f"in_play_{sport}_premium:{kind}:*"]
 
 # -------------------- Exact Match Save (Redis + Local) --------------------
 def save_match_data(sport_type: str, match_id: str, match_title: str, tournament: str = "") -> bool:
     """Save match data in EXACT format (compact JSON bytes to Redis) AND pretty JSON file locally"""
-    if not redis_client:
-        print("⚠️ Redis unavailable - skipping Redis save")
+    if redis_down:
+        print("📼 Redis unavailable - match write goes to the spool")
     try:
         clean_match_id = match_id.lstrip('-')
-        match_key = f"in_play_{sport_type}_premium:match:{match_id}"
+        match_key = record_key(sport_type, "match", match_id)
 
         match_data = {
             "match": match_title,
@@ -154,8 +430,7 @@ def save_match_data(sport_type: str, match_id: str, match_title: str, tournament
         # Compact JSON bytes for Redis (exact-like)
         try:
             serialized_data = json.dumps(match_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
-            if redis_client:
-                redis_client.set(match_key, serialized_data)
+            write_record(match_key, "match", serialized_data, event_id=match_id)
         except Exception as e:
             print(f"❌ Redis set error for {match_key}: {e}")
 
@@ -176,10 +451,10 @@ def save_match_data(sport_type: str, match_id: str, match_title: str, tournament
 
 def save_premium_markets(sport_type: str, match_id: str, match_title: str) -> bool:
     """Save premium market data to Redis + local file (market_<id>.json)"""
-    if not redis_client:
-        print("⚠️ Redis unavailable - skipping Redis save for premium markets")
+    if redis_down:
+        print("📼 Redis unavailable - premium markets write goes to the spool")
     try:
-        premium_key = f"in_play_{sport_type}_premium:premium_markets:{match_id}"
+        premium_key = record_key(sport_type, "premium_markets", match_id)
         premium_data = {
             "match_id": match_id,
             "match_title": match_title,
@@ -198,8 +473,7 @@ def save_premium_markets(sport_type: str, match_id: str, match_title: str) -> bo
         # Save to Redis (compact bytes)
         try:
             serialized = json.dumps(premium_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
-            if redis_client:
-                redis_client.set(premium_key, serialized)
+            write_record(premium_key, "premium_markets", serialized, event_id=match_id)
         except Exception as e:
             print(f"❌ Redis premium set error for {premium_key}: {e}")
 
@@ -215,15 +489,14 @@ def save_premium_markets(sport_type: str, match_id: str, match_title: str) -> bo
 
 def save_fancy_markets(sport_type: str, match_id: str, fancy_data: Dict[str, Any]) -> bool:
     """Save fancy markets (if any) into fancy/<id>.json and Redis key"""
-    if not redis_client:
-        print("⚠️ Redis unavailable - skipping Redis save for fancy markets")
+    if redis_down:
+        print("📼 Redis unavailable - fancy markets write goes to the spool")
     try:
-        fancy_key = f"in_play_{sport_type}_premium:fancy:{match_id}"
+        fancy_key = record_key(sport_type, "fancy", match_id)
         # Save to Redis
         try:
             serialized = json.dumps(fancy_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
-            if redis_client:
-                redis_client.set(fancy_key, serialized)
+            write_record(fancy_key, "fancy", serialized, event_id=match_id)
         except Exception as e:
             print(f"❌ Redis fancy set error for {fancy_key}: {e}")
 
@@ -309,7 +582,8 @@ def format_match_title(event_name: str, sport: str):
 # -------------------- API Fetching --------------------
 def fetch_json(url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        response = requests.post(url, data=payload, headers=HEADERS, timeout=15)
+        from upstream import get_post  # UPSTREAM_POOL lives in upstream.py
+        response = get_post()(url, data=payload, headers=HEADERS, timeout=15)
         if response.status_code == 200:
             return response.json()
         else:
@@ -343,7 +617,13 @@ def fetch_live_matches() -> List[Dict[str, Any]]:
     return all_matches
 
 # -------------------- Proper Display Format (print like image) --------------------
+def format_ttl(ttl) -> str:
+    if ttl is None or ttl < 0:
+        return "No limit"
+    return f"{ttl}s"
+
 def print_redis_data_proper():
+    redis_client = get_redis()
     if not redis_client:
         print("❌ Redis not connected - cannot print Redis data")
         return
@@ -355,11 +635,10 @@ def print_redis_data_proper():
     total_scanned = 0
     sport_data = {}
     for sport in ['tennis','cricket','soccer']:
-        match_pattern = f"in_play_{sport}_premium:match:*"
-        premium_pattern = f"in_play_{sport}_premium:premium_markets:*"
         try:
-            matches = redis_client.keys(match_pattern) or []
-            premium_markets = redis_client.keys(premium_pattern) or []
+            matches = [k for p in key_patterns(sport, "match") for k in redis_client.scan_iter(match=p, count=500)]
+            premium_markets = [k for p in key_patterns(sport, "premium_markets")
+                               for k in redis_client.scan_iter(match=p, count=500)]
         except Exception as e:
             print(f"⚠️ Redis keys fetch error for {sport}: {e}")
             matches = []
@@ -397,7 +676,7 @@ def print_redis_data_proper():
                     match_id = match_key_str.split(':')[-1]
                     match_data = redis_client.get(match_key) or b''
                     data_size = len(match_data) if match_data else 0
-                    print(f"| JSON    | {match_id}    | No limit    | {data_size} B    |")
+                    print(f"| JSON    | {match_id}    | {format_ttl(redis_client.ttl(match_key))}    | {data_size} B    |")
                 except Exception as e:
                     print(f"⚠️ Error reading key display: {e}")
             print("\n---")
@@ -407,7 +686,7 @@ def print_redis_data_proper():
                 sample_key = data['matches'][0]
                 try:
                     sample_key_str = sample_key.decode() if isinstance(sample_key, bytes) else sample_key
-                    sample_data = redis_client.get(sample_key)
+                    sample_data = decode_value(redis_client.get(sample_key))
                     if sample_data:
                         try:
                             # sample_data might be bytes
@@ -419,7 +698,7 @@ def print_redis_data_proper():
                             parsed_data = {}
                         print(f"\n## Columns")
                         print(f"- **{sample_key_str}**")
-                        print(f"### Top-level values: 4 TTL: No limit")
+                        print(f"### Top-level values: 4 TTL: {format_ttl(redis_client.ttl(sample_key))}")
                         print(f"<1 min")
                         print(f"\n---")
                         print(f'### "match": "{parsed_data.get("match", "")}"')
@@ -433,13 +712,13 @@ def print_redis_data_proper():
 # -------------------- Verify and Validate --------------------
 def verify_and_validate():
     """Verify local files AND Redis entries (first few)"""
+    redis_client = get_redis()
     print("\n🔍 Verifying data storage (local files + Redis keys)...")
     issues_found = 0
     if redis_client:
         for sport in ['tennis','cricket','soccer']:
-            match_pattern = f"in_play_{sport}_premium:match:*"
             try:
-                matches = redis_client.keys(match_pattern) or []
+                matches = [k for p in key_patterns(sport, "match") for k in redis_client.scan_iter(match=p, count=500)]
             except Exception as e:
                 print(f"⚠️ Error fetching keys for verify: {e}")
                 matches = []
@@ -447,7 +726,7 @@ def verify_and_validate():
             print(f"\n{sport.upper()} Matches in Redis: {len(matches)}")
             for match_key in matches[:3]:
                 key_str = match_key.decode() if isinstance(match_key, bytes) else match_key
-                data = redis_client.get(match_key)
+                data = decode_value(redis_client.get(match_key))
                 if not data:
                     print(f"❌ {key_str}: NO DATA")
                     issues_found += 1
@@ -496,17 +775,23 @@ def verify_and_validate():
 
 # -------------------- Main Processing --------------------
 def process_live_matches():
-    if not redis_client:
-        print("⚠️ Redis not connected - will still create local files but Redis saves skipped")
+    if not check_redis():
+        print("⚠️ Redis not connected - local files are written, Redis writes are spooled")
 
     print("\n🎯 Processing LIVE matches...")
-    # Clear previous (Redis + local)
-    delete_all_previous_data()
+    # Redis keys of finished matches expire by TTL; only the local mirror is cleared
+    clear_local_folders()
 
     # Fetch matches
+    begin_generations()
     live_matches = fetch_live_matches()
+    if LEASING:
+        from redis_lease import filter_owned
+        live_matches = filter_owned(live_matches, "eventId", loop="redis_data")
     if not live_matches:
         print("❌ No live matches found - nothing to save")
+        publish_generations()
+        end_write_cycle()
         return
 
     sport_counts = {"tennis":0,"cricket":0,"soccer":0}
@@ -540,6 +825,9 @@ def process_live_matches():
 
             sport_counts[sport_type] += 1
 
+    publish_generations()
+    end_write_cycle()
+
     print("\n📊 FINAL RESULTS:")
     for sport, count in sport_counts.items():
         if count > 0:
@@ -553,8 +841,10 @@ def main():
     print(f"⏰ STARTING DATA PROCESSING @ {datetime.now():%H:%M:%S}")
     print(f"{'='*60}")
 
+    ensure_base_dirs()
     process_live_matches()
     print_redis_data_proper()
+    mirror.flush()  # local files must be complete before they are verified
     verify_and_validate()
 
     print(f"\n🏁 PROCESSING COMPLETED @ {datetime.now():%H:%M:%S}")
@@ -562,9 +852,12 @@ def main():
 # -------------------- Run with Interval --------------------
 if __name__ == "__main__":
     print("🚀 STARTING REDIS + LOCAL DATA SERVICE - FULL MERGED VERSION")
+    from profiler import get_profiler
+    profiler = get_profiler("redis_data", slow_after=30)
     try:
         while True:
-            main()
+            with profiler.cycle():  # no-op unless PROFILE=1
+                main()
             print("\n⏳ Waiting 60 seconds for next update...")
             time.sleep(60)
     except KeyboardInterrupt:
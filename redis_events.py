@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Change events for odds + fancy data over Redis Streams (and optional pub/sub)
+- Remembers the last published market / fancy document and diffs it with diff_engine. A new
+  document only becomes the baseline once its events were XADDed: events dropped while Redis
+  is down are not lost, the next tick's diff still carries those changes.
+- For each changed item XADDs one compact event to changes:in_play_<sport>_premium
+  (MAXLEN ~ STREAM_MAXLEN) and optionally PUBLISHes it on the same channel name.
+- Event fields: event_id, market_id, [selection_id], kind, changed (JSON), version.
+- The scrape loop never waits for Redis: the connection is made on a background thread and
+  events are dropped (not queued) while it is down; after a failed publish the next attempt
+  waits PUBLISH_RETRY seconds, doubling up to PUBLISH_RETRY_MAX.
+- Tail a stream:       python redis_events.py cricket redis://localhost:6379/0
+- Check a server:      python redis_events.py check redis://localhost:6379/0
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from typing import Dict, Any, List
+
+from diff_engine import diff, changed_items
+
+# -------------------- Config --------------------
+STREAM_MAXLEN = 10000      # approximate cap per sport stream
+PUBLISH_PUBSUB = False     # also PUBLISH every event on a channel
+EVENTS_REDIS_URL = os.environ.get("EVENTS_REDIS_URL")  # e.g. redis://localhost:6379/0, else redis_data's client
+PUBLISH_RETRY, PUBLISH_RETRY_MAX = 5, 60   # seconds
+
+MARKET_FIELDS = ["status", "inPlay", "totalMatched"]
+RUNNER_FIELDS = ["status", "availableToBack", "availableToLay", "lastPriceTraded"]
+FANCY_FIELDS = ["status", "suspended", "ballRunning", "autoSuspended", "betAllowed", "gameOver", "summaryStatus"]
+
+
+def stream_key(sport: str) -> str:
+    # kept outside in_play_<sport>_premium:* (the TTL-managed record keys of redis_data.py)
+    return f"changes:in_play_{sport}_premium"
+
+
+def pick(obj: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    return {f: obj.get(f) for f in fields if f in obj}
+
+
+def item_events(patch, list_name, new_items, item_id_field, fields, base):
+    """Turn the patch ops under one keyed list into per-item change events."""
+    events = []
+    by_id = None
+    for item_id, info in changed_items(patch, list_name).items():
+        if info["op"] == "remove":
+            changed = {"removed": True}
+        else:
+            if by_id is None:
+                by_id = {str(i.get(item_id_field)): i for i in new_items}
+            item = by_id.get(item_id, {})
+            changed = pick(item, fields if info["op"] == "add" else [f for f in fields if f in info["fields"]])
+        if changed:
+            events.append({**base(item_id), "changed": changed})
+    return events
+
+
+class ChangePublisher:
+    def __init__(self, client=None, maxlen: int = STREAM_MAXLEN, pubsub: bool = PUBLISH_PUBSUB):
+        self._client = client
+        self.maxlen = maxlen
+        self.pubsub = pubsub
+        self.last: Dict[str, Dict[str, Any]] = {}   # "m:<marketId>" / "f:<eventId>" -> last published document
+        self.published = 0
+        self.dropped = 0
+        self.retry_at = 0.0
+        self.backoff = PUBLISH_RETRY
+        self._connecting = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            if EVENTS_REDIS_URL:
+                import redis
+                self._client = redis.Redis.from_url(EVENTS_REDIS_URL)
+            else:
+                import redis_data  # reuse the shared connection
+                self._client = redis_data.get_redis()
+        return self._client
+
+    def ready(self) -> bool:
+        """True when events can be sent now. Connecting happens on a background thread."""
+        if time.monotonic() < self.retry_at:
+            return False
+        if self._client is not None:
+            return True
+        if self._connecting is None or not self._connecting.is_alive():
+            self._connecting = threading.Thread(target=lambda: self.client, name="events-connect", daemon=True)
+            self._connecting.start()
+        return False
+
+    def _failed(self, error):
+        print(f"❌ Redis stream publish error ({error}) - retrying in {self.backoff}s")
+        self.retry_at = time.monotonic() + self.backoff
+        self.backoff = min(self.backoff * 2, PUBLISH_RETRY_MAX)
+
+    # ---------- change detection (diff_engine) ----------
+    def market_events(self, market: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Events for a queryFullMarkets market (odds.py payload)."""
+        event_id = str(market.get("eventId", ""))
+        market_id = str(market.get("marketId", ""))
+        version = market.get("version", int(time.time() * 1000))
+        old = self.last.get(f"m:{market_id}")
+        patch = diff(old or {"selections": []}, market)
+
+        events = []
+        top = {op["path"].split("/")[1] for op in patch}
+        changed = pick(market, [f for f in MARKET_FIELDS if f in top])
+        if changed:
+            events.append({"kind": "market", "event_id": event_id, "market_id": market_id,
+                           "changed": changed, "version": version})
+        events += item_events(
+            patch, "selections", market.get("selections", []), "selectionId", RUNNER_FIELDS,
+            lambda sel_id: {"kind": "runner", "event_id": event_id, "market_id": market_id,
+                            "selection_id": sel_id, "version": version})
+        return self._baseline(f"m:{market_id}", market, events)
+
+    def fancy_events(self, event_id: str, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Events for a merged dmFancyBet document (premium.py payload)."""
+        event_id = str(event_id)
+        version = data.get("version", int(time.time() * 1000))
+        old = self.last.get(f"f:{event_id}")
+        patch = diff({"dmFancyBetMarkets": old.get("dmFancyBetMarkets", []) if old else []},
+                     {"dmFancyBetMarkets": data.get("dmFancyBetMarkets", [])})
+        events = item_events(
+            patch, "dmFancyBetMarkets", data.get("dmFancyBetMarkets", []), "apiSiteMarketId", FANCY_FIELDS,
+            lambda market_id: {"kind": "fancy", "event_id": event_id, "market_id": market_id,
+                               "version": version})
+        return self._baseline(f"f:{event_id}", data, events)
+
+    def _baseline(self, key: str, doc: Dict[str, Any], events: List[Dict[str, Any]]):
+        """doc becomes the diff baseline now if nothing changed, else once publish() sent its events."""
+        if not events:
+            self.last[key] = doc
+        for ev in events:
+            ev["_baseline"] = (key, doc)
+        return events
+
+    # ---------- publishing ----------
+    def publish(self, sport: str, events: List[Dict[str, Any]]) -> int:
+        if not events:
+            return 0
+        if not self.ready():
+            self.dropped += len(events)
+            return 0
+        key = stream_key(sport)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for ev in events:
+                ev = {k: v for k, v in ev.items() if k != "_baseline"}
+                fields = {k: (json.dumps(v, separators=(',', ':')) if isinstance(v, (dict, list)) else str(v))
+                          for k, v in ev.items()}
+                pipe.xadd(key, fields, maxlen=self.maxlen, approximate=True)
+                if self.pubsub:
+                    pipe.publish(key, json.dumps(ev, separators=(',', ':')))
+            pipe.execute()
+            for ev in events:
+                if "_baseline" in ev:
+                    doc_key, doc = ev["_baseline"]
+                    self.last[doc_key] = doc
+            self.published += len(events)
+            self.backoff = PUBLISH_RETRY
+            return len(events)
+        except Exception as e:
+            self.dropped += len(events)
+            self._failed(e)
+            return 0
+
+    def publish_market(self, sport: str, market: Dict[str, Any]) -> int:
+        return self.publish(sport, self.market_events(market))
+
+    def publish_fancy(self, sport: str, event_id: str, data: Dict[str, Any]) -> int:
+        return self.publish(sport, self.fancy_events(event_id, data))
+
+    def forget_event(self, event_id: str, market_ids=()):
+        """Drop cached state for an event that left play."""
+        self.last.pop(f"f:{event_id}", None)
+        for m in market_ids:
+            self.last.pop(f"m:{m}", None)
+
+
+# -------------------- Shared instance --------------------
+_publisher = None
+
+def get_publisher() -> ChangePublisher:
+    global _publisher
+    if _publisher is None:
+        _publisher = ChangePublisher()
+    return _publisher
+
+
+# -------------------- Tail (manual testing) --------------------
+def tail(sport: str, url: str = EVENTS_REDIS_URL or "redis://localhost:6379/0"):
+    import redis
+    client = redis.Redis.from_url(url)
+    key = stream_key(sport)
+    last_id = "$"
+    print(f"👂 Tailing {key} on {url}")
+    while True:
+        for _, entries in client.xread({key: last_id}, block=5000) or []:
+            for entry_id, fields in entries:
+                last_id = entry_id
+                print(entry_id.decode(), {k.decode(): v.decode() for k, v in fields.items()})
+
+
+def check(url: str = EVENTS_REDIS_URL or "redis://localhost:6379/0") -> bool:
+    """Publish two ticks of a synthetic market to a real server and read the stream back."""
+    import redis
+    client = redis.Redis.from_url(url)
+    sport = f"check{int(time.time())}"
+    publisher = ChangePublisher(client)
+    market = {"eventId": 1, "marketId": "1.1", "status": "OPEN", "version": 1, "selections": [
+        {"selectionId": 11, "status": "ACTIVE", "availableToBack": [{"price": 1.9, "size": 5}]},
+        {"selectionId": 12, "status": "ACTIVE", "availableToBack": [{"price": 2.1, "size": 5}]}]}
+    first = publisher.publish_market(sport, market)
+    market = json.loads(json.dumps(market))  # a fresh document, as every fetch returns one
+    market["selections"][1]["availableToBack"] = [{"price": 2.2, "size": 5}]
+    second = publisher.publish_market(sport, market)
+    # a change made while publishing is down must still go out on the next tick
+    market = json.loads(json.dumps(market))
+    market["selections"][0]["availableToBack"] = [{"price": 1.8, "size": 5}]
+    publisher.retry_at = time.monotonic() + 60
+    dropped = publisher.publish_market(sport, market)
+    publisher.retry_at = 0.0
+    third = publisher.publish_market(sport, json.loads(json.dumps(market)))
+    entries = client.xrange(stream_key(sport))
+    client.delete(stream_key(sport))
+    last = {k.decode(): v.decode() for k, v in entries[-1][1].items()} if entries else {}
+    ok = (first, second, dropped, third, len(entries)) == (3, 1, 0, 1, 5) and last.get("selection_id") == "11"
+    print(f"{'✅' if ok else '❌'} {url}: ticks published {first}, {second}, {dropped} (down), {third} (after), "
+          f"stream holds {len(entries)}")
+    return ok
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "check":
+        sys.exit(0 if check(*sys.argv[2:3]) else 1)
+    tail(sys.argv[1] if len(sys.argv) > 1 else "cricket", *sys.argv[2:3])
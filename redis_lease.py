@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Multi-node work leasing through Redis
+- Live events are split into NUM_SHARDS shards (hash of eventId). Every loop (odds, fancy,
+  redis_data) leases its own shard set under  lease:<loop>:..., so the feeds of one host
+  don't split the events between themselves.
+- Each shard has a lease key  lease:<loop>:shard:<n>  = "<node_id>:<fencing token>"  with a TTL.
+  Tokens come from INCR on lease:<loop>:fence:<n>, so every new owner gets a larger token.
+- A daemon thread heartbeats into lease:<loop>:nodes, claims free shards up to the fair share,
+  renews what it owns every LEASE_TTL/3 and releases shards above the share when another node
+  joins, independent of how long a scrape cycle takes. A dead node's shards are free again
+  after at most LEASE_TTL; leases are released on exit.
+- A shard whose renewal hasn't succeeded for LEASE_TTL counts as lost, even before Redis says so.
+- guarded_set() / GUARDED_SET_SCRIPT only write a key while the caller still holds the shard
+  with that token (redis_data.py routes its record writes through it when LEASING is on).
+- Try it locally:  python redis_lease.py node-a redis://localhost:6379/0   (start 2-3 of them)
+"""
+
+import os
+import sys
+import time
+import math
+import uuid
+import atexit
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+# -------------------- Config --------------------
+NUM_SHARDS = 32
+LEASE_TTL = 10                 # seconds; upper bound for takeover of a dead node's shards
+LEASE_REDIS_URL = os.environ.get("LEASE_REDIS_URL")  # else redis_data's client
+PREFIX = "lease"
+
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+GUARDED_SET_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if tonumber(ARGV[3]) > 0 then
+    redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+else
+    redis.call('SET', KEYS[2], ARGV[2])
+end
+return 1
+"""
+
+
+def shard_for(event_id, shards: int = NUM_SHARDS) -> int:
+    return int.from_bytes(hashlib.md5(str(event_id).encode("utf-8")).digest()[:4], "big") % shards
+
+
+class LeaseManager:
+    def __init__(self, node_id: Optional[str] = None, client=None,
+                 shards: int = NUM_SHARDS, ttl: int = LEASE_TTL, name: str = "scrape"):
+        self.node_id = node_id or f"{os.uname().nodename}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._client = client
+        self.name = name
+        self.prefix = f"{PREFIX}:{name}"
+        self.shards = shards
+        self.ttl_ms = ttl * 1000
+        self.owned: Dict[int, str] = {}   # shard -> lease value "<node_id>:<token>"
+        self.renewed_at = 0.0             # monotonic time of the last successful tick
+        self.lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._scripts = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            if LEASE_REDIS_URL:
+                import redis
+                self._client = redis.Redis.from_url(LEASE_REDIS_URL)
+            else:
+                import redis_data  # reuse the shared connection
+                self._client = redis_data.get_redis()
+        return self._client
+
+    def _script(self, name):
+        if self._scripts is None:
+            self._scripts = {
+                "renew": self.client.register_script(RENEW_SCRIPT),
+                "release": self.client.register_script(RELEASE_SCRIPT),
+                "guarded_set": self.client.register_script(GUARDED_SET_SCRIPT),
+            }
+        return self._scripts[name]
+
+    def lease_key(self, shard: int) -> str:
+        return f"{self.prefix}:shard:{shard}"
+
+    # ---------- membership ----------
+    def live_nodes(self) -> int:
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.zadd(f"{self.prefix}:nodes", {self.node_id: now})
+        pipe.zremrangebyscore(f"{self.prefix}:nodes", 0, now - self.ttl_ms / 1000)
+        pipe.zcard(f"{self.prefix}:nodes")
+        return max(1, pipe.execute()[-1])
+
+    # ---------- lease operations ----------
+    def _claim(self, shard: int) -> bool:
+        token = self.client.incr(f"{self.prefix}:fence:{shard}")
+        value = f"{self.node_id}:{token}"
+        if self.client.set(self.lease_key(shard), value, nx=True, px=self.ttl_ms):
+            self.owned[shard] = value
+            return True
+        return False
+
+    def _renew(self, shard: int) -> bool:
+        return bool(self._script("renew")(keys=[self.lease_key(shard)], args=[self.owned[shard], self.ttl_ms]))
+
+    def release(self, shard: int):
+        value = self.owned.pop(shard, None)
+        if value:
+            self._script("release")(keys=[self.lease_key(shard)], args=[value])
+
+    def tick(self):
+        """Renew owned leases, drop lost ones, claim / release towards the fair share."""
+        if not self.client:
+            return
+        with self.lock:
+            started = time.monotonic()
+            try:
+                for shard in list(self.owned):
+                    if not self._renew(shard):
+                        print(f"⚠️ {self.name}: lost lease on shard {shard}")
+                        self.owned.pop(shard, None)
+
+                target = math.ceil(self.shards / self.live_nodes())
+                while len(self.owned) > target:
+                    self.release(max(self.owned))
+                if len(self.owned) < target:
+                    held = self.client.mget([self.lease_key(s) for s in range(self.shards)])
+                    for shard, holder in enumerate(held):
+                        if len(self.owned) >= target:
+                            break
+                        if holder is None and shard not in self.owned:
+                            self._claim(shard)
+                self.renewed_at = started
+            except Exception as e:
+                print(f"❌ {self.name}: lease tick error: {e}")
+
+    def start(self):
+        """Claim now, then renew every LEASE_TTL/3 on a daemon thread until shutdown()."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.tick()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{self.name}", daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stop.wait(self.ttl_ms / 3000):
+            self.tick()
+
+    def shutdown(self):
+        self._stop.set()
+        with self.lock:
+            try:
+                for shard in list(self.owned):
+                    self.release(shard)
+                self.client.zrem(f"{self.prefix}:nodes", self.node_id)
+            except Exception:
+                self.owned.clear()
+
+    def valid(self) -> bool:
+        """False once renewals have failed for a whole TTL: the leases may belong to someone else."""
+        return time.monotonic() - self.renewed_at < self.ttl_ms / 1000
+
+    # ---------- queries used by the scrape loops ----------
+    def owns(self, event_id) -> bool:
+        return self.valid() and shard_for(event_id, self.shards) in self.owned
+
+    def fence(self, event_id) -> Optional[Tuple[str, str]]:
+        """(lease key, lease value) to check a write against, None when the shard isn't ours."""
+        shard = shard_for(event_id, self.shards)
+        lease = self.owned.get(shard)
+        if not lease or not self.valid():
+            return None
+        return self.lease_key(shard), lease
+
+    def guarded_set(self, event_id, key: str, value, ttl: Optional[int] = None) -> bool:
+        """SET key=value (EX ttl) only while this node still holds the event's shard (fencing)."""
+        fence = self.fence(event_id)
+        if not fence:
+            return False
+        return bool(self._script("guarded_set")(keys=[fence[0], key], args=[fence[1], value, ttl or 0]))
+
+
+# -------------------- Shared instances --------------------
+_managers = {}
+
+def get_lease_manager(loop: str = "scrape") -> LeaseManager:
+    if loop not in _managers:
+        _managers[loop] = LeaseManager(name=loop)
+    return _managers[loop]
+
+
+def filter_owned(events, id_field: str = "event_id", loop: str = "scrape"):
+    """Keep only the events whose shard this node currently holds for the given loop."""
+    manager = get_lease_manager(loop)
+    manager.start()  # no-op once the renewal thread runs
+    return [e for e in events if manager.owns(e[id_field])]
+
+
+# -------------------- Local demo node --------------------
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        LEASE_REDIS_URL = sys.argv[2]
+    manager = LeaseManager(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"🔐 Node {manager.node_id} joining ({NUM_SHARDS} shards, TTL {LEASE_TTL}s)")
+    manager.start()
+    try:
+        while True:
+            print(f"{time.strftime('%H:%M:%S')} owns {len(manager.owned)}: {sorted(manager.owned)}")
+            time.sleep(LEASE_TTL / 3)
+    except KeyboardInterrupt:
+        manager.shutdown()
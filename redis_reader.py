@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Read-side client for the in_play_<sport>_premium:* keyspace written by redis_data.py
+- live_matches(sport), match(sport, id), premium_markets(sport, id), fancy(sport, id)
+- Listings use SCAN once and values come in batched MGETs of READ_BATCH keys.
+- Results are cached locally and invalidated by the server:
+    1. CLIENT TRACKING ... BCAST PREFIX in_play_ redirected to a connection subscribed
+       to __redis__:invalidate (Redis >= 6), or
+    2. keyspace notifications (__keyspace@<db>__:in_play_*) as a fallback, only when the server
+       already has them enabled (K plus $gx or A). CONFIG SET changes them for every client, so
+       the reader only does that with SET_KEYSPACE_EVENTS = True; otherwise caching stays off.
+  Every write / expire / delete under the prefix drops the cached value and the listing
+  it belongs to, so repeated reads of unchanged matches never touch the network.
+- While no invalidation channel is up (start-up, reconnect) reads go straight to Redis.
+- Snapshot mode is followed: the current_generation pointer(s) are read (and cached) first;
+  per-node generations (redis_data LEASING) are merged.
+- Values written with redis_data.COMPRESS_VALUES are decoded transparently (redis_codec.py).
+- Usage:  python redis_reader.py cricket
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional
+
+from redis_codec import decode as decode_value
+
+# -------------------- Config --------------------
+READER_REDIS_URL = os.environ.get("READER_REDIS_URL")  # else redis_data.REDIS_CONFIG
+PREFIX = "in_play_"
+READ_BATCH = 500
+RECONNECT_DELAY = 2        # seconds between invalidation channel reconnects
+KEEPALIVE = 30             # seconds between PINGs on the tracking connection
+SET_KEYSPACE_EVENTS = False  # opt-in: CONFIG SET notify-keyspace-events when tracking is unavailable
+
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, (bytes, bytearray)) else value
+
+
+def decode(raw) -> Optional[Any]:
+    if raw is None:
+        return None
+    try:
+        return json.loads(decode_value(raw))  # plain JSON or redis_codec values
+    except ValueError:  # also raised by redis_codec for corrupt or foreign zstd frames
+        return None
+
+
+class InvalidationUnavailable(Exception):
+    """Neither client tracking nor keyspace notifications can be used: reads stay uncached."""
+
+
+class RedisReader:
+    def __init__(self, client=None, caching: bool = True):
+        self._client = client
+        self.caching = caching
+        self.values: Dict[str, Any] = {}         # key -> decoded value (None = key missing)
+        self.listings: Dict[str, List[str]] = {}  # key prefix -> keys under it
+        self.inflight: Dict[str, bool] = {}       # key/prefix -> still valid while being fetched
+        self.lock = threading.Lock()
+        self.mode = None                          # "tracking" | "keyspace" | None (no cache)
+        self.stats = {"hits": 0, "misses": 0, "round_trips": 0, "invalidations": 0}
+        self._thread = None
+        self._stop = False
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+            if READER_REDIS_URL:
+                self._client = redis.Redis.from_url(READER_REDIS_URL)
+            else:
+                from redis_data import REDIS_CONFIG
+                self._client = redis.Redis(**REDIS_CONFIG)
+        return self._client
+
+    # ---------- invalidation channel ----------
+    def start(self):
+        if self.caching and self._thread is None:
+            self._thread = threading.Thread(target=self._listen, name="redis-reader-invalidate", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        self._stop = True
+
+    def _command(self, conn, *args):
+        conn.send_command(*args)
+        return conn.read_response()
+
+    def _subscribe(self):
+        """Open the invalidation connection; returns (listener, tracker) connections."""
+        pool = self.client.connection_pool
+        listener = pool.make_connection()
+        listener.connect()
+        client_id = self._command(listener, "CLIENT", "ID")
+        tracker = pool.make_connection()
+        tracker.connect()
+        try:
+            self._command(tracker, "CLIENT", "TRACKING", "ON", "REDIRECT", client_id, "BCAST", "PREFIX", PREFIX)
+            self._command(listener, "SUBSCRIBE", INVALIDATE_CHANNEL)
+            self.mode = "tracking"
+            return listener, tracker
+        except Exception as e:
+            print(f"⚠️ Client tracking unavailable ({e}) - falling back to keyspace notifications")
+            tracker.disconnect()
+        flags = _text(self._command(listener, "CONFIG", "GET", "notify-keyspace-events")[1])
+        if "K" not in flags or not ("A" in flags or set("$gx") <= set(flags)):
+            if not SET_KEYSPACE_EVENTS:
+                raise InvalidationUnavailable(f"keyspace notifications are off (notify-keyspace-events={flags!r})")
+            flags = "".join(sorted(set(flags) | set("K$gx")))
+            self._command(listener, "CONFIG", "SET", "notify-keyspace-events", flags)
+        db = pool.connection_kwargs.get("db", 0)
+        self._command(listener, "PSUBSCRIBE", f"__keyspace@{db}__:{PREFIX}*")
+        self.mode = "keyspace"
+        return listener, None
+
+    def _listen(self):
+        delay = RECONNECT_DELAY
+        while not self._stop:
+            listener = tracker = None
+            try:
+                listener, tracker = self._subscribe()
+                self.clear()  # anything cached before the channel was up may be stale
+                delay = RECONNECT_DELAY
+                print(f"✅ Redis reader cache on ({self.mode})")
+                last_ping = time.monotonic()
+                while not self._stop:
+                    if listener.can_read(timeout=1):
+                        self._on_message(listener.read_response())
+                    if tracker and time.monotonic() - last_ping > KEEPALIVE:
+                        self._command(tracker, "PING")  # tracking ends if this connection drops
+                        last_ping = time.monotonic()
+            except InvalidationUnavailable as e:
+                print(f"⚠️ Redis reader cache disabled: {e}")
+                self.caching = False
+                self._stop = True
+            except Exception as e:
+                if not self._stop:
+                    print(f"⚠️ Redis reader invalidation channel lost: {e}")
+            finally:
+                self.mode = None
+                self.clear()
+                for conn in (listener, tracker):
+                    if conn is not None:
+                        conn.disconnect()
+            if not self._stop:
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    def _on_message(self, msg):
+        kind = _text(msg[0])
+        if kind == "message" and _text(msg[1]) == INVALIDATE_CHANNEL:
+            if msg[2] is None:  # FLUSHDB / FLUSHALL
+                self.clear()
+            else:
+                self.invalidate([_text(k) for k in msg[2]])
+        elif kind == "pmessage":
+            self.invalidate([_text(msg[2]).split(":", 1)[1]])
+
+    def invalidate(self, keys: List[str]):
+        with self.lock:
+            for key in keys:
+                self.values.pop(key, None)
+                for prefix in [p for p in self.listings if key.startswith(p)]:
+                    del self.listings[prefix]
+                for name in self.inflight:
+                    if key.startswith(name):  # the key itself or a listing prefix
+                        self.inflight[name] = False
+            self.stats["invalidations"] += len(keys)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+            self.listings.clear()
+            for name in self.inflight:
+                self.inflight[name] = False
+
+    # ---------- cached reads ----------
+    def _cached(self, store: Dict[str, Any], name: str):
+        with self.lock:
+            if self.mode and name in store:
+                self.stats["hits"] += 1
+                return True, store[name]
+            self.stats["misses"] += 1
+            self.inflight[name] = True
+            return False, None
+
+    def _remember(self, store: Dict[str, Any], name: str, value):
+        """Cache a fetched value unless it was invalidated while the fetch was running."""
+        with self.lock:
+            if self.inflight.pop(name, False) and self.mode:
+                store[name] = value
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        result, missing = {}, []
+        for key in keys:
+            hit, value = self._cached(self.values, key)
+            if hit:
+                result[key] = value
+            else:
+                missing.append(key)
+        for i in range(0, len(missing), READ_BATCH):
+            chunk = missing[i:i + READ_BATCH]
+            self.stats["round_trips"] += 1
+            for key, raw in zip(chunk, self.client.mget(chunk)):
+                value = decode(raw)
+                self._remember(self.values, key, value)
+                result[key] = value
+        return result
+
+    def get(self, key: str):
+        return self.get_many([key])[key]
+
+    def keys(self, prefix: str) -> List[str]:
+        hit, keys = self._cached(self.listings, prefix)
+        if hit:
+            return keys
+        self.stats["round_trips"] += 1
+        keys = sorted(_text(k) for k in self.client.scan_iter(match=f"{prefix}*", count=READ_BATCH))
+        self._remember(self.listings, prefix, keys)
+        return keys
+
+    # ---------- in_play keyspace ----------
+    def bases(self, sport: str) -> List[str]:
+        """Key prefixes readers should see: the current generation (redis_data SNAPSHOT_MODE), one
+        per node when the nodes lease their shards, or the live keys. Oldest generation first."""
+        pointer = f"in_play_{sport}_premium:current_generation"
+        nodes = self.get_many(self.keys(f"{pointer}:"))
+        if any(gen is not None for gen in nodes.values()):
+            gens = sorted((int(gen), key[len(pointer) + 1:]) for key, gen in nodes.items() if gen is not None)
+            return [f"in_play_{sport}_premium:gen:{node}:{gen}:" for gen, node in gens]
+        gen = self.get(pointer)
+        if gen is not None:
+            return [f"in_play_{sport}_premium:gen:{int(gen)}:"]
+        return [f"in_play_{sport}_premium:"]
+
+    def records(self, sport: str, kind: str) -> Dict[str, Any]:
+        """All records of one kind (match | premium_markets | fancy) for a sport, by match id."""
+        merged = {}
+        for base in self.bases(sport):  # a newer node generation wins for a match that moved
+            found = self.get_many(self.keys(f"{base}{kind}:"))
+            merged.update({key.rsplit(":", 1)[1]: value for key, value in found.items() if value is not None})
+        return merged
+
+    def record(self, sport: str, kind: str, match_id) -> Optional[Any]:
+        keys = [f"{base}{kind}:{match_id}" for base in self.bases(sport)]
+        found = self.get_many(keys)
+        return next((found[key] for key in reversed(keys) if found[key] is not None), None)
+
+    def live_matches(self, sport: str) -> Dict[str, Any]:
+        return self.records(sport, "match")
+
+    def match(self, sport: str, match_id):
+        return self.record(sport, "match", match_id)
+
+    def premium_markets(self, sport: str, match_id):
+        return self.record(sport, "premium_markets", match_id)
+
+    def fancy(self, sport: str, match_id):
+        return self.record(sport, "fancy", match_id)
+
+
+# -------------------- Shared instance --------------------
+_reader = None
+
+def get_reader() -> RedisReader:
+    global _reader
+    if _reader is None:
+        _reader = RedisReader().start()
+    return _reader
+
+
+if __name__ == "__main__":
+    sport = sys.argv[1] if len(sys.argv) > 1 else "cricket"
+    reader = get_reader()
+    time.sleep(1)  # let the invalidation channel come up
+    for attempt in range(3):
+        started = time.perf_counter()
+        matches = reader.live_matches(sport)
+        print(f"📖 {len(matches)} live {sport} matches in {(time.perf_counter() - started) * 1000:.2f} ms")
+    print(f"📊 {reader.stats} (cache: {reader.mode or 'off'})")
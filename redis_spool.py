@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Durable local spool for Redis writes made while Redis is unreachable
+- put(key, value, ttl) stores the write in a small SQLite file (WAL). One row per key:
+  a newer write for the same key replaces the older one (coalescing) and moves to the
+  end of the replay order.
+- replay(client) sends the spooled writes in order in pipelined batches of REPLAY_BATCH,
+  with the TTL that is left; entries whose TTL already ran out are dropped. Replayed rows
+  are deleted batch by batch, so an interrupted replay resumes where it stopped.
+- Bounded by SPOOL_MAX_ENTRIES / SPOOL_MAX_BYTES: past either limit the oldest writes
+  are dropped (and counted).
+- metrics() / metrics_line() report entries, bytes, coalesced, dropped, replayed, expired.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from typing import Any, Dict
+
+# -------------------- Config --------------------
+SPOOL_PATH = os.environ.get("REDIS_SPOOL", "redis_spool.db")
+SPOOL_MAX_ENTRIES = 50000
+SPOOL_MAX_BYTES = 64 * 1024 * 1024
+REPLAY_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool (
+    key        TEXT PRIMARY KEY,
+    seq        INTEGER NOT NULL,
+    value      BLOB NOT NULL,
+    expire_at  REAL               -- unix time, NULL = no TTL
+);
+CREATE INDEX IF NOT EXISTS idx_spool_seq ON spool (seq);
+"""
+
+
+class RedisSpool:
+    def __init__(self, path: str = SPOOL_PATH, max_entries: int = SPOOL_MAX_ENTRIES, max_bytes: int = SPOOL_MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        seq, entries, size = self.conn.execute(
+            "SELECT COALESCE(MAX(seq), 0), COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM spool").fetchone()
+        self.seq = seq
+        self.entries = entries
+        self.bytes = size
+        self.stats = {"spooled": 0, "coalesced": 0, "dropped": 0, "replayed": 0, "expired": 0}
+        self.last_replay = 0.0
+
+    def __len__(self):
+        return self.entries
+
+    def put(self, key: str, value: bytes, ttl: int = None):
+        expire_at = time.time() + ttl if ttl else None
+        with self.lock:
+            self.seq += 1
+            old = self.conn.execute("SELECT LENGTH(value) FROM spool WHERE key = ?", (key,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO spool (key, seq, value, expire_at) VALUES (?, ?, ?, ?)",
+                              (key, self.seq, sqlite3.Binary(value), expire_at))
+            self.stats["spooled"] += 1
+            if old:
+                self.stats["coalesced"] += 1
+                self.bytes -= old[0]
+            else:
+                self.entries += 1
+            self.bytes += len(value)
+            if self.entries > self.max_entries or self.bytes > self.max_bytes:
+                self._trim()
+
+    def _trim(self):
+        """Drop the oldest writes until both limits hold again (lock held)."""
+        while self.entries > self.max_entries or self.bytes > self.max_bytes:
+            rows = self.conn.execute("SELECT key, LENGTH(value) FROM spool ORDER BY seq LIMIT 100").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self.conn.execute("DELETE FROM spool WHERE key = ?", (key,))
+                self.entries -= 1
+                self.bytes -= size
+                self.stats["dropped"] += 1
+                if self.entries <= self.max_entries and self.bytes <= self.max_bytes:
+                    break
+
+    def replay(self, client, batch: int = REPLAY_BATCH) -> int:
+        """Send every spooled write to Redis in order. Raises on Redis errors (rest stays spooled)."""
+        started = time.perf_counter()
+        replayed = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute("SELECT key, seq, value, expire_at FROM spool ORDER BY seq LIMIT ?",
+                                         (batch,)).fetchall()
+            if not rows:
+                break
+            now = time.time()
+            pipe = client.pipeline(transaction=False)
+            sent = 0
+            for key, _, value, expire_at in rows:
+                if expire_at is None:
+                    pipe.set(key, bytes(value))
+                elif expire_at > now:
+                    pipe.set(key, bytes(value), px=max(1, int((expire_at - now) * 1000)))
+                else:
+                    self.stats["expired"] += 1
+                    continue
+                sent += 1
+            if sent:
+                pipe.execute()
+            with self.lock:
+                for key, seq, value, _ in rows:
+                    # only delete what was sent: a put() during the replay has a newer seq
+                    if self.conn.execute("DELETE FROM spool WHERE key = ? AND seq = ?", (key, seq)).rowcount:
+                        self.entries -= 1
+                        self.bytes -= len(value)
+            replayed += sent
+        self.stats["replayed"] += replayed
+        self.last_replay = time.perf_counter() - started
+        return replayed
+
+    def metrics(self) -> Dict[str, Any]:
+        return dict(self.stats, entries=self.entries, bytes=self.bytes, last_replay_s=round(self.last_replay, 3))
+
+    def metrics_line(self) -> str:
+        m = self.metrics()
+        return (f"📼 Spool: {m['entries']} pending ({m['bytes'] / 1024:.0f} KB) | spooled {m['spooled']} "
+                f"coalesced {m['coalesced']} dropped {m['dropped']} | replayed {m['replayed']} "
+                f"expired {m['expired']} (last replay {m['last_replay_s']}s)")
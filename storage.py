@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pluggable storage for scraped matches / markets / fancy / tournaments
+- STORAGE_BACKEND = "files"  -> the scripts keep writing their JSON files (default)
+- STORAGE_BACKEND = "sqlite" -> one local SQLite database in WAL mode instead of
+  thousands of small files. put() only buffers; commit() writes the whole cycle
+  in one transaction. Indexed on kind+sport+update time, tournament and eventId.
+- A finished event's rows are deleted by the loops' lifecycle hooks (delete_event());
+  anything else not updated for RETENTION seconds is pruned from commit() every PRUNE_INTERVAL.
+- Query helpers:  python storage.py live cricket market
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+# -------------------- Config --------------------
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "files")   # "files" | "sqlite"
+DB_PATH = os.environ.get("STORAGE_DB", "scraper.db")
+LIVE_WINDOW = 120   # seconds; a record updated within this window counts as live
+RETENTION = 24 * 3600   # seconds; records not updated for this long are pruned
+PRUNE_INTERVAL = 3600   # seconds between prunes
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    kind          TEXT NOT NULL,      -- match | market | tournament (scrap.py), odds | odds_match, fancy, analytics
+    key           TEXT NOT NULL,
+    sport         TEXT NOT NULL DEFAULT '',
+    tournament_id TEXT NOT NULL DEFAULT '',
+    event_id      TEXT NOT NULL DEFAULT '',
+    updated_at    REAL NOT NULL,
+    data          TEXT NOT NULL,
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_records_sport ON records (kind, sport, updated_at);
+CREATE INDEX IF NOT EXISTS idx_records_tournament ON records (tournament_id, kind);
+CREATE INDEX IF NOT EXISTS idx_records_event ON records (event_id, kind);
+CREATE INDEX IF NOT EXISTS idx_records_updated ON records (updated_at);
+"""
+
+UPSERT = """
+INSERT INTO records (kind, key, sport, tournament_id, event_id, updated_at, data)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (kind, key) DO UPDATE SET
+    sport = excluded.sport, tournament_id = excluded.tournament_id, event_id = excluded.event_id,
+    updated_at = excluded.updated_at, data = excluded.data
+"""
+
+
+class SQLiteStorage:
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.buffer: Dict[tuple, tuple] = {}   # (kind, key) -> row, last put wins
+        self.pruned_at = time.time()
+
+    def put(self, kind: str, key, data: Any, sport: str = "", tournament_id="", event_id=""):
+        row = (kind, str(key), sport or "", str(tournament_id or ""), str(event_id or ""), time.time(),
+               json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+        with self.lock:
+            self.buffer[(kind, str(key))] = row
+
+    def commit(self) -> int:
+        """Write everything buffered this cycle in a single transaction."""
+        with self.lock:
+            rows, self.buffer = list(self.buffer.values()), {}
+            if not rows:
+                return 0
+            try:
+                self.conn.execute("BEGIN")
+                self.conn.executemany(UPSERT, rows)
+                self.conn.execute("COMMIT")
+            except Exception as e:
+                self.conn.execute("ROLLBACK")
+                print(f"❌ SQLite commit error: {e}")
+                return 0
+        if time.time() - self.pruned_at >= PRUNE_INTERVAL:
+            self.pruned_at = time.time()
+            removed = self.prune(self.pruned_at - RETENTION)
+            if removed:
+                print(f"🧹 SQLite: pruned {removed} records older than {RETENTION // 3600}h")
+        return len(rows)
+
+    def delete(self, kind: str, key):
+        """Drop a record (and anything still buffered for it)."""
+        with self.lock:
+            self.buffer.pop((kind, str(key)), None)
+            self.conn.execute("DELETE FROM records WHERE kind = ? AND key = ?", (kind, str(key)))
+
+    def delete_event(self, event_id, *kinds: str) -> int:
+        """Drop an event's records of the given kinds (a loop only removes what it wrote)."""
+        event_id = str(event_id)
+        with self.lock:
+            for k in [k for k in self.buffer if k[0] in kinds and self.buffer[k][4] == event_id]:
+                del self.buffer[k]
+            marks = ",".join("?" * len(kinds))
+            return self.conn.execute(f"DELETE FROM records WHERE event_id = ? AND kind IN ({marks})",
+                                     (event_id, *kinds)).rowcount
+
+    def get(self, kind: str, key) -> Optional[Any]:
+        with self.lock:
+            row = self.buffer.get((kind, str(key)))
+            if row:
+                return json.loads(row[-1])
+            found = self.conn.execute("SELECT data FROM records WHERE kind = ? AND key = ?",
+                                      (kind, str(key))).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def _select(self, sql: str, args, raw: bool = False) -> List[Any]:
+        with self.lock:
+            rows = [r[0] for r in self.conn.execute(sql, args)]
+        return rows if raw else [json.loads(r) for r in rows]
+
+    def live(self, kind: str, sport: Optional[str] = None, window: int = LIVE_WINDOW, raw: bool = False) -> List[Any]:
+        """e.g. live("market", "cricket") -> all cricket markets updated in the last window seconds.
+        raw=True returns the stored JSON strings (skips decoding when they are passed straight on)."""
+        since = time.time() - window
+        if sport:
+            return self._select("SELECT data FROM records WHERE kind = ? AND sport = ? AND updated_at >= ?",
+                                (kind, sport, since), raw)
+        return self._select("SELECT data FROM records WHERE kind = ? AND updated_at >= ?", (kind, since), raw)
+
+    def by_event(self, event_id) -> Dict[str, Any]:
+        with self.lock:
+            rows = self.conn.execute("SELECT kind, data FROM records WHERE event_id = ?", (str(event_id),)).fetchall()
+        return {kind: json.loads(data) for kind, data in rows}
+
+    def by_tournament(self, tournament_id, kind: str = "match") -> List[Any]:
+        return self._select("SELECT data FROM records WHERE tournament_id = ? AND kind = ?",
+                            (str(tournament_id), kind))
+
+    def prune(self, older_than: float) -> int:
+        """Delete records not updated since the given unix time."""
+        with self.lock:
+            return self.conn.execute("DELETE FROM records WHERE updated_at < ?", (older_than,)).rowcount
+
+
+# -------------------- Shared instance --------------------
+_storage = None
+
+def get_storage() -> Optional[SQLiteStorage]:
+    """The SQLite backend when enabled, None when the scripts should write their files."""
+    global _storage
+    if STORAGE_BACKEND != "sqlite":
+        return None
+    if _storage is None:
+        _storage = SQLiteStorage()
+    return _storage
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "live":
+        db = SQLiteStorage()
+        started = time.perf_counter()
+        rows = db.live(sys.argv[3] if len(sys.argv) > 3 else "market", sys.argv[2], raw=True)
+        print(f"✅ {len(rows)} live records in {(time.perf_counter() - started) * 1000:.2f} ms")
+    else:
+        print("Usage: python storage.py live <sport> [match|market|fancy|tournament]")
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Consumer subscriptions and demand-driven polling
+- Consumers register interest in a sport, an event or a market with a TTL. Everything lives
+  in one Redis sorted set  subs:interest  with member "<kind>:<id>|<consumer>" and the expiry
+  (ms) as score; an interest nobody renews simply times out.
+- Register through subscribe() / unsubscribe(), through the small HTTP API below, or by
+  connecting to push_server.py (/sse, /ws register the connection's filters while open).
+  sport "*" means every sport.
+- DemandScheduler.select() splits a loop's live events: subscribed ones are polled every
+  cycle, the rest once per BACKGROUND_INTERVAL (0 = never), spread evenly over the cycles.
+  If the registry can't be read, every event counts as subscribed.
+- Usage:  python subscriptions.py serve [port]
+          curl -X POST 'localhost:8766/subscribe?consumer=app1&eventId=34807931&ttl=120'
+          curl 'localhost:8766/subscriptions'
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import threading
+from typing import Dict, List, Optional, Set
+
+# -------------------- Config --------------------
+SUBS_KEY = "subs:interest"
+SUB_TTL = 120               # seconds a registration lasts unless renewed
+ACTIVE_CACHE = 1.0          # seconds the active set is reused between reads
+BACKGROUND_INTERVAL = 30    # seconds between polls of an unsubscribed event; 0 = never
+SUBS_REDIS_URL = os.environ.get("SUBS_REDIS_URL")  # else redis_data's client
+API_HOST = "127.0.0.1"      # no auth: bind wider only behind something that checks callers
+API_PORT = 8766
+KINDS = ("sport", "event", "market")
+
+
+def _text(value) -> str:
+    return value.decode("utf-8") if isinstance(value, (bytes, bytearray)) else value
+
+
+class SubscriptionRegistry:
+    def __init__(self, client=None):
+        self._client = client
+        self._active: Optional[Dict[str, Set[str]]] = None
+        self._active_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            if SUBS_REDIS_URL:
+                import redis
+                self._client = redis.Redis.from_url(SUBS_REDIS_URL)
+            else:
+                import redis_data  # reuse the shared connection
+                self._client = redis_data.get_redis()
+        return self._client
+
+    @staticmethod
+    def _members(consumer: str, sports=(), event_ids=(), market_ids=()) -> List[str]:
+        pairs = [("sport", sports), ("event", event_ids), ("market", market_ids)]
+        return [f"{kind}:{value}|{consumer}" for kind, values in pairs for value in values or ()]
+
+    def subscribe(self, consumer: str, sports=(), event_ids=(), market_ids=(), ttl: int = SUB_TTL) -> int:
+        """Register (or renew) interest; returns the number of interests written."""
+        members = self._members(consumer, sports, event_ids, market_ids)
+        if not members:
+            return 0
+        expire_at = int((time.time() + ttl) * 1000)
+        self.client.zadd(SUBS_KEY, {m: expire_at for m in members})
+        self._active = None
+        return len(members)
+
+    def unsubscribe(self, consumer: str, sports=(), event_ids=(), market_ids=()) -> int:
+        members = self._members(consumer, sports, event_ids, market_ids)
+        if not members:
+            return 0
+        self._active = None
+        return self.client.zrem(SUBS_KEY, *members)
+
+    def listing(self) -> List[dict]:
+        now_ms = int(time.time() * 1000)
+        rows = []
+        for member, score in self.client.zrangebyscore(SUBS_KEY, now_ms, "+inf", withscores=True):
+            target, _, consumer = _text(member).rpartition("|")
+            kind, _, value = target.partition(":")
+            rows.append({"kind": kind, "id": value, "consumer": consumer,
+                         "expires_in": round((score - now_ms) / 1000, 1)})
+        return rows
+
+    def active(self) -> Optional[Dict[str, Set[str]]]:
+        """{"sport": {...}, "event": {...}, "market": {...}} or None when Redis is unreachable."""
+        with self._lock:
+            if self._active is not None and time.monotonic() - self._active_at < ACTIVE_CACHE:
+                return self._active
+            try:
+                now_ms = int(time.time() * 1000)
+                pipe = self.client.pipeline(transaction=False)
+                pipe.zremrangebyscore(SUBS_KEY, "-inf", now_ms)
+                pipe.zrangebyscore(SUBS_KEY, now_ms, "+inf")
+                _, members = pipe.execute()
+            except Exception as e:
+                print(f"⚠️ Subscription registry unavailable ({e}) - polling everything")
+                return None
+            active: Dict[str, Set[str]] = {kind: set() for kind in KINDS}
+            for member in members:
+                kind, _, value = _text(member).rpartition("|")[0].partition(":")
+                active.setdefault(kind, set()).add(value)
+            self._active, self._active_at = active, time.monotonic()
+            return active
+
+
+class DemandScheduler:
+    """Decides per cycle which live events a loop polls."""
+
+    def __init__(self, name: str, refresh: float, background: float = BACKGROUND_INTERVAL, registry=None):
+        self.name = name
+        self.refresh = refresh
+        self.background = background
+        self.registry = registry
+        self.last_polled: Dict[str, float] = {}
+        self.hot = self.cold = self.skipped = 0
+
+    def wanted(self, active, sport: str, event: dict, market_field: str) -> bool:
+        market_ids = event.get(market_field) or []
+        if isinstance(market_ids, (str, int)):
+            market_ids = [market_ids]
+        return (sport in active["sport"] or "*" in active["sport"] or str(event["event_id"]) in active["event"]
+                or any(str(m) in active["market"] for m in market_ids))
+
+    def select(self, events: List[dict], sport: str, market_field: str = "market_ids") -> List[dict]:
+        active = (self.registry or get_registry()).active()
+        now = time.monotonic()
+        live = {str(e["event_id"]) for e in events}
+        for event_id in [k for k in self.last_polled if k not in live]:
+            del self.last_polled[event_id]  # left play: forget its poll time
+        if active is None:
+            return events  # fail open
+
+        hot, idle = [], []
+        for e in events:
+            (hot if self.wanted(active, sport, e, market_field) else idle).append(e)
+        cold = []
+        if self.background > 0 and idle:
+            due = [e for e in idle if now - self.last_polled.get(str(e["event_id"]), -math.inf) >= self.background]
+            due.sort(key=lambda e: self.last_polled.get(str(e["event_id"]), -math.inf))
+            # poll at most the share of idle events that keeps each on its BACKGROUND_INTERVAL
+            budget = max(1, math.ceil(len(idle) * self.refresh / self.background))
+            cold = due[:budget]
+        for e in hot + cold:
+            self.last_polled[str(e["event_id"])] = now
+        self.hot, self.cold, self.skipped = len(hot), len(cold), len(events) - len(hot) - len(cold)
+        return hot + cold
+
+    def metrics_line(self) -> str:
+        return f"🎯 {self.name} demand: {self.hot} subscribed, {self.cold} background, {self.skipped} idle"
+
+
+# -------------------- Shared instances --------------------
+_registry = None
+_schedulers = {}
+
+def get_registry() -> SubscriptionRegistry:
+    global _registry
+    if _registry is None:
+        _registry = SubscriptionRegistry()
+    return _registry
+
+def get_scheduler(name: str, refresh: float) -> DemandScheduler:
+    if name not in _schedulers:
+        _schedulers[name] = DemandScheduler(name, refresh)
+    return _schedulers[name]
+
+
+# -------------------- Local HTTP API --------------------
+def serve(host: str = API_HOST, port: int = API_PORT):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+    def csv(qs, name):
+        return [v for raw in qs.get(name, []) for v in raw.split(",") if v]
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def _reply(self, status: int, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if urlparse(self.path).path != "/subscriptions":
+                return self.send_error(404)
+            self._reply(200, get_registry().listing())
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            qs = parse_qs(url.query)
+            consumer = (qs.get("consumer") or [""])[0]
+            if url.path not in ("/subscribe", "/unsubscribe") or not consumer:
+                return self.send_error(404 if consumer else 400)
+            filters = (csv(qs, "sport"), csv(qs, "eventId"), csv(qs, "marketId"))
+            if url.path == "/subscribe":
+                try:
+                    ttl = int((qs.get("ttl") or [SUB_TTL])[0])
+                except ValueError:
+                    return self._reply(400, {"error": "ttl must be an integer number of seconds"})
+                if ttl <= 0:
+                    return self._reply(400, {"error": "ttl must be positive"})
+                self._reply(200, {"subscribed": get_registry().subscribe(consumer, *filters, ttl=ttl), "ttl": ttl})
+            else:
+                self._reply(200, {"unsubscribed": get_registry().unsubscribe(consumer, *filters)})
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    print(f"🎯 Subscription API on http://{host}:{port} (POST /subscribe, POST /unsubscribe, GET /subscriptions)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve(port=int(sys.argv[2]) if len(sys.argv) > 2 else API_PORT)
+    else:
+        print("Usage: python subscriptions.py serve [port]")
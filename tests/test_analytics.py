@@ -0,0 +1,69 @@
+import math
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import analytics
+from analytics import MarketAnalytics
+
+
+def runners(back, lay=None):
+    return [{"selectionId": i, "availableToBack": [{"price": b}], "availableToLay": [{"price": (lay or back)[i]}]}
+            for i, b in enumerate(back)]
+
+
+def test_book_and_moves():
+    engine = MarketAnalytics("t")
+    engine.add("1.1", runners([2.0, 2.0]))
+    doc = engine.end_cycle()["markets"]["1.1"]
+    assert doc["back_book"] == 100.0 and doc["overround"] == 0.0
+    assert doc["back_move"] == [None, None]
+
+    engine.add("1.1", runners([2.5, 1.8]))
+    doc = engine.end_cycle()["markets"]["1.1"]
+    assert doc["back_move"] == [0.5, -0.2]
+
+
+def test_moves_survive_cycles_without_the_market():
+    engine = MarketAnalytics("t")
+    engine.add("1.1", runners([2.0]))
+    engine.add("1.2", runners([3.0]))
+    engine.end_cycle()
+    engine.add("1.2", runners([3.5]))   # 1.1 skipped (background polling)
+    engine.end_cycle()
+    engine.add("1.1", runners([2.2]))
+    engine.add("1.2", runners([4.0]))
+    doc = engine.end_cycle()["markets"]
+    assert doc["1.1"]["back_move"] == [0.2]
+    assert doc["1.2"]["back_move"] == [0.5]
+
+
+def test_forget_drops_previous_prices():
+    engine = MarketAnalytics("t")
+    engine.add("1.1", runners([2.0]))
+    engine.add("1.10", runners([2.0]))   # shares the "1.1" prefix, must survive
+    engine.end_cycle()
+    engine.forget(["1.1"])
+    engine.add("1.1", runners([2.2]))
+    engine.add("1.10", runners([2.2]))
+    doc = engine.end_cycle()["markets"]
+    assert doc["1.1"]["back_move"] == [None]
+    assert doc["1.10"]["back_move"] == [0.2]
+
+
+def test_previous_prices_expire(monkeypatch):
+    engine = MarketAnalytics("t")
+    engine.add("1.1", runners([2.0]))
+    engine.end_cycle()
+    now = analytics.time.time()
+    monkeypatch.setattr(analytics.time, "time", lambda: now + analytics.PREV_MAX_AGE + 1)
+    engine.add("1.1", runners([2.2]))
+    assert engine.end_cycle()["markets"]["1.1"]["back_move"] == [None]
+
+
+def test_missing_prices_are_null():
+    engine = MarketAnalytics("t")
+    engine.add("1.1", [{"selectionId": 1, "availableToBack": [], "availableToLay": {}}])
+    doc = engine.end_cycle()["markets"]["1.1"]
+    assert doc["back"] == [None] and doc["back_book"] is None and doc["priced"] == 0
@@ -0,0 +1,60 @@
+import copy
+import json
+import os
+
+import pytest
+
+from diff_engine import apply_patch, changed_items, diff
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def runners(*ids, price=1.5):
+    return {"marketId": "1.1", "selections": [
+        {"selectionId": i, "availableToBack": [{"price": price + i / 10, "size": 10}]} for i in ids]}
+
+
+@pytest.mark.parametrize("old, new", [
+    (runners(1, 2, 3), runners(3, 1, 2)),             # reorder only
+    (runners(1, 2, 3), runners(1, 9, 2, 3)),          # insert in the middle
+    (runners(1, 2, 3), runners(1, 3)),                # delete
+    (runners(1, 2, 3), runners(9, 3, 1)),             # insert + delete + reorder
+    (runners(1, 2, 3), runners(1, 2, 3, price=2.0)),  # in-place price change
+    (runners(), runners(4, 5)),
+    (runners(4, 5), runners()),
+])
+def test_keyed_round_trip(old, new):
+    assert apply_patch(old, diff(old, new)) == new
+
+
+def test_reorder_is_not_an_empty_patch():
+    patch = diff(runners(1, 2, 3), runners(2, 1, 3))
+    assert patch == [{"op": "order", "path": "/selections", "value": [2, 1, 3]}]
+
+
+def test_unchanged_document_gives_empty_patch():
+    assert diff(runners(1, 2), runners(1, 2)) == []
+
+
+def test_index_list_round_trip():
+    old = {"ladder": [{"price": 1.5}, {"price": 1.6}, {"price": 1.7}]}
+    for new in ({"ladder": [{"price": 1.4}, {"price": 1.5}]}, {"ladder": [{"price": 1.5}] * 4}, {"ladder": []}):
+        assert apply_patch(old, diff(old, new)) == new
+
+
+def test_changed_items_ignores_order_ops():
+    patch = diff(runners(1, 2, 3), runners(9, 3, 1))
+    items = changed_items(patch, "selections")
+    assert {k: v["op"] for k, v in items.items()} == {"9": "add", "2": "remove"}
+
+
+def test_fancy_fixture_round_trip():
+    with open(os.path.join(REPO_DIR, "MarketData_34807931.json"), "r", encoding="utf-8") as f:
+        old = json.load(f)
+    new = copy.deepcopy(old)
+    markets = new["dmFancyBetMarkets"]
+    markets.reverse()                                     # fancy sort order changed
+    markets.insert(1, dict(markets[0], apiSiteMarketId="new-1", marketName="inserted"))
+    del markets[-1]
+    markets[2]["suspended"] = 1 - (markets[2].get("suspended") or 0)
+    assert apply_patch(old, diff(old, new)) == new
@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # the lease scripts run as Lua
+
+import redis_lease
+from redis_lease import LeaseManager, shard_for
+
+SHARDS = 4
+
+
+@pytest.fixture
+def r():
+    return fakeredis.FakeRedis()
+
+
+def node(r, name, ttl=10):
+    return LeaseManager(name, client=r, shards=SHARDS, ttl=ttl, name="test")
+
+
+def event_in(shard):
+    return next(e for e in range(10_000) if shard_for(e, SHARDS) == shard)
+
+
+def test_single_node_claims_every_shard(r):
+    a = node(r, "a")
+    a.tick()
+    assert sorted(a.owned) == list(range(SHARDS))
+    assert all(a.owns(event_in(s)) for s in range(SHARDS))
+
+
+def test_second_node_gets_a_fair_share(r):
+    a, b = node(r, "a"), node(r, "b")
+    a.tick()
+    b.tick()   # joins, a still holds everything
+    a.tick()   # sees two nodes, releases above its share
+    b.tick()
+    assert len(a.owned) == len(b.owned) == SHARDS // 2
+    assert not set(a.owned) & set(b.owned)
+
+
+def test_takeover_after_the_owner_dies(r):
+    a, b = node(r, "a", ttl=1), node(r, "b", ttl=1)
+    a.tick()
+    b.tick()
+    assert not b.owned
+    time.sleep(1.1)   # a stops renewing: its leases and membership expire
+    b.tick()
+    assert sorted(b.owned) == list(range(SHARDS))
+    # every new owner gets a larger fencing token than a had
+    for shard in range(SHARDS):
+        assert int(b.owned[shard].rsplit(":", 1)[1]) > int(a.owned[shard].rsplit(":", 1)[1])
+
+
+def test_fence_rejects_a_stale_owner(r):
+    a, b = node(r, "a", ttl=1), node(r, "b", ttl=1)
+    a.tick()
+    event = event_in(0)
+    assert a.guarded_set(event, "rec", "from-a")
+
+    r.delete(a.lease_key(0))   # lease lost behind a's back (expired / taken over)
+    b.tick()   # b joins and claims the free shard
+    assert 0 in b.owned
+    assert a.fence(event) is not None   # a still believes it owns the shard ...
+    assert not a.guarded_set(event, "rec", "stale")   # ... but the script refuses the write
+    assert b.guarded_set(event, "rec", "from-b")
+    assert r.get("rec") == b"from-b"
+
+
+def test_guarded_set_ttl(r):
+    a = node(r, "a")
+    a.tick()
+    assert a.guarded_set(event_in(1), "rec", "v", ttl=30)
+    assert 0 < r.ttl("rec") <= 30
+
+
+def test_lost_renewal_is_dropped_on_tick(r):
+    a = node(r, "a")
+    a.tick()
+    r.set(a.lease_key(2), "someone-else:999")
+    a.tick()
+    assert a.owned.get(2) is None or a.owned[2] != "someone-else:999"
+    assert r.get(a.lease_key(2)) == b"someone-else:999"
+    assert not a.owns(event_in(2))
+
+
+def test_invalid_after_a_ttl_without_renewal(r, monkeypatch):
+    a = node(r, "a", ttl=1)
+    a.tick()
+    now = time.monotonic()
+    monkeypatch.setattr(redis_lease.time, "monotonic", lambda: now + 2)
+    assert not a.valid()
+    assert not a.owns(event_in(0))
+    assert a.fence(event_in(0)) is None
+
+
+def test_shutdown_releases_everything(r):
+    a = node(r, "a")
+    a.tick()
+    a.shutdown()
+    assert not a.owned
+    assert all(r.get(a.lease_key(s)) is None for s in range(SHARDS))
+    assert r.zcard("lease:test:nodes") == 0
@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+from upstream import HEDGE_BUDGET, UpstreamPool, _mock_host
+
+PATH = "/exchange/member/playerService/queryEvents"
+
+
+def test_login_page_host_is_benched():
+    good, login = _mock_host(18821, 0.005, 0.0, 0.0), _mock_host(18822, 0.001, 0.0, 0.0, login_page=True)
+    pool = UpstreamPool([login, good], hedge=False)
+    for _ in range(50):
+        assert pool.post(login + PATH, data={"type": 1}, timeout=5).json() == {"events": []}
+    stats = {s["host"]: s for s in pool.stats()}
+    assert stats[login]["failures"] >= 1 and stats[login]["benched"]
+    assert stats[login]["requests"] < 10
+
+
+def test_fails_over_to_the_next_host():
+    failing, good = _mock_host(18823, 0.001, 0.0, 1.0), _mock_host(18824, 0.005, 0.0, 0.0)
+    pool = UpstreamPool([failing, good], hedge=False)
+    for _ in range(20):
+        r = pool.post(failing + PATH, data={"type": 1}, timeout=5)
+        assert r.status_code == 200 and r.json() == {"events": []}
+    stats = {s["host"]: s for s in pool.stats()}
+    assert stats[failing]["benched"]
+    assert stats[good]["requests"] == 20
+
+
+def test_every_host_failing_returns_the_last_answer():
+    pool = UpstreamPool([_mock_host(18825, 0.001, 0.0, 1.0), _mock_host(18826, 0.001, 0.0, 0.0, login_page=True)])
+    r = pool.post(pool.hosts[0].base + PATH, timeout=5)
+    assert r.status_code in (200, 503)
+
+
+def test_unpooled_url_goes_out_as_is():
+    other = _mock_host(18827, 0.001, 0.0, 0.0)
+    pool = UpstreamPool([_mock_host(18828, 0.001, 0.0, 0.0)])
+    assert pool.post(other + PATH, timeout=5).json() == {"events": []}
+    assert pool.requests == 0
+
+
+def test_hedging_cuts_the_tail_within_budget():
+    stalling, steady = _mock_host(18829, 0.005, 0.05, 0.0), _mock_host(18830, 0.050, 0.0, 0.0)
+    tails = {}
+    for hedge in (False, True):
+        pool = UpstreamPool([stalling, steady], hedge=hedge)
+        latencies = []
+        for _ in range(300):
+            started = time.perf_counter()
+            assert pool.post(stalling + PATH, data={"type": 1}, timeout=5).status_code == 200
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        tails[hedge] = latencies[int(len(latencies) * 0.99) - 1]
+        if hedge:
+            assert 0 < pool.hedged <= HEDGE_BUDGET * pool.requests + 1
+            assert sum(h["hedge_wins"] for h in pool.stats()) > 0
+    assert tails[True] < tails[False]
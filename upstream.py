@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Upstream host pool with latency-aware routing and hedged requests
+- UPSTREAM_HOSTS (env, comma separated, empty by default) lists interchangeable API hosts.
+  Requests whose URL points at one of them are routed to the best healthy host; any other
+  URL is requested as is.
+- Only list hosts that really answer the same requests: the loops send host-specific
+  Origin / Referer headers and session cookies. UPSTREAM_POOL is the one switch for every
+  loop (scrap, odds, premium, redis_data); they all post through get_post().
+- A host counts as failing on connection errors, HTTP >= 400 and bodies that are not JSON
+  (a login page or an error page from the wrong host), so it gets benched and skipped.
+- Per host: latency EWMA, error EWMA, recent latencies. A host whose error EWMA passes
+  ERROR_THRESHOLD is skipped for COOLDOWN seconds.
+- Hedging: when the chosen host has not answered within its HEDGE_PERCENTILE latency,
+  the same request goes to the next best host and the first answer wins (at most
+  HEDGE_BUDGET of all requests are hedged). A failed request fails over at once.
+- post() returns a requests.Response like requests.post(), so callers keep their checks.
+- Usage:  python upstream.py demo    # three local mock hosts, hedging off vs on
+  Tests:  python -m pytest tests/test_upstream.py
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+from typing import Dict, List, Optional
+
+# -------------------- Config --------------------
+# spread requests over UPSTREAM_HOSTS with hedging; only once the hosts are verified equivalent
+UPSTREAM_POOL = False
+UPSTREAM_HOSTS = [h.strip() for h in os.environ.get("UPSTREAM_HOSTS", "").split(",") if h.strip()]
+EWMA_ALPHA = 0.2
+ERROR_THRESHOLD = 0.5       # error EWMA above which a host is benched
+COOLDOWN = 10               # seconds a benched host is skipped
+HEDGE = True
+HEDGE_PERCENTILE = 90
+HEDGE_MIN = 0.05            # seconds; never hedge earlier than this
+HEDGE_BUDGET = 0.1          # max share of requests that may be hedged
+MIN_SAMPLES = 20            # recent latencies needed before hedging a host
+PROBE_RATE = 0.05           # share of requests sent to a random healthy host to re-measure it
+RECENT = 200
+POOL_WORKERS = 32
+
+
+class UpstreamError(Exception):
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+class HostState:
+    def __init__(self, base: str):
+        self.base = base.rstrip("/")
+        self.latency: Optional[float] = None    # EWMA, seconds
+        self.errors = 0.0                       # EWMA of the failure rate
+        self.recent = deque(maxlen=RECENT)
+        self.down_until = 0.0
+        self.requests = self.failures = self.hedges = self.hedge_wins = 0
+
+    def score(self, now: float):
+        # benched hosts last; unknown latency first so every host gets measured
+        return (self.down_until > now, (self.latency or 0.0) * (1 + 4 * self.errors))
+
+    def deadline(self) -> Optional[float]:
+        if len(self.recent) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.recent)
+        return max(HEDGE_MIN, ordered[int(len(ordered) * HEDGE_PERCENTILE / 100) - 1])
+
+
+class UpstreamPool:
+    def __init__(self, hosts: List[str] = UPSTREAM_HOSTS, hedge: bool = HEDGE, workers: int = POOL_WORKERS):
+        from concurrent.futures import ThreadPoolExecutor
+        self.hosts = [HostState(h) for h in hosts]
+        self.by_netloc: Dict[str, HostState] = {urlsplit(h.base).netloc: h for h in self.hosts}
+        self.hedge = hedge
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upstream")
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+
+    def _session(self):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            import requests
+            session = self.local.session = requests.Session()   # keep-alive per worker thread
+        return session
+
+    def ranked(self) -> List[HostState]:
+        now = time.time()
+        with self.lock:
+            ranked = sorted(self.hosts, key=lambda h: h.score(now))
+        healthy = [h for h in ranked if h.down_until <= now]
+        if len(healthy) > 1 and random.random() < PROBE_RATE:
+            probe = random.choice(healthy[1:])  # a host that had one bad spell is not written off for good
+            ranked.remove(probe)
+            ranked.insert(0, probe)
+        return ranked
+
+    def _record(self, host: HostState, elapsed: float, ok: bool):
+        with self.lock:
+            host.requests += 1
+            if ok:
+                host.latency = elapsed if host.latency is None else (1 - EWMA_ALPHA) * host.latency + EWMA_ALPHA * elapsed
+                host.recent.append(elapsed)
+                host.errors *= 1 - EWMA_ALPHA
+            else:
+                host.failures += 1
+                host.errors = (1 - EWMA_ALPHA) * host.errors + EWMA_ALPHA
+                if host.errors > ERROR_THRESHOLD:
+                    host.down_until = time.time() + COOLDOWN
+
+    def _call(self, host: HostState, method: str, path: str, kwargs):
+        started = time.perf_counter()
+        try:
+            r = self._session().request(method, host.base + path, **kwargs)
+        except Exception as e:
+            self._record(host, time.perf_counter() - started, False)
+            raise UpstreamError(f"{host.base}: {e}")
+        if r.status_code >= 400:
+            self._record(host, time.perf_counter() - started, False)
+            raise UpstreamError(f"{host.base}: HTTP {r.status_code}", r)
+        try:
+            data = json.loads(r.content)
+        except ValueError:
+            self._record(host, time.perf_counter() - started, False)
+            raise UpstreamError(f"{host.base}: not JSON ({r.headers.get('Content-Type', '?')})", r)
+        self._record(host, time.perf_counter() - started, True)
+        r.json = lambda **_: data  # already parsed; callers call r.json() as with requests.post()
+        return r
+
+    def _may_hedge(self, primary: HostState) -> bool:
+        with self.lock:
+            if self.hedged < HEDGE_BUDGET * self.requests:
+                self.hedged += 1
+                primary.hedges += 1
+                return True
+            return False
+
+    def request(self, method: str, url: str, **kwargs):
+        from concurrent.futures import wait, FIRST_COMPLETED
+        parts = urlsplit(url)
+        if parts.netloc not in self.by_netloc:
+            return self._session().request(method, url, **kwargs)  # not a pooled host
+        path = url[len(f"{parts.scheme}://{parts.netloc}"):]
+        with self.lock:
+            self.requests += 1
+
+        ranked = self.ranked()
+        primary, spare = ranked[0], ranked[1:]
+        futures = {self.executor.submit(self._call, primary, method, path, kwargs): primary}
+        deadline = primary.deadline() if self.hedge and spare else None
+        error, hedge = None, None
+        while futures:
+            done, _ = wait(futures, timeout=deadline, return_when=FIRST_COMPLETED)
+            if not done:  # primary is slower than its usual percentile: hedge once
+                deadline = None
+                if spare and self._may_hedge(primary):
+                    hedge = spare.pop(0)
+                    futures[self.executor.submit(self._call, hedge, method, path, kwargs)] = hedge
+                continue
+            for future in done:
+                host = futures.pop(future)
+                try:
+                    r = future.result()
+                except UpstreamError as e:
+                    error = e
+                    if spare and not futures:  # fail over right away
+                        nxt = spare.pop(0)
+                        futures[self.executor.submit(self._call, nxt, method, path, kwargs)] = nxt
+                    continue
+                if host is hedge:
+                    with self.lock:
+                        host.hedge_wins += 1
+                return r
+        if error.response is not None:
+            return error.response  # every host failed with an answer: let the caller see it
+        raise error
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self) -> List[dict]:
+        with self.lock:
+            return [{"host": h.base, "latency_ms": round((h.latency or 0) * 1000, 1), "errors": round(h.errors, 3),
+                     "requests": h.requests, "failures": h.failures, "hedges": h.hedges, "hedge_wins": h.hedge_wins,
+                     "benched": h.down_until > time.time()} for h in self.hosts]
+
+
+# -------------------- Shared instance --------------------
+_pool = None
+
+def get_pool() -> UpstreamPool:
+    global _pool
+    if _pool is None:
+        if not UPSTREAM_HOSTS:
+            print("⚠️ UPSTREAM_POOL is on but UPSTREAM_HOSTS is empty - requests go out unpooled")
+        _pool = UpstreamPool()
+    return _pool
+
+def get_post():
+    """The pool's post() when UPSTREAM_POOL is on, requests.post otherwise."""
+    if UPSTREAM_POOL:
+        return get_pool().post
+    import requests
+    return requests.post
+
+
+# -------------------- Demo against local mock hosts --------------------
+def _mock_host(port: int, base_latency: float, stall_rate: float, error_rate: float, login_page: bool = False):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            delay = base_latency * random.uniform(0.8, 1.2)
+            if random.random() < stall_rate:
+                delay += 0.2  # occasional stall: the tail hedging should cut
+            time.sleep(delay)
+            status = 503 if random.random() < error_rate else 200
+            body = b'<html><form action="/login"></form></html>' if login_page else b'{"events":[]}'
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html" if login_page else "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+def demo(requests_per_run: int = 300):
+    hosts = [_mock_host(18801, 0.010, 0.05, 0.0),   # fast, occasional stalls
+             _mock_host(18802, 0.050, 0.0, 0.0),    # slower but steady
+             _mock_host(18803, 0.010, 0.0, 0.3)]    # fast but failing
+    for hedge in (False, True):
+        pool = UpstreamPool(hosts, hedge=hedge)
+        latencies = []
+        for _ in range(requests_per_run):
+            started = time.perf_counter()
+            pool.post(hosts[0] + "/exchange/member/playerService/queryEvents", data={"type": 1}, timeout=5)
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+        pct = lambda p: latencies[int(len(latencies) * p / 100) - 1] * 1000
+        print(f"\n{'🛡️ hedging on ' if hedge else '➡️ hedging off'}: p50 {pct(50):.1f} ms  p90 {pct(90):.1f} ms  "
+              f"p99 {pct(99):.1f} ms  max {latencies[-1] * 1000:.1f} ms")
+        for s in pool.stats():
+            print(f"   {s}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "demo":
+        demo()
+    else:
+        print("Usage: python upstream.py demo")